@@ -0,0 +1,79 @@
+# This module solves the activity model for many agents on the same network
+# each agent is described by a tuple (home, activities, alpha) where
+# home is the home location of the agent
+# activities is a file *_activities.txt (its home location is ignored) or a
+# dictionary {edge: [type_edge, reward, duration]} of activity edges
+# on the supernetwork as returned by snap_activities_to_time_grid_get_shift()
+# alpha is the coefficient translating travel times of the agent to costs
+# the travel time matrices of the time slices are computed once for all agents
+# and the agents with the same activities and alpha are solved at once by the
+# dynamic programming of activity_dp.py vectorized over their home locations
+
+from .activity_dp import slice_travel_times, read_activities, \
+    activities_to_arrays, dp_solve, dp_trajectories
+from .activity_engine import raw_to_activity
+from graph_utils.txt_to_supernetwork import txt_to_link_arrays, read_metadata
+from collections import namedtuple, OrderedDict
+import itertools
+import numpy as np
+
+__author__ = "jeromethai"
+
+
+Agent = namedtuple('Agent', ['home', 'activities', 'alpha'])
+
+MAX_TENSOR = 2**22 # max number of entries of the tensors of dp_solve()
+
+
+def batch_activity_engine(filepath_net, agents, rules=None, network=None):
+    # solves the activity model for each agent (home, activities, alpha)
+    # returns the list of (activities, costs) of the agents in the same order
+    # in the format of activity_engine() in activity_engine.py
+    # network is the output of load_network(filepath_net) to reuse it
+    if network is None: network = load_network(filepath_net)
+    metadata, travel, succ = network
+    agents = [Agent(*agent) for agent in agents]
+    # group the agents with the same activities and alpha
+    groups = OrderedDict()
+    for k, agent in enumerate(agents):
+        key = (agent.activities if isinstance(agent.activities, basestring)
+            else id(agent.activities), agent.alpha)
+        groups.setdefault(key, []).append(k)
+    out = [None] * len(agents)
+    for members in groups.values():
+        first = agents[members[0]]
+        acts, num_types = load_activities(first.activities, metadata)
+        meta = dict(metadata, num_types=num_types)
+        combinations = list(itertools.product([0, 1], repeat=num_types))
+        num_steps, num_nodes = travel.shape[:2]
+        chunk = max(1, MAX_TENSOR // (num_steps * num_nodes * 2**num_types))
+        for c in range(0, len(members), chunk):
+            ids = members[c:c+chunk]
+            homes = np.array([agents[k].home for k in ids])
+            solution = dp_solve(travel, acts, homes, num_types, first.alpha, rules)
+            for h, k in enumerate(ids):
+                raw, costs = dp_trajectories(solution, travel, succ, acts, h)
+                out[k] = (raw_to_activity(raw, meta), dict(zip(combinations, costs)))
+    return out
+
+
+def load_network(filepath_net, cache=None):
+    # returns (metadata, travel, succ) shared by all the agents on the network
+    # see slice_travel_times() in activity_dp.py
+    # cache is an optional SkimCache (see skims.py)
+    metadata = read_metadata(filepath_net)
+    if cache is not None: return (metadata,) + tuple(cache.get(filepath_net))
+    sources, targets, weights = txt_to_link_arrays(filepath_net)
+    travel, succ = slice_travel_times(sources, targets, weights, metadata['num_nodes'])
+    return metadata, travel, succ
+
+
+def load_activities(activities, metadata):
+    # returns the activity arrays and the number of types of the activities
+    # given as a file *_activities.txt or a dictionary of activity edges
+    if isinstance(activities, basestring):
+        num_types = read_metadata(activities)['num_types']
+        activities = read_activities(activities, metadata)
+    else:
+        num_types = max([x[0] for x in activities.values()] + [-1]) + 1
+    return activities_to_arrays(activities, metadata['num_nodes']), num_types
@@ -0,0 +1,318 @@
+# This module finds optimal activities by dynamic programming over time slices
+# instead of searching the supernetwork (see activity_engine.py)
+# the value function is a tensor V[i, n, m] of shape
+# (num_steps, num_nodes, 2**num_types) where V[i, n, m] is the least cost to be
+# at node n at the beginning of time slice i with activity mask m
+# (mask m encodes the activity counter a as in pathfinding_extended.py)
+# the tensors are filled slice by slice:
+# 1. travel within slice i: W[i, n, m] = min_k V[i, k, m] + alpha * D[i, k, n]
+#    a batched min-plus product with the travel time matrix D[i] of slice i
+#    where D[i, k, n] is the shortest travel time from k to n during slice i
+# 2. activities starting in slice i: for an activity edge from node n in slice i
+#    to node n in slice j of type t and reward r,
+#    V[j, n, m | bit(t)] = min(V[j, n, m | bit(t)], W[i, n, m] - r)
+#    for all masks m allowed by the rule of type t (see transitions.py)
+#    and staying at home: V[i+1, home, m] = min(V[i+1, home, m], W[i, home, m])
+# all the tensors have an additional axis for the home locations of several
+# agents solved at once, i.e. V has shape (num_steps, num_homes, num_nodes, M)
+# the optimal schedules for all activity combinations a are read in W[-1, home]
+# with time-dependent travel times (slice_length is given, see skims.py), the
+# trip from k to n leaving at the beginning of slice i arrives in slice
+# j = i + D[i, k, n] // slice_length >= i, hence step 1 updates W[j] instead of
+# W[i] and W[j] is complete when slice j is processed
+
+from graph_utils.txt_to_supernetwork import txt_to_link_arrays, read_metadata, \
+    snap_activities_to_time_grid_get_shift, txt_to_activities
+from graph_utils.txt_reader import TxtFile
+from pathfinding.transitions import ONCE, REPEATABLE, FORBIDDEN
+from igraph import Graph
+import itertools
+import numpy as np
+
+__author__ = "jeromethai"
+
+
+MAX_MIN_PLUS = 2**23 # max number of candidates in a block of min_plus()
+HOME_EDGE = -2 # back pointer of staying at home from the previous slice
+SOURCE = -1 # back pointer of the start (home, slice 0, mask 0)
+
+
+def activity_dp(filepath_net, filepath_act, alpha=1.0, rules=None, skims=None,
+    slice_length=None):
+    # solves the activity model described by the two txt files
+    # returns (raw, costs) in the same format as dijkstra_extended() and
+    # raw_to_cost() (or epaths_to_cost()) in activity_engine.py, i.e. raw[k]
+    # is the vertex trajectory on the supernetwork and costs[k] is the cost
+    # of the k-th combination of itertools.product([0, 1], repeat=num_types)
+    # skims is an optional (travel, succ) of slice_travel_times(), e.g. loaded
+    # from a SkimCache (see skims.py), or time-dependent travel times with the
+    # length of the slices slice_length and succ a callable (see dp_trajectory())
+    metadata = read_metadata(filepath_net)
+    metadata.update(read_metadata(filepath_act))
+    if skims is None:
+        sources, targets, weights = txt_to_link_arrays(filepath_net)
+        skims = slice_travel_times(sources, targets, weights, metadata['num_nodes'])
+    travel, succ = skims
+    acts = activities_to_arrays(read_activities(filepath_act, metadata),
+        metadata['num_nodes'])
+    homes = np.array([metadata['home_location']])
+    solution = dp_solve(travel, acts, homes, metadata['num_types'], alpha, rules,
+        slice_length)
+    return dp_trajectories(solution, travel, succ, acts, 0)
+
+
+def read_activities(filepath_act, metadata):
+    # returns the activities {edge: [type_edge, reward, duration]} of the file
+    # with explicit or implicit times, see txt_to_supernetwork.py
+    with TxtFile(filepath_act) as f:
+        if f.metadata['explicit'] == 1:
+            return snap_activities_to_time_grid_get_shift(f, metadata)[0]
+        return txt_to_activities(f, metadata)[0]
+
+
+def activities_to_arrays(activities, num_nodes):
+    # converts activities {edge: [type_edge, reward, duration]} into a dictionary
+    # of arrays 'node', 'start', 'end', 'type', 'reward' sorted by start slice
+    # where the activity edge goes from node in slice start to node in slice end
+    edges = sorted(activities.keys())
+    s = np.array([e[0] for e in edges], dtype=np.int64)
+    t = np.array([e[1] for e in edges], dtype=np.int64)
+    acts = {'node': s % num_nodes,
+            'start': s // num_nodes,
+            'end': t // num_nodes,
+            'type': np.array([activities[e][0] for e in edges], dtype=np.int64),
+            'reward': np.array([activities[e][1] for e in edges], dtype=np.float64)}
+    order = np.argsort(acts['start'], kind='mergesort')
+    return dict((k, v[order]) for k, v in acts.items())
+
+
+def slice_travel_times(sources, targets, weights, num_nodes):
+    # computes the travel time matrices D of all time slices
+    # weights has shape (num_links, num_steps), see txt_to_link_arrays()
+    # returns D of shape (num_steps, num_nodes, num_nodes) with D[i, k, n] the
+    # shortest travel time from k to n during slice i and succ of same shape with
+    # succ[i, k, n] the node after k on the shortest path (-1 if unreachable)
+    # D[i] is computed by igraph (all-pairs dijkstra in C) and succ[i] is the
+    # argmin over the links (k,j) of weights[(k,j), i] + D[i, j, n]
+    return update_slice_travel_times(sources, targets, weights, num_nodes)
+
+
+def update_slice_travel_times(sources, targets, weights, num_nodes, slices=None,
+    out=None):
+    # same as slice_travel_times() for the time slices in slices (all if None)
+    # out = (D, succ) are updated in place if given, e.g. after the travel times
+    # of a few slices changed (see graph_utils/supernetwork_update.py)
+    num_steps = weights.shape[1]
+    if slices is None: slices = range(num_steps)
+    g = Graph(n=num_nodes, edges=zip(sources.tolist(), targets.tolist()), directed=True)
+    # links sorted by source node, starts[k] is the first link of node k
+    order = np.argsort(sources, kind='mergesort')
+    s, t, w = sources[order], targets[order], weights[order]
+    nodes = np.unique(s)
+    starts = np.searchsorted(s, nodes)
+    link_ids = np.arange(len(s))[:, None]
+    if out is None:
+        D = np.empty((num_steps, num_nodes, num_nodes))
+        succ = np.full((num_steps, num_nodes, num_nodes), -1, dtype=np.int32)
+    else:
+        D, succ = out
+    for i in slices:
+        D[i] = g.shortest_paths(weights=weights[:, i].tolist())
+        # cand[l, n] is the travel time from s[l] to n through link l
+        cand = w[:, i, None] + D[i, t, :]
+        best = np.minimum.reduceat(cand, starts, axis=0)
+        # first link of each node k achieving the best travel time to n
+        first = np.where(cand == best[np.searchsorted(nodes, s)], link_ids, len(s))
+        succ[i, nodes] = t[np.minimum.reduceat(first, starts, axis=0)]
+        succ[i][np.isinf(D[i])] = -1
+        np.fill_diagonal(succ[i], np.arange(num_nodes))
+    return D, succ
+
+
+def mask_transitions(num_types, rules=None):
+    # returns {type: (src, dst)} with src the array of masks from which an edge
+    # of this type can be taken and dst the resulting masks
+    # type -1 does not modify the mask, see transitions.py for the rules
+    masks = np.arange(2**num_types)
+    out = {-1: (masks, masks)}
+    for i in range(num_types):
+        rule = ONCE if rules is None else rules.get(i, ONCE)
+        bit = 1 << i
+        if rule == ONCE: src = masks[masks & bit == 0]
+        if rule == REPEATABLE: src = masks
+        if rule == FORBIDDEN: src = masks[:0]
+        out[i] = (src, src | bit)
+    return out
+
+
+def dp_solve(travel, acts, homes, num_types, alpha=1.0, rules=None, slice_length=None):
+    # fills the tensors described at the beginning of file
+    # travel is the tensor D of slice_travel_times(), or of time-dependent
+    # travel times if slice_length is given
+    # acts are the activity arrays of activities_to_arrays()
+    # homes is the array of home locations, one per agent
+    # returns a dictionary with
+    # 'V', 'W': value tensors of shape (num_steps, num_homes, num_nodes, M)
+    # 'origin': origin[i, h, n, m] the node k of the min-plus product for W
+    # 'depart': depart[i, h, n, m] the slice of the departure from k (i if static)
+    # 'edge': edge[i, h, n, m] the index of the activity giving V,
+    #         or HOME_EDGE, or SOURCE
+    # 'mask': mask[i, h, n, m] the mask before the activity giving V
+    num_steps, num_nodes = travel.shape[:2]
+    num_homes = len(homes)
+    M = 2**num_types
+    shape = (num_steps, num_homes, num_nodes, M)
+    V = np.full(shape, np.inf)
+    W = np.full(shape, np.inf)
+    origin = np.full(shape, -1, dtype=np.int32)
+    depart = np.empty(shape, dtype=np.int32)
+    depart[:] = np.arange(num_steps)[:, None, None, None]
+    edge = np.full(shape, SOURCE, dtype=np.int64)
+    mask = np.zeros(shape, dtype=np.int64)
+    H = np.arange(num_homes)
+    V[0, H, homes, 0] = 0.0
+    transitions = mask_transitions(num_types, rules)
+    bounds = np.searchsorted(acts['start'], np.arange(num_steps+1))
+    costs = -acts['reward']
+
+    for i in range(num_steps):
+        if slice_length is None:
+            if not np.any(np.isfinite(V[i])): continue
+            # travel within slice i: batched min-plus product
+            min_plus(V[i], alpha * travel[i], W[i], origin[i])
+        else:
+            if np.any(np.isfinite(V[i])):
+                td_travel(V[i], alpha, travel[i], i, slice_length, W, origin, depart)
+            if not np.any(np.isfinite(W[i])): continue
+        if i+1 < num_steps:
+            # stay at home during slice i
+            stay = W[i, H, homes]
+            better = stay < V[i+1, H, homes]
+            hb, mb = np.nonzero(better)
+            V[i+1, hb, homes[hb], mb] = stay[hb, mb]
+            edge[i+1, hb, homes[hb], mb] = HOME_EDGE
+            mask[i+1, hb, homes[hb], mb] = mb
+        # activities starting in slice i
+        for t, (src, dst) in transitions.items():
+            e = np.arange(bounds[i], bounds[i+1])
+            e = e[acts['type'][e] == t]
+            if len(e) == 0 or len(src) == 0: continue
+            # candidates of shape (num_homes, len(e), len(src))
+            cand = W[i][:, acts['node'][e]][:, :, src] + costs[e][None, :, None]
+            hh, ee, ss = np.meshgrid(H, e, np.arange(len(src)), indexing='ij')
+            flat = np.ravel_multi_index((acts['end'][ee], hh, acts['node'][ee],
+                dst[ss]), shape).ravel()
+            cand, ee, ss = cand.ravel(), ee.ravel(), ss.ravel()
+            # keep the best candidate for each entry of V, then compare to V
+            order = np.lexsort((cand, flat))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = flat[order][1:] != flat[order][:-1]
+            best = order[first]
+            better = cand[best] < V.ravel()[flat[best]]
+            best = best[better]
+            V.ravel()[flat[best]] = cand[best]
+            edge.ravel()[flat[best]] = ee[best]
+            mask.ravel()[flat[best]] = src[ss[best]]
+    return {'V': V, 'W': W, 'origin': origin, 'depart': depart, 'edge': edge,
+            'mask': mask, 'homes': homes, 'num_types': num_types}
+
+
+def td_travel(V, alpha, D, i, slice_length, W, origin, depart):
+    # time-dependent travel leaving at the beginning of slice i, D[k, n] is the
+    # travel time from k to n, one min-plus product per arrival slice j
+    # updates W[j], origin[j] and depart[j] in place where the cost is lower
+    num_steps = W.shape[0]
+    arrival = i + np.floor(D / slice_length)
+    W_j = np.empty(V.shape)
+    origin_j = np.empty(V.shape, dtype=origin.dtype)
+    for j in np.unique(arrival[np.isfinite(arrival)]).astype(np.int64).tolist():
+        if j >= num_steps: break # arrives after the end of the day
+        min_plus(V, np.where(arrival == j, alpha * D, np.inf), W_j, origin_j)
+        better = W_j < W[j]
+        W[j][better] = W_j[better]
+        origin[j][better] = origin_j[better]
+        depart[j][better] = i
+
+
+def min_plus(V, D, W, origin):
+    # batched min-plus product W[h, n, m] = min_k V[h, k, m] + D[k, n]
+    # origin[h, n, m] is the argmin k, W and origin are filled in place
+    # V is sparse: at the beginning of a slice, the finite entries are at the
+    # home and the locations of the activities, hence the candidates
+    # V[h, k, m] + D[k, :] are only computed for the finite entries (h, k, m)
+    # and reduced by groups (h, m), with at most MAX_MIN_PLUS candidates at once
+    num_nodes = D.shape[1]
+    W.fill(np.inf)
+    h, k, m = np.nonzero(np.isfinite(V))
+    if len(h) == 0: return
+    order = np.lexsort((k, m, h)) # sorted by h, then m, then k
+    h, k, m = h[order], k[order], m[order]
+    new_group = np.ones(len(h), dtype=bool)
+    new_group[1:] = (h[1:] != h[:-1]) | (m[1:] != m[:-1])
+    starts = np.append(np.nonzero(new_group)[0], len(h))
+    rows = max(1, MAX_MIN_PLUS // num_nodes)
+    g = 0
+    while g < len(starts)-1:
+        # groups g to g2-1 have at most rows candidates (at least one group)
+        g2 = max(g+1, np.searchsorted(starts, starts[g] + rows, side='right') - 1)
+        lo, hi = starts[g], starts[g2]
+        cand = V[h[lo:hi], k[lo:hi], m[lo:hi]][:, None] + D[k[lo:hi]]
+        group_starts = starts[g:g2] - lo
+        best = np.minimum.reduceat(cand, group_starts, axis=0)
+        group = np.cumsum(new_group[lo:hi]) - 1
+        # first (hence least) k of each group achieving the minimum
+        first = np.where(cand == best[group], np.arange(hi-lo)[:, None], hi-lo)
+        first = np.minimum.reduceat(first, group_starts, axis=0)
+        hg, mg = h[starts[g:g2]], m[starts[g:g2]]
+        W[hg, :, mg] = best
+        origin[hg, :, mg] = k[lo:hi][first]
+        g = g2
+
+
+def dp_trajectories(solution, travel, succ, acts, h):
+    # reconstructs the optimal trajectories of agent h on the supernetwork
+    # for all combinations of itertools.product([0, 1], repeat=num_types)
+    # returns (raw, costs) where costs are in raw travel times minus rewards
+    num_steps, num_nodes = travel.shape[:2]
+    home = solution['homes'][h]
+    raw, costs = [], []
+    for a in itertools.product([0, 1], repeat=solution['num_types']):
+        m = sum(x << i for i, x in enumerate(a))
+        traj, cost = dp_trajectory(solution, travel, succ, acts, h, home, m)
+        raw.append(traj)
+        costs.append(cost)
+    return raw, costs
+
+
+def dp_trajectory(solution, travel, succ, acts, h, home, m):
+    # trajectory ending at home in the last slice with mask m, see dp_trajectories()
+    # succ is the successor tensor of slice_travel_times() or a callable
+    # succ(i, k, n) returning the vertices on the supernetwork of the trip from
+    # k to n leaving at the beginning of slice i
+    num_steps, num_nodes = travel.shape[:2]
+    i, n = num_steps-1, home
+    if solution['W'][i, h, n, m] == np.inf: return [], np.inf
+    segments, cost = [], 0.0
+    while True:
+        k = solution['origin'][i, h, n, m]
+        i = solution['depart'][i, h, n, m]
+        if callable(succ):
+            segments.append(succ(i, k, n))
+        else:
+            segments.append([x + i*num_nodes for x in slice_path(succ[i], k, n)])
+        cost += travel[i, k, n]
+        e = solution['edge'][i, h, k, m]
+        if e == SOURCE: break
+        if e == HOME_EDGE:
+            i, n = i-1, k
+        else:
+            i, n, m = acts['start'][e], acts['node'][e], solution['mask'][i, h, k, m]
+            cost -= acts['reward'][e]
+    return [int(v) for segment in segments[::-1] for v in segment], cost
+
+
+def slice_path(succ, k, n):
+    # nodes of the shortest path from k to n given the successor matrix succ
+    path = [k]
+    while path[-1] != n: path.append(succ[path[-1], n])
+    return path
@@ -5,7 +5,15 @@
 # see module txt_to_supernetwork.py for mode details
 
 from pathfinding.pathfinding_extended import dijkstra_extended
-from graph_utils.txt_to_supernetwork import txt_to_supernetwork, read_metadata
+from pathfinding.pathfinding_layered import dijkstra_layered
+from activity_dp import activity_dp
+from skims import transport_layer
+from pathfinding.pathfinding_layered import edge_directions
+from pathfinding.enumeration import k_shortest_extended, pareto_layered
+from pathfinding.dominance import dijkstra_dominance
+from pathfinding.transitions import TransitionTable
+from graph_utils.txt_to_supernetwork import txt_to_supernetwork, read_metadata, \
+    txt_to_time_expanded_graph
 import itertools
 import numpy as np
 import time
@@ -13,10 +21,60 @@ import time
 __author__ = "jeromethai"
 
 
-def activity_engine(filepath_net, filepath_act, name="SuperNetwork", alpha=1.0):
+def activity_engine(filepath_net, filepath_act, name="SuperNetwork", alpha=1.0,
+    rules=None, modifier=None, solver="dijkstra", cache=None, implicit=False,
+    transport="static", dominance=None, skim_cache=None):
     # alpha is a coefficient to translate travel times to travel costs
+    # rules is a dictionary {type: rule} of transition rules (see transitions.py)
+    # by default activities of type 0, 1, ... can only be done once
+    # modifier is an optional callable for custom rules (slow path),
+    # see make_modifier() and pathfinding_extended.py
+    # solver is "dijkstra" for dijkstra_extended() or "layered" for
+    # dijkstra_layered() which processes the time slices in order and
+    # does not need to shift the activity weights to make them positive
+    # or "dp" for the dynamic programming over time slices of activity_dp.py
+    # which does not construct the supernetwork (modifier is not supported)
+    # cache is an optional SupernetworkCache (see supernetwork_cache.py) that
+    # loads the supernetwork compiled by a previous run on the same inputs
+    # (not with solver "dp")
+    # skim_cache is an optional SkimCache (see skims.py) of the travel times
+    # (only with solver "dp")
+    # if implicit is True, the supernetwork is a TimeExpandedGraph (see
+    # time_expanded.py) that does not store the road edges of every time slice
+    # (only with solver "dijkstra")
+    # transport is "static" for travel times within the time slices or "fifo"
+    # for time-dependent travel times where a trip advances the clock and can
+    # span several slices (see skims.py and pathfinding/time_dependent.py)
+    # (only with solver "dp")
+    # dominance is an optional Dominance (see pathfinding/dominance.py) that
+    # prunes the dominated labels of dijkstra_extended() and counts them, the
+    # activity combinations that are pruned have no trajectory and an infinite
+    # cost (only with solver "dijkstra" and the default transition table)
+    if solver not in ("dijkstra", "layered", "dp"):
+        raise ValueError("unknown solver %s" % solver)
+    if implicit and solver != "dijkstra":
+        raise ValueError("implicit supernetwork requires solver dijkstra")
+    if transport != "static" and solver != "dp":
+        raise ValueError("transport %s requires solver dp" % transport)
+    if dominance is not None and (solver != "dijkstra" or implicit or modifier is not None):
+        raise ValueError("dominance requires solver dijkstra and a transition table")
+    if cache is not None and solver == "dp":
+        raise ValueError("solver dp does not use a SupernetworkCache, see skim_cache")
+    if skim_cache is not None and solver != "dp":
+        raise ValueError("skim_cache requires solver dp")
+    if solver == "dp":
+        metadata = read_metadata(filepath_net)
+        metadata.update(read_metadata(filepath_act))
+        skims, slice_length = transport_layer(filepath_net, transport,
+            cache=skim_cache)
+        raw, costs = activity_dp(filepath_net, filepath_act, alpha, rules, skims,
+            slice_length)
+        combinations = list(itertools.product([0, 1], repeat=metadata['num_types']))
+        return raw_to_activity(raw, metadata), dict(zip(combinations, costs))
     # construct super network
-    g = txt_to_supernetwork(filepath_net, filepath_act, name, alpha)
+    build = txt_to_supernetwork if cache is None else cache.get
+    if implicit: build = txt_to_time_expanded_graph
+    g = build(filepath_net, filepath_act, name, alpha, shifting=(solver == "dijkstra"))
     # read metadata
     metadata = read_metadata(filepath_net)
     metadata.update(read_metadata(filepath_act))
@@ -25,9 +83,76 @@ def activity_engine(filepath_net, filepath_act, name="SuperNetwork", alpha=1.0):
     num_steps = metadata['num_steps']
     home = metadata['home_location']
 
+    # construct the transition table of the activity counter from the edge types
+    # it compiles the rules into arrays such that no python function is called
+    # when an edge is relaxed
+    if modifier is None and implicit:
+        modifier = g.transition_table(num_types, rules)
+    if modifier is None:
+        modifier = TransitionTable.from_graph(g, num_types=num_types, rules=rules)
+
+    # initialize the targets (to, a) with 'a' all the possible activity vectors
+    to = home + (num_steps-1)*num_nodes
+    combinations = list(itertools.product([0, 1], repeat=num_types))
+    targets = [(to,a) for a in combinations]
+
+    # solves using a generalization of dijkstra algorithm
+    # the solvers record the edge of each label, hence the edge paths are free
+    if dominance is not None:
+        epaths = dijkstra_dominance(g, home, targets, modifier, dominance, output="epath")
+    elif solver == "dijkstra":
+        epaths = dijkstra_extended(g, home, targets, modifier, output="epath")
+    else:
+        epaths = dijkstra_layered(g, home, targets, modifier, num_nodes, output="epath")
+    raw = [epath_to_vpath(g, epath) for epath in epaths]
+
+    # translates back into trajectories on a time slice basis
+    # format {activity: [(start, end, nodes visited)]}
+    activities = raw_to_activity(raw, metadata)
+    # get the costs {activity: costs}
+    costs = epaths_to_cost(epaths, g, metadata)
+    return activities, costs
+
+
+def activity_schedules(filepath_net, filepath_act, k=10, name="SuperNetwork",
+    alpha=1.0, rules=None, cache=None, pareto=False):
+    # enumerates several schedules of the agent instead of one per activity
+    # combination (see pathfinding/enumeration.py)
+    # returns the k best distinct schedules as a list of (a, trajectory, cost)
+    # sorted by cost, where a is the activity combination of the schedule and
+    # trajectory is in the format of raw_to_activity()
+    # if pareto is True, returns the Pareto set over (travel cost, reward)
+    # as a list of (a, trajectory, travel cost, reward) sorted by travel cost
+    # and k is ignored
+    # the costs are in raw travel times as in raw_to_cost()
+    build = txt_to_supernetwork if cache is None else cache.get
+    g = build(filepath_net, filepath_act, name, alpha, shifting=True)
+    metadata = read_metadata(filepath_net)
+    metadata.update(read_metadata(filepath_act))
+    num_nodes = metadata['num_nodes']
+    home = metadata['home_location']
+    to = home + (metadata['num_steps']-1)*num_nodes
+    table = TransitionTable.from_graph(g, num_types=metadata['num_types'], rules=rules)
+    raw_weights = np.asarray(g.es['raw_weight'], dtype=np.float64)
+    if pareto:
+        # travel costs on the road edges and minus the rewards on the others
+        forward = edge_directions(g, num_nodes)
+        travel = np.where(forward, 0.0, raw_weights)
+        loss = np.where(forward, raw_weights, 0.0)
+        front = pareto_layered(g, home, [to], table, num_nodes, (travel, loss))
+        return [(a, raw_to_schedule(epath_to_vpath(g, epath), metadata), x1, -x2)
+            for x1, x2, a, epath in front]
+    targets = [(to, a) for a in itertools.product([0, 1], repeat=table.num_types)]
+    paths = k_shortest_extended(g, home, targets, table, k, output="epath")
+    return [(a, raw_to_schedule(epath_to_vpath(g, epath), metadata),
+        raw_weights[epath].sum()) for cost, a, epath in paths]
+
+
+def make_modifier(num_types):
     # construct modifier using metadata information
     # it modifies the weight of activity edge of type i to infinity if a[i]=1
     # if a[i]=0, it sets a[i] to 1
+    # this is the callable equivalent of the default TransitionTable
     def modifier(edge=None, a=None):
         # a modifier that takes an edge and an activity counter in argument
         # activity counter a is s.t. a[i] = #times activity of type i has been done
@@ -39,50 +164,46 @@ def activity_engine(filepath_net, filepath_act, name="SuperNetwork", alpha=1.0):
         if i == -1: return w, (u, a)
         if i >= 0 and a[i] == 0: return w, (u, a[:i]+(1,)+a[i+1:])
         if i >= 0 and a[i] == 1: return np.inf, -1
-
-    # initialize the targets (to, a) with 'a' all the possible activity vectors
-    to = home + (num_steps-1)*num_nodes
-    combinations = list(itertools.product([0, 1], repeat=num_types))
-    targets = [(to,a) for a in combinations]
-
-    # solves using a generalization of dijkstra algorithm
-    raw = dijkstra_extended(g, home, targets, modifier)
-
-    # translates back into trajectories on a time slice basis
-    # format {activity: [(start, end, nodes visited)]}
-    activities = raw_to_activity(raw, metadata)
-    # get the costs {activity: costs}
-    costs = raw_to_cost(raw, g, metadata)
-    return activities, costs
+    return modifier
 
 
 def raw_to_activity(raw, metadata):
     # translates raw trajectory on the supernetwork 
     # into trajectories on a time slice basis 
     # format {activity: [(start, end, nodes visited)]}
-    start_time = metadata['start_time']
-    end_time = metadata['end_time']
-    num_steps = metadata['num_steps']
-    num_nodes = metadata['num_nodes']
     num_types = metadata['num_types']
-    delta_t = float(end_time - start_time) / num_steps
     combinations = list(itertools.product([0, 1], repeat=num_types))
     out = {}
     for traj, a in zip(raw, combinations):
-        if len(traj) == 0: 
-            out[a] = []
-            continue
-        # start_time + v/num_nodes is the time slice associated to v
-        # v%num_nodes is the location of vertex v
-        pairs = [(start_time + delta_t * (v/num_nodes), v%num_nodes) for v in traj]
-        # group by times
-        starts = sorted(set(map(lambda x:x[0], pairs)))
-        ends = [t + delta_t for t in starts]
-        tmp = zip(starts, ends, [[y[1] for y in pairs if y[0]==x] for x in starts])
-        out[a] = [e for e in tmp if len(e[2])>1]
+        out[a] = raw_to_schedule(traj, metadata)
     return out
 
 
+def raw_to_schedule(traj, metadata):
+    # translates one raw trajectory, see raw_to_activity()
+    start_time = metadata['start_time']
+    end_time = metadata['end_time']
+    num_steps = metadata['num_steps']
+    num_nodes = metadata['num_nodes']
+    delta_t = float(end_time - start_time) / num_steps
+    if len(traj) == 0: return []
+    # start_time + v/num_nodes is the time slice associated to v
+    # v%num_nodes is the location of vertex v
+    pairs = [(start_time + delta_t * (v/num_nodes), v%num_nodes) for v in traj]
+    # group by times
+    starts = sorted(set(map(lambda x:x[0], pairs)))
+    ends = [t + delta_t for t in starts]
+    tmp = zip(starts, ends, [[y[1] for y in pairs if y[0]==x] for x in starts])
+    return [e for e in tmp if len(e[2])>1]
+
+
+def epath_to_vpath(graph, epath):
+    # vertices visited by a path of edge ids, [] if the path is empty
+    if len(epath) == 0: return []
+    edges = graph.es
+    return [edges[epath[0]].source] + [edges[e].target for e in epath]
+
+
 def raw_to_cost(raw, graph, metadata):
     # get the costs of each raw trajectory {activity: costs}
     num_types = metadata['num_types']
@@ -99,6 +220,22 @@ def raw_to_cost(raw, graph, metadata):
     return out
 
 
+def epaths_to_cost(epaths, graph, metadata):
+    # same as raw_to_cost() with the edge paths of the trajectories (output
+    # "epath" of the solvers), the costs are summed from the 'raw_weight' of
+    # the edges by edge id without graph.get_eid()
+    num_types = metadata['num_types']
+    combinations = list(itertools.product([0, 1], repeat=num_types))
+    raw_weights = graph.es['raw_weight']
+    out = {}
+    for epath, a in zip(epaths, combinations):
+        if len(epath) == 0:
+            out[a] = np.inf
+            continue
+        out[a] = sum(raw_weights[e] for e in epath)
+    return out
+
+
 def main():
     print "solves activity engine for a small grid network"
     filepath_net = 'networks/SmallGrid_net_times.txt'
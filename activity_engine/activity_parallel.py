@@ -0,0 +1,90 @@
+# This module solves the activity model for a population of agents on a pool of
+# worker processes, see batch_activity_engine() in activity_batch.py for the
+# description of the agents
+# the travel time matrices of the network are computed once by the parent and
+# saved as .npy files that each worker memory-maps (read-only) when it starts,
+# hence the network is shared by the workers instead of being pickled per task
+# the agents are sorted by (activities, alpha) such that each task is a chunk of
+# agents that mostly share their activities and are solved at once by
+# batch_activity_engine(), and the results are returned in the order of agents
+
+from .activity_batch import Agent, batch_activity_engine, load_network
+from multiprocessing import Pool, cpu_count
+import numpy as np
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+__author__ = "jeromethai"
+
+
+_network = None # network of the worker process, see init_worker()
+
+
+def parallel_activity_engine(filepath_net, agents, processes=None, chunksize=None,
+    rules=None, progress=None):
+    # solves the activity model for each agent (home, activities, alpha)
+    # on processes worker processes (number of cpus if None)
+    # chunksize is the number of agents per task, by default such that each
+    # process gets about 4 tasks
+    # progress is called as progress(num_done, num_agents, elapsed) after each
+    # task, e.g. print_progress
+    # returns the list of (activities, costs) of the agents in the same order
+    agents = [Agent(*agent) for agent in agents]
+    if processes is None: processes = cpu_count()
+    if chunksize is None: chunksize = max(1, -(-len(agents) // (4 * processes)))
+    order = sorted(range(len(agents)), key=lambda k: group_key(agents[k]))
+    chunks = [order[c:c+chunksize] for c in range(0, len(order), chunksize)]
+    metadata, travel, succ = load_network(filepath_net)
+    tmpdir = tempfile.mkdtemp(prefix='activity_parallel')
+    try:
+        paths = (os.path.join(tmpdir, 'travel.npy'), os.path.join(tmpdir, 'succ.npy'))
+        np.save(paths[0], travel)
+        np.save(paths[1], succ)
+        del travel, succ
+        pool = Pool(processes, init_worker, (filepath_net, metadata, paths, rules))
+        try:
+            out = [None] * len(agents)
+            start, done = time.time(), 0
+            tasks = ([agents[k] for k in chunk] for chunk in chunks)
+            # imap returns the results of the tasks in the order of the chunks
+            for chunk, results in zip(chunks, pool.imap(solve_chunk, tasks)):
+                for k, result in zip(chunk, results): out[k] = result
+                done += len(chunk)
+                if progress is not None: progress(done, len(agents), time.time()-start)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+    finally:
+        shutil.rmtree(tmpdir)
+    return out
+
+
+def group_key(agent):
+    # agents with the same key are solved at once by batch_activity_engine()
+    activities = agent.activities
+    if not isinstance(activities, basestring): activities = id(activities)
+    return (activities, agent.alpha)
+
+
+def init_worker(filepath_net, metadata, paths, rules):
+    # memory-maps the travel time matrices saved by parallel_activity_engine()
+    global _network
+    travel, succ = [np.load(path, mmap_mode='r') for path in paths]
+    _network = (filepath_net, (metadata, travel, succ), rules)
+
+
+def solve_chunk(agents):
+    filepath_net, network, rules = _network
+    return batch_activity_engine(filepath_net, agents, rules, network)
+
+
+def print_progress(num_done, num_agents, elapsed):
+    # prints the number of agents solved and the throughput in agents/s
+    rate = num_done / elapsed if elapsed > 0.0 else float('inf')
+    sys.stdout.write('\r%d/%d agents, %.1f agents/s' % (num_done, num_agents, rate))
+    if num_done == num_agents: sys.stdout.write('\n')
+    sys.stdout.flush()
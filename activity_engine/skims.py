@@ -0,0 +1,156 @@
+# This module computes the travel time skims of the networks described by
+# *_net_times.txt files, i.e. the tensor D of shape (num_steps, num_nodes, num_nodes)
+# where D[i, k, n] is the travel time from node k to node n leaving at the
+# beginning of time slice i, such that the consumers (activity_dp.py,
+# activity_batch.py, planners) read a travel time in O(1) instead of searching
+# two variants:
+# "static": the whole trip is done with the weights of slice i, this is the
+#           tensor of slice_travel_times() in activity_dp.py with the successors
+#           succ[i, k, n] of the shortest paths
+# "fifo": time-dependent travel times, a link entered at time tau during slice
+#         j = tau // slice_length takes weights[l, j] and the trip can span
+#         several slices, the vehicles are allowed to wait at the entrance of
+#         a link such that the arrival times are non-decreasing in tau (FIFO),
+#         see pathfinding/time_dependent.py, the earliest arrival times are
+#         computed by a label-correcting search (Bellman-Ford) vectorized over
+#         all the origins of a departure slice, D includes the waiting times
+# the times are measured from the start time of the network in the unit of the
+# weights, slice_length is the length of a time slice in this unit, by
+# default the weights are in minutes (see get_slice_length())
+# TimeDependentPaths gives the trips of the "fifo" variant on the supernetwork,
+# with the arrival slice of each node, such that activity_dp.py can use the
+# time-dependent travel times as its transport layer (see transport_layer())
+# SkimCache saves the tensors as .npy files in an on-disk cache keyed by a
+# hash of the file and of the parameters (see NpyCache in
+# supernetwork_cache.py) and loads them with memory mapping
+# example:
+# cache = SkimCache('/tmp/skims')
+# D, succ = cache.get('networks/SmallGrid_net_times.txt')
+# D[3, 2, 5] # from node 2 to node 5 leaving in slice 3
+
+from activity_dp import slice_travel_times
+from graph_utils.txt_to_supernetwork import link_arrays
+from graph_utils.supernetwork_cache import NpyCache, file_hash
+from pathfinding.time_dependent import TravelTimeFunctions, TimeDependentSolver
+from pathfinding.csr import CSRGraph
+import numpy as np
+import os
+
+__author__ = "jeromethai"
+
+
+VERSION = 1 # bump when the format of the entries changes
+
+MODES = ("static", "fifo")
+
+
+def skims(filepath_net, mode="static", slice_length=None):
+    # returns (D, succ) of the network described by filepath_net
+    # succ is None with mode "fifo"
+    if mode not in MODES: raise ValueError("unknown mode %s" % mode)
+    metadata, sources, targets, weights = link_arrays(filepath_net)
+    num_nodes = metadata['num_nodes']
+    if mode == "static":
+        return slice_travel_times(sources, targets, weights, num_nodes)
+    if slice_length is None: slice_length = get_slice_length(metadata)
+    return fifo_travel_times(sources, targets, weights, num_nodes, slice_length), None
+
+
+def get_slice_length(metadata):
+    # length of a time slice in minutes, the start and end times are in hours
+    return 60.0 * (metadata['end_time'] - metadata['start_time']) / metadata['num_steps']
+
+
+def fifo_travel_times(sources, targets, weights, num_nodes, slice_length):
+    # computes the time-dependent travel times D (see the beginning of file)
+    # weights has shape (num_links, num_steps), see txt_to_link_arrays()
+    # for each departure slice i, A[k, n] is the earliest arrival time at n
+    # from k and each round relaxes all the links of the origins k whose
+    # arrival times changed in the previous round
+    num_steps = weights.shape[1]
+    D = np.full((num_steps, num_nodes, num_nodes), np.inf)
+    for i in range(num_steps): np.fill_diagonal(D[i], 0.0)
+    if len(sources) == 0: return D
+    functions = TravelTimeFunctions(weights, slice_length)
+    # links sorted by target node, starts[n] is the first link of node nodes[n]
+    order = np.argsort(targets, kind='mergesort')
+    s = sources[order]
+    nodes = np.unique(targets)
+    starts = np.searchsorted(targets[order], nodes)
+    for i in range(num_steps):
+        A = D[i] # view, the times are relative to the departure i * slice_length
+        departure = i * slice_length
+        active = np.arange(num_nodes)
+        while len(active) > 0:
+            tau = A[active][:, sources] + departure
+            arrival = functions.arrivals(tau)[:, order] - departure
+            best = np.minimum.reduceat(arrival, starts, axis=1)
+            index = np.ix_(active, nodes)
+            improved = best < A[index]
+            A[index] = np.where(improved, best, A[index])
+            active = active[improved.any(axis=1)]
+    return D
+
+
+def transport_layer(filepath_net, mode="static", slice_length=None, cache=None):
+    # returns the skims (travel, succ) and the slice length of the transport
+    # layer of activity_dp() (slice_length is None with mode "static")
+    # cache is an optional SkimCache
+    if mode not in MODES: raise ValueError("unknown mode %s" % mode)
+    if mode == "static":
+        if cache is None: return skims(filepath_net), None
+        return cache.get(filepath_net), None
+    metadata, sources, targets, weights = link_arrays(filepath_net)
+    if slice_length is None: slice_length = get_slice_length(metadata)
+    if cache is None:
+        travel = fifo_travel_times(sources, targets, weights, metadata['num_nodes'],
+            slice_length)
+    else:
+        travel = cache.get(filepath_net, mode, slice_length)[0]
+    paths = TimeDependentPaths(sources, targets, weights, metadata['num_nodes'],
+        slice_length)
+    return (travel, paths), slice_length
+
+
+class TimeDependentPaths(object):
+    # paths(i, k, n) is the list of the vertices on the supernetwork of the
+    # earliest arrival path from k to n leaving at the beginning of slice i,
+    # each node is in the slice of its arrival time
+
+    def __init__(self, sources, targets, weights, num_nodes, slice_length):
+        self.num_nodes = num_nodes
+        self.functions = TravelTimeFunctions(weights, slice_length)
+        self.solver = TimeDependentSolver(CSRGraph(num_nodes, sources, targets),
+            self.functions)
+
+
+    def __call__(self, i, k, n):
+        solver = self.solver
+        path = solver.solve(k, i * self.functions.slice_length, [n])[0]
+        if k == n: path = [k]
+        slices = self.functions.slices(np.array([solver.arrival[x] for x in path]))
+        return (np.array(path) + slices * self.num_nodes).tolist()
+
+
+class SkimCache(NpyCache):
+    # on-disk cache of the skims (see NpyCache in supernetwork_cache.py for
+    # the entries and the eviction of the least recently used ones)
+
+    def get(self, filepath_net, mode="static", slice_length=None):
+        # returns (D, succ) of skims() as memory-mapped arrays
+        if mode not in MODES: raise ValueError("unknown mode %s" % mode)
+        key = self.key(filepath_net, mode, slice_length)
+        def write(directory):
+            D, succ = skims(filepath_net, mode, slice_length)
+            np.save(os.path.join(directory, 'skims_D.npy'), D)
+            if succ is not None: np.save(os.path.join(directory, 'skims_succ.npy'), succ)
+        path = self.entry(key, write)
+        D = np.load(os.path.join(path, 'skims_D.npy'), mmap_mode='r')
+        if mode == "fifo": return D, None
+        return D, np.load(os.path.join(path, 'skims_succ.npy'), mmap_mode='r')
+
+
+    def key(self, filepath_net, mode, slice_length):
+        # hash of the contents of the file and of the parameters
+        if slice_length is not None: slice_length = float(slice_length)
+        return file_hash((filepath_net,), ('skims', VERSION, mode, slice_length))
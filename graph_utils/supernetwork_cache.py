@@ -0,0 +1,117 @@
+# This module implements an on-disk cache of compiled supernetworks
+# a supernetwork built by txt_to_supernetwork_csr() as a CSRGraph
+# (see pathfinding/csr.py) is saved as .npy files in a directory of the cache
+# the directory is named after a hash of the contents of *_net_times.txt and
+# *_activities.txt and of the parameters alpha and shifting, hence a modified
+# input file gives a new entry and never a stale supernetwork
+# the entries are loaded with memory mapping, which only takes milliseconds
+# the cache is bounded by max_bytes and the least recently used entries are
+# evicted first, the time of last use of an entry is the mtime of its directory
+# example:
+# cache = SupernetworkCache('/tmp/supernetworks')
+# g = cache.get(filepath_net, filepath_act, alpha=1.0)
+# g can be passed to dijkstra_extended() and dijkstra_layered() in place of the
+# igraph returned by txt_to_supernetwork() with the same edge ids
+# the directories, their eviction and the hashes are implemented by NpyCache,
+# which is shared with the cache of the skims (see activity_engine/skims.py)
+
+from graph_utils.txt_to_supernetwork import txt_to_supernetwork_csr
+from pathfinding.csr import CSRGraph
+import hashlib
+import os
+import shutil
+import tempfile
+
+__author__ = "jeromethai"
+
+
+VERSION = 1 # bump when the format of the entries changes
+
+
+class NpyCache(object):
+    # directory of entries keyed by a hash (see file_hash()), each entry is a
+    # directory of .npy files, the subclasses implement get() and key()
+
+    def __init__(self, directory, max_bytes=2**30):
+        # directory is created if it does not exist
+        # max_bytes is the maximum total size of the entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory): os.makedirs(directory)
+
+
+    def entry(self, key, write):
+        # returns the directory of the entry key, which is written by
+        # write(directory) if it is not in the cache
+        path = os.path.join(self.directory, key)
+        if not os.path.isdir(path):
+            # write in a temporary directory first such that concurrent
+            # processes never load a partially written entry
+            tmp = tempfile.mkdtemp(prefix='.tmp', dir=self.directory)
+            write(tmp)
+            try:
+                os.rename(tmp, path)
+            except OSError: # written by another process in the meantime
+                shutil.rmtree(tmp)
+            self.evict(keep=key)
+        os.utime(path, None) # mark as most recently used
+        return path
+
+
+    def entries(self):
+        # returns the list of (last use, size in bytes, key) of the entries
+        out = []
+        for key in os.listdir(self.directory):
+            path = os.path.join(self.directory, key)
+            if key.startswith('.') or not os.path.isdir(path): continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            out.append((os.path.getmtime(path), size, key))
+        return out
+
+
+    def evict(self, keep=None):
+        # removes the least recently used entries until the total size is at
+        # most max_bytes, the entry keep is never removed
+        entries = sorted(self.entries())
+        total = sum(size for t, size, key in entries)
+        for t, size, key in entries:
+            if total <= self.max_bytes: break
+            if key == keep: continue
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+            total -= size
+
+
+    def clear(self):
+        for t, size, key in self.entries():
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+
+
+class SupernetworkCache(NpyCache):
+
+    def get(self, filepath_net, filepath_act, name="SuperNetwork", alpha=1.0,
+        shifting=True):
+        # returns the supernetwork as a memory-mapped CSRGraph
+        # same arguments as txt_to_supernetwork()
+        key = self.key(filepath_net, filepath_act, alpha, shifting)
+        path = self.entry(key, lambda directory: txt_to_supernetwork_csr(
+            filepath_net, filepath_act, name, alpha, shifting).save(directory))
+        graph = CSRGraph.load(path)
+        graph.name = name
+        return graph
+
+
+    def key(self, filepath_net, filepath_act, alpha, shifting):
+        # hash of the contents of the files and of the parameters
+        return file_hash((filepath_net, filepath_act),
+            (VERSION, float(alpha), bool(shifting)))
+
+
+def file_hash(filepaths, params):
+    # sha1 of the contents of the files and of the repr of params
+    h = hashlib.sha1()
+    h.update(repr(params))
+    for filepath in filepaths:
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(2**20), b''): h.update(block)
+        h.update(b'\0')
+    return h.hexdigest()
@@ -0,0 +1,85 @@
+# This module updates a compiled supernetwork in place when the travel times
+# of *_net_times.txt change or when activity edges are added or removed,
+# instead of rebuilding it with txt_to_supernetwork()
+# the supernetwork is either
+# an igraph built by txt_to_supernetwork()
+# a CSRGraph built by txt_to_supernetwork_csr() (see pathfinding/csr.py)
+# a TimeExpandedGraph built by txt_to_time_expanded_graph()
+# (see pathfinding/time_expanded.py)
+# with the edge ids of supernetwork_arrays(), i.e. edge i*num_links + l is link l
+# in time slice i (the links are not repeated in *_net_times.txt)
+# only the modified entries are updated, in particular
+# the cached python lists of CSRGraph and TransitionTable are patched in place
+# the cached weights of the slices of TimeExpandedGraph are patched in place
+# the transition tables of a TimeExpandedGraph do not depend on travel times
+# after adding or removing edges, the transition tables must be rebuilt since
+# the number of edges changes (and the edge ids after a removal)
+# the travel time matrices of the dynamic programming backend are recomputed
+# for the modified time slices only with update_slice_travel_times() in
+# activity_engine/activity_dp.py
+
+from pathfinding.csr import CSRGraph
+from pathfinding.time_expanded import TimeExpandedGraph
+import numpy as np
+
+__author__ = "jeromethai"
+
+
+def update_travel_times(graph, links, slices, times, alpha=1.0, num_links=None,
+    tables=()):
+    # sets the travel time of link links[k] during slice slices[k] to times[k]
+    # i.e. the edge gets 'raw_weight' times[k] and 'weight' alpha*times[k]
+    # alpha is the coefficient of the supernetwork (ignored for a TimeExpandedGraph)
+    # num_links is the number of links of the base network (not needed for a
+    # TimeExpandedGraph)
+    # tables is a list of TransitionTables of the graph whose weights are updated
+    links = np.asarray(links, dtype=np.int64)
+    slices = np.asarray(slices, dtype=np.int64)
+    times = np.asarray(times, dtype=np.float64)
+    if isinstance(graph, TimeExpandedGraph):
+        graph.update_weights(links, slices, times)
+        return
+    if num_links is None: raise ValueError("num_links is required")
+    eids = slices * num_links + links
+    if isinstance(graph, CSRGraph):
+        graph.set_attr('weight', eids, alpha * times)
+        graph.set_attr('raw_weight', eids, times)
+    else:
+        edges = graph.es[eids.tolist()]
+        edges['weight'] = (alpha * times).tolist()
+        edges['raw_weight'] = times.tolist()
+    for table in tables: table.set_weights(eids, alpha * times)
+
+
+def add_activity_edges(graph, sources, targets, types, rewards, durations, shift=0.0):
+    # adds activity edges from sources to targets of the supernetwork with the
+    # attributes of txt_to_activities_edge_dict() and returns their edge ids
+    # durations is the number of time steps of each activity and shift is the
+    # shift of the activity weights of the supernetwork
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    rewards = np.asarray(rewards, dtype=np.float64)
+    attrs = {'weight': -rewards + np.asarray(durations) * shift,
+             'type': np.asarray(types, dtype=np.int64),
+             'raw_weight': -rewards}
+    if isinstance(graph, TimeExpandedGraph):
+        return graph.add_extra_edges(sources, targets, attrs)
+    if isinstance(graph, CSRGraph):
+        return graph.add_edges(sources, targets, attrs)
+    first = graph.ecount()
+    graph.add_edges(zip(sources.tolist(), targets.tolist()))
+    edges = graph.es[first:]
+    for attr, values in attrs.items(): edges[attr] = values.tolist()
+    return np.arange(first, graph.ecount())
+
+
+def remove_activity_edges(graph, eids):
+    # removes the edges eids, e.g. [graph.get_eid(s, t)] for an edge (s,t)
+    # the other edges are renumbered as in igraph.Graph.delete_edges()
+    eids = np.asarray(eids, dtype=np.int64)
+    if isinstance(graph, TimeExpandedGraph):
+        graph.delete_extra_edges(eids)
+    elif isinstance(graph, CSRGraph):
+        graph.delete_edges(eids)
+    else:
+        graph.delete_edges(eids.tolist())
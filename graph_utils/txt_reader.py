@@ -0,0 +1,107 @@
+# This module reads the .txt files of the networks in a single streaming pass
+# the files have the format of Hillel Bar-Gera's test problems
+# http://www.bgu.ac.il/~bargera/tntp/
+# that is metadata lines <TAG> value, then a line starting with '~' that names
+# the columns, then one record per line terminated by ';' until a blank line
+# see networks/SiouxFalls_net.txt, networks/SmallGrid_net_times.txt and
+# networks/SmallGrid_activities.txt for examples
+# TxtFile parses the metadata when the file is opened and then streams the
+# records line by line, either as typed tuples with records() or as numpy
+# arrays of at most chunk lines with chunks() and table(), hence the whole
+# file is never loaded in memory as a list of lines
+# example:
+# with TxtFile('networks/SmallGrid_net_times.txt') as f:
+#     num_steps = f.metadata['num_steps']
+#     links = f.table() # shape (num_links, 2+num_steps)
+
+import numpy as np
+
+__author__ = "jeromethai"
+
+
+# metadata tags and their keys in the dictionary of metadata
+METADATA = {
+    '<NUMBER OF NODES>': 'num_nodes',
+    '<START TIME>': 'start_time',
+    '<HOME LOCATION>': 'home_location',
+    '<NUMBER OF STEPS>': 'num_steps',
+    '<NUMBER OF TYPES>': 'num_types',
+    '<END TIME>': 'end_time',
+    '<NUMBER OF LINKS>': 'num_links',
+    '<EXPLICIT>': 'explicit',
+    }
+
+
+class TxtFile(object):
+
+    def __init__(self, filepath):
+        # opens the file and reads the metadata up to the line starting with '~'
+        self.filepath = filepath
+        self.file = open(filepath)
+        self.metadata = {}
+        for line in self.file:
+            if line[0] == '~': break
+            for tag, key in METADATA.items():
+                if line.startswith(tag): self.metadata[key] = int(line[len(tag):])
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def close(self):
+        self.file.close()
+
+
+    def lines(self):
+        # generator of the records as lists of strings, without the final ';'
+        for line in self.file:
+            line = line.replace(';', ' ').split()
+            if len(line) == 0: break
+            yield line
+
+
+    def records(self, types=None):
+        # generator of the records as tuples
+        # types is a list of functions, e.g. (int, int, float), that converts
+        # the columns in order and the last one converts the remaining columns
+        for line in self.lines():
+            if types is None:
+                yield tuple(line)
+                continue
+            n = len(types)
+            yield tuple(types[i](x) for i, x in enumerate(line[:n])) + \
+                tuple(types[-1](x) for x in line[n:])
+
+
+    def chunks(self, chunk=2**14, dtype=np.float64):
+        # generator of arrays of shape (lines, columns) of at most chunk lines
+        # the numbers of each chunk are parsed by numpy in one call
+        rows = []
+        for line in self.lines():
+            rows.append(line)
+            if len(rows) == chunk:
+                yield parse_rows(rows, dtype)
+                rows = []
+        if len(rows) > 0: yield parse_rows(rows, dtype)
+
+
+    def table(self, chunk=2**14, dtype=np.float64):
+        # returns all the remaining records as an array of shape (lines, columns)
+        tables = list(self.chunks(chunk, dtype))
+        if len(tables) == 0: return np.zeros((0, 0), dtype=dtype)
+        return np.concatenate(tables)
+
+
+def parse_rows(rows, dtype=np.float64):
+    # parses a list of records with the same number of columns into an array
+    columns = len(rows[0])
+    if any(len(row) != columns for row in rows):
+        raise ValueError("records have different numbers of columns")
+    values = np.fromstring(' '.join(' '.join(row) for row in rows), dtype=dtype, sep=' ')
+    if len(values) != len(rows) * columns: raise ValueError("records are not numbers")
+    return values.reshape((len(rows), columns))
@@ -2,6 +2,7 @@
 # http://www.bgu.ac.il/~bargera/tntp/
 
 from igraph import *
+from graph_utils.txt_reader import TxtFile
 
 __author__ = "jeromethai"
 
@@ -15,26 +16,20 @@ def txt_to_igrah(filepath, name):
 def txt_to_edge_dict(filepath):
     # Construct edge data from networks available as .txt files in 
     # http://www.bgu.ac.il/~bargera/tntp/
-    header_passed = False
     edge_dict = {}
-    with open(filepath) as f:
-        for line in f.readlines():
-            if header_passed == True:
-                line = line.split()
-                if len(line) == 0: break
-                edge_dict[(int(line[0]), int(line[1]))] = {
-                    'capacity': float(line[2]),
-                    'length': float(line[3]),
-                    'fftt': float(line[4]),
-                    'B': float(line[5]),
-                    'power': int(line[6]),
-                    'speed_limit': float(line[7]),
-                    'toll': float(line[8]),
-                    'type': int(line[9][0]),
-                    'weight': float(line[4])
-                    }
-            else:
-                if line[0] == '~': header_passed = True
+    with TxtFile(filepath) as f:
+        for line in f.lines():
+            edge_dict[(int(line[0]), int(line[1]))] = {
+                'capacity': float(line[2]),
+                'length': float(line[3]),
+                'fftt': float(line[4]),
+                'B': float(line[5]),
+                'power': int(line[6]),
+                'speed_limit': float(line[7]),
+                'toll': float(line[8]),
+                'type': int(line[9][0]),
+                'weight': float(line[4])
+                }
     return edge_dict
 
 
@@ -32,7 +32,9 @@
 # work is type -1 because user can only take it once (start times < end times)
 
 from igraph import *
-from graph_utils.txt_to_igraph import edge_dict_to_igraph
+from graph_utils.txt_reader import TxtFile
+from pathfinding.csr import CSRGraph
+from pathfinding.time_expanded import TimeExpandedGraph, activity_reward
 import numpy as np
 
 __author__ = "jeromethai"
@@ -43,11 +45,136 @@ def txt_to_supernetwork(filepath_net, filepath_act, name="SuperNetwork",
     # alpha is a coefficient to translate travel times to travel costs
     # Construct supernetwork from *_net_times.txt files
     # and from *_activities.txt file
-    edge_dict = txt_to_superedge_dict(filepath_net, alpha)
-    edge_activities_dict = txt_to_activities_edge_dict(filepath_act, 
-        read_metadata(filepath_net), shifting)
-    edge_dict.update(edge_activities_dict)
-    return edge_dict_to_igraph(edge_dict, name)
+    # the edges are built as arrays by supernetwork_arrays() and given to
+    # igraph in one call per array instead of going through an edge_dict
+    num_vs, sources, targets, attrs = supernetwork_arrays(filepath_net,
+        filepath_act, alpha, shifting)
+    g = Graph(n=num_vs, edges=np.column_stack((sources, targets)).tolist(),
+        directed=True)
+    g["name"] = name
+    for attr, values in attrs.items(): g.es[attr] = values.tolist()
+    return g
+
+
+def txt_to_supernetwork_csr(filepath_net, filepath_act, name="SuperNetwork",
+    alpha=1.0, shifting=True):
+    # same as txt_to_supernetwork() but returns a CSRGraph (see pathfinding/csr.py)
+    # with the same edge ids without constructing the igraph
+    num_vs, sources, targets, attrs = supernetwork_arrays(filepath_net,
+        filepath_act, alpha, shifting)
+    return CSRGraph(num_vs, sources, targets, attrs, name=name)
+
+
+def txt_to_time_expanded_graph(filepath_net, filepath_act, name="SuperNetwork",
+    alpha=1.0, shifting=True):
+    # same supernetwork as txt_to_supernetwork() as a TimeExpandedGraph
+    # (see pathfinding/time_expanded.py) that does not store the road edges
+    # and keeps the activities of files with implicit times as records
+    # the edge ids are the same as txt_to_supernetwork() if no edge is repeated
+    metadata, sources, targets, weights = link_arrays(filepath_net)
+    num_nodes = metadata['num_nodes']
+    num_steps = metadata['num_steps']
+    keep = last_unique(sources, targets, num_nodes)
+    with TxtFile(filepath_act) as f:
+        home = f.metadata['home_location']
+        if f.metadata['explicit'] == 1:
+            activities, shift = snap_activities_to_time_grid_get_shift(f, metadata)
+            records = []
+        else:
+            records, shift = txt_to_activity_records(f, metadata)
+            activities = {}
+    if shifting is False: shift = 0.0
+    act_sources, act_targets, act_attrs = activity_edge_arrays(activities, home,
+        shift, metadata)
+    act_keep = last_unique(act_sources, act_targets, num_nodes * num_steps)
+    return TimeExpandedGraph(num_nodes, num_steps, sources[keep], targets[keep],
+        weights[keep], act_sources[act_keep], act_targets[act_keep],
+        dict((attr, values[act_keep]) for attr, values in act_attrs.items()),
+        alpha, name, records=records, shift=shift)
+
+
+def supernetwork_arrays(filepath_net, filepath_act, alpha=1.0, shifting=True):
+    # returns (num_vs, sources, targets, attrs) of the supernetwork where
+    # sources, targets are the end points of the edges ordered by edge id and
+    # attrs = {'weight': w, 'type': y, 'raw_weight': z} are arrays by edge id
+    # same edges and attributes as txt_to_superedge_dict() updated by
+    # txt_to_activities_edge_dict(), with the edge ids
+    # i*num_links + l for link l in time slice i
+    # then the activity edges ordered by (start vertex, end vertex)
+    # then the home edges ordered by time slice
+    # an edge (s,t) given several times keeps the attributes of the last one
+    # as in the edge_dict
+    metadata, sources, targets, weights = link_arrays(filepath_net)
+    num_nodes = metadata['num_nodes']
+    num_steps = metadata['num_steps']
+    # broadcast the links over the time slices, shape (num_steps, num_links)
+    offsets = num_nodes * np.arange(num_steps, dtype=np.int64)[:,None]
+    road_weights = weights.T.ravel()
+    with TxtFile(filepath_act) as f:
+        home = f.metadata['home_location']
+        if f.metadata['explicit'] == 1:
+            activities, shift = snap_activities_to_time_grid_get_shift(f, metadata)
+        else:
+            activities, shift = txt_to_activities(f, metadata)
+    if shifting is False: shift = 0.0
+    act_sources, act_targets, act_attrs = activity_edge_arrays(activities, home,
+        shift, metadata)
+    sources = np.concatenate(((sources + offsets).ravel(), act_sources))
+    targets = np.concatenate(((targets + offsets).ravel(), act_targets))
+    attrs = {
+        'weight': np.concatenate((alpha * road_weights, act_attrs['weight'])),
+        'type': np.concatenate((np.full(len(road_weights), -1, dtype=np.int64),
+            act_attrs['type'])),
+        'raw_weight': np.concatenate((road_weights, act_attrs['raw_weight'])),
+        }
+    num_vs = num_nodes * num_steps
+    keep = last_unique(sources, targets, num_vs)
+    if len(keep) < len(sources):
+        sources, targets = sources[keep], targets[keep]
+        attrs = dict((attr, values[keep]) for attr, values in attrs.items())
+    return num_vs, sources, targets, attrs
+
+
+def link_arrays(filepath_net):
+    # returns (metadata, sources, targets, weights) of *_net_times.txt files
+    # in one pass, see txt_to_link_arrays()
+    with TxtFile(filepath_net) as f:
+        metadata = f.metadata
+        links = f.table()
+    if len(links) == 0: links = np.zeros((0, 2+metadata['num_steps']))
+    return metadata, links[:,0].astype(np.int64), links[:,1].astype(np.int64), \
+        np.ascontiguousarray(links[:,2:])
+
+
+def activity_edge_arrays(activities, home, shift, metadata):
+    # returns (sources, targets, attrs) of the activity edges ordered by
+    # (start vertex, end vertex) followed by the home edges ordered by time slice
+    # same attributes as txt_to_activities_edge_dict()
+    # activities {edge: [type_edge, reward, duration]} as returned by
+    # snap_activities_to_time_grid_get_shift()
+    num_nodes = metadata['num_nodes']
+    num_steps = metadata['num_steps']
+    edges = sorted(activities.keys())
+    act = np.array([activities[e] for e in edges], dtype=np.float64).reshape((-1, 3))
+    home_sources = home + num_nodes * np.arange(num_steps-1, dtype=np.int64)
+    sources = np.concatenate((np.array([e[0] for e in edges], dtype=np.int64),
+        home_sources))
+    targets = np.concatenate((np.array([e[1] for e in edges], dtype=np.int64),
+        home_sources + num_nodes))
+    attrs = {
+        'weight': np.concatenate((-act[:,1] + act[:,2]*shift, np.full(num_steps-1, shift))),
+        'type': np.concatenate((act[:,0].astype(np.int64),
+            np.full(num_steps-1, -1, dtype=np.int64))),
+        'raw_weight': np.concatenate((-act[:,1], np.zeros(num_steps-1))),
+        }
+    return sources, targets, attrs
+
+
+def last_unique(sources, targets, num_vs):
+    # returns the sorted indices of the last occurrence of each edge (s,t)
+    keys = (sources * num_vs + targets)[::-1]
+    first = np.unique(keys, return_index=True)[1]
+    return np.sort(len(keys) - 1 - first)
 
 
 def txt_to_superedge_dict(filepath_net, alpha=1.0):
@@ -56,28 +183,29 @@ def txt_to_superedge_dict(filepath_net, alpha=1.0):
     # see networks/SmallGrid_net_times.txt for example
     # the format is edge_dict =
     # {(start_node, end_node): {'weight': x, 'type': y, 'raw_weight': z}}
-    metadata = read_metadata(filepath_net)
-    num_nodes = metadata['num_nodes']
-    num_steps = metadata['num_steps']
-    header_passed = False
+    with TxtFile(filepath_net) as f:
+        num_nodes = f.metadata['num_nodes']
+        num_steps = f.metadata['num_steps']
+        links = f.table()
     edge_dict = {}
-    with open(filepath_net) as f:
-        for line in f.readlines():
-            if header_passed == True:
-                line = line.split()
-                if len(line) == 0: break
-                line[-1] = line[-1][:-1]
-                s = int(line[0])
-                t = int(line[1])
-                for i in range(num_steps):
-                    edge_dict[(s+i*num_nodes, t+i*num_nodes)] = {'weight': alpha*float(line[i+2]),
-                                                                'type': -1,
-                                                                'raw_weight': float(line[i+2])}
-            else:
-                if line[0] == '~': header_passed = True
+    for line in links.tolist():
+        s = int(line[0])
+        t = int(line[1])
+        for i in range(num_steps):
+            edge_dict[(s+i*num_nodes, t+i*num_nodes)] = {'weight': alpha*line[i+2],
+                                                        'type': -1,
+                                                        'raw_weight': line[i+2]}
     return edge_dict
 
 
+def txt_to_link_arrays(filepath_net):
+    # read the links of *_net_times.txt files into arrays
+    # returns sources, targets of shape (num_links,) and
+    # weights of shape (num_links, num_steps) with weights[l,i] the travel time
+    # of link l during time slice i
+    return link_arrays(filepath_net)[1:]
+
+
 def txt_to_activities_edge_dict(filepath_act, metadata, shifting=True):
     # generate dictionary of activity edges from file *_activities.txt
     # see networks/SmallGrid_activities.txt for example
@@ -85,15 +213,14 @@ def txt_to_activities_edge_dict(filepath_act, metadata, shifting=True):
     # if shifting is True, the activity weights are shifted by 
     # (end-start+1)*shift to make activity edges positive
     edge_dict = {}
-    metadata_act = read_metadata(filepath_act)
-    home = metadata_act['home_location']
-    explicit = metadata_act['explicit']
     num_steps = metadata['num_steps']
     num_nodes = metadata['num_nodes']
-    if explicit == 1:
-        activities, shift = snap_activities_to_time_grid_get_shift(filepath_act, metadata)
-    else:
-        activities, shift = txt_to_activities(filepath_act, metadata)
+    with TxtFile(filepath_act) as f:
+        home = f.metadata['home_location']
+        if f.metadata['explicit'] == 1:
+            activities, shift = snap_activities_to_time_grid_get_shift(f, metadata)
+        else:
+            activities, shift = txt_to_activities(f, metadata)
     if shifting is False: shift = 0.0
     # add normal activity edges
     for edge, (type_edge, reward, duration) in activities.items():
@@ -109,6 +236,7 @@ def txt_to_activities_edge_dict(filepath_act, metadata, shifting=True):
 def snap_activities_to_time_grid_get_shift(filepath_act, metadata):
     # read a file *_activities.txt and metadata on the supernetwork
     # when *_activities.txt gives EXPLICIT TIMES
+    # filepath_act is a file path or a TxtFile (see txt_reader.py)
     # returns list of processed activities
     # activities[edge] = [type_edge, reward, duration]
     # where edge = (start_node, end_node) in the supernetwork
@@ -119,32 +247,22 @@ def snap_activities_to_time_grid_get_shift(filepath_act, metadata):
     num_steps = metadata['num_steps']
     num_nodes = metadata['num_nodes']
     delta_t = float(end_time - start_time) / num_steps
-    header_passed = False
     activities = {}
     shift = 0.0
-    with open(filepath_act) as f:
-        for line in f.readlines():
-            if header_passed == True:
-                line = line.split()
-                if len(line) == 0: break
-                line[-1] = line[-1][:-1]
-                node = int(line[0])
-                # snap start to the closest time slice
-                start = int(round((float(line[1]) - start_time) / delta_t))
-                # snap end to the closest time slice
-                end = int(round((float(line[2]) - start_time) / delta_t))
-                # check if the activity is within the time span of the supernetwork
-                if 0 < start <= end < num_steps:
-                    type_edge = int(line[3])
-                    reward = float(line[4])
-                    # note that we take start-1 since being on vertex v slice t
-                    # means only starting the activity at v at slice t+1
-                    duration = 1+end-start
-                    if shift < reward/duration: shift = np.ceil(reward/duration)
-                    edge = (node + (start-1)*num_nodes, node + end*num_nodes)
-                    activities[edge] = [type_edge, reward, duration]
-            else:
-                if line[0] == '~': header_passed = True
+    for node, start, end, type_edge, reward in records(filepath_act,
+        (int, float, float, int, float)):
+        # snap start to the closest time slice
+        start = int(round((start - start_time) / delta_t))
+        # snap end to the closest time slice
+        end = int(round((end - start_time) / delta_t))
+        # check if the activity is within the time span of the supernetwork
+        if 0 < start <= end < num_steps:
+            # note that we take start-1 since being on vertex v slice t
+            # means only starting the activity at v at slice t+1
+            duration = 1+end-start
+            if shift < reward/duration: shift = np.ceil(reward/duration)
+            edge = (node + (start-1)*num_nodes, node + end*num_nodes)
+            activities[edge] = [type_edge, reward, duration]
     return activities, shift
 
 
@@ -152,60 +270,73 @@ def txt_to_activities(filepath_act, metadata):
     # read a file *_activities.txt and metadata on the supernetwork
     # when *_activities.txt gives IMPLICIT TIMES, 
     # i.e. only start time, end time, min time, max time
+    # filepath_act is a file path or a TxtFile (see txt_reader.py)
     # return list of possible activities in the same of format as
     # snap_activities_to_time_grid_get_shift()
+    num_nodes = metadata['num_nodes']
+    activities = {}
+    records, shift = txt_to_activity_records(filepath_act, metadata)
+    for node, type_edge, reward, deprecation, start, end, min_time, max_time in records:
+        # all possible combinations of start and end times
+        for s,t in all_times_combinations(start, end, min_time, max_time):
+            # note that we take start-1 since being on vertex v slice t
+            # means only starting the activity at v at slice t+1
+            edge = (node + (s-1)*num_nodes, node + t*num_nodes)
+            duration = 1+t-s
+            # append activity edge information to the list
+            # the deprecation is not taken into account, see activity_reward()
+            total_reward = activity_reward(reward, min_time, t-s)
+            activities[edge] = [type_edge, total_reward, duration]
+    return activities, shift
+
+
+def txt_to_activity_records(filepath_act, metadata):
+    # read a file *_activities.txt with IMPLICIT TIMES into one record
+    # (node, type_edge, reward, deprecation, start, end, min_time, max_time)
+    # per activity, with times snapped to the time grid and reward per time slice
+    # the activity edges of a record are the edges
+    # (node + (s-1)*num_nodes, node + t*num_nodes) for all the (s,t) in
+    # all_times_combinations(start, end, min_time, max_time), of reward
+    # activity_reward(reward, min_time, t-s) and duration 1+t-s
+    # hence a record has O(num_steps**2) edges that txt_to_activities() lists
+    # and that TimeExpandedGraph generates during the search instead
+    # returns (records, shift) with shift as in txt_to_activities()
     start_time = metadata['start_time']
     end_time = metadata['end_time']
     num_steps = metadata['num_steps']
-    num_nodes = metadata['num_nodes']
     delta_t = float(end_time - start_time) / num_steps
-    header_passed = False
-    activities = {}
+    out = []
     shift = 0.0
-    with open(filepath_act) as f:
-        for line in f.readlines():
-            if header_passed == True:
-                line = line.split()
-                if len(line) == 0: break
-                line[-1] = line[-1][:-1]
-                # get attributes of each line
-                node = int(line[0])
-                type_edge = int(line[1])
-                # reward per unit of time
-                reward = float(line[2]) * delta_t
-                deprecation = float(line[3])
-                # snap start and end times to the closest time slice
-                start = int(round((float(line[4]) - start_time) / delta_t))
-                start = max(start, 1)
-                end = int(round((float(line[5]) - start_time) / delta_t))
-                end = min(end, num_steps-1)
-                if start >= end: continue
-                # snap min and max times to the grid
-                min_time = int(round(float(line[6]) / delta_t))
-                max_time = int(round(float(line[7]) / delta_t))
-                if min_time > max_time or min_time >= num_steps: continue
-                base_reward = reward*min_time
-                # all possible combinations of start and end times
-                for s,t in all_times_combinations(start, end, min_time, max_time):
-                    # note that we take start-1 since being on vertex v slice t
-                    # means only starting the activity at v at slice t+1
-                    edge = (node + (s-1)*num_nodes, node + t*num_nodes)
-                    duration = 1+t-s
-                    extra_time = duration-1-min_time
-                    # compute extra_reward given deprecation
-                    if extra_time > 0 and deprecation == 1.0:
-                        extra_reward = reward * extra_time
-                    if extra_time > 0 and deprecation != 1.0:
-                        alpha = (deprecation - deprecation**(extra_time+1)) / (1-deprecation)
-                        extra_reward = reward * alpha
-                    # append activity edge information to the list
-                    total_reward = base_reward + reward * extra_time
-                    activities[edge] = [type_edge, total_reward, duration]
-                    if shift < total_reward/duration: 
-                        shift = np.ceil(total_reward/duration)
-            else:
-                if line[0] == '~': header_passed = True
-    return activities, shift
+    for node, type_edge, reward, deprecation, start, end, min_time, max_time in \
+        records(filepath_act, (int, int, float)):
+        # reward per unit of time
+        reward = reward * delta_t
+        # snap start and end times to the closest time slice
+        start = int(round((start - start_time) / delta_t))
+        start = max(start, 1)
+        end = int(round((end - start_time) / delta_t))
+        end = min(end, num_steps-1)
+        if start >= end: continue
+        # snap min and max times to the grid
+        min_time = int(round(min_time / delta_t))
+        max_time = int(round(max_time / delta_t))
+        if min_time > max_time or min_time >= num_steps: continue
+        out.append((node, type_edge, reward, deprecation, start, end, min_time, max_time))
+        # the reward only depends on t-s which takes all the values
+        # between min_time and min(max_time, end-start)
+        for d in range(min_time, min(max_time, end-start) + 1):
+            total_reward = activity_reward(reward, min_time, d)
+            if shift < total_reward/(1+d): shift = np.ceil(total_reward/(1+d))
+    return out, shift
+
+
+def records(source, types):
+    # typed records of a file path or of an open TxtFile, see txt_reader.py
+    if isinstance(source, TxtFile):
+        for record in source.records(types): yield record
+        return
+    with TxtFile(source) as f:
+        for record in f.records(types): yield record
 
 
 def all_times_combinations(start, end, min_time, max_time):
@@ -222,25 +353,5 @@ def read_metadata(filepath):
     # read metadata in .txt files
     # entries is a list of entries, 
     # e.g. ['num_nodes', 'start_time', 'home_location', 'num_steps']
-    metadata = {}
-    with open(filepath) as f:
-        for line in f.readlines():
-            if line[0] == '~': break
-            if line[:17] == '<NUMBER OF NODES>': 
-                metadata['num_nodes'] = int(line[17:])
-            if line[:12] == '<START TIME>': 
-                metadata['start_time'] = int(line[12:])
-            if line[:15] == '<HOME LOCATION>': 
-                metadata['home_location'] = int(line[15:])
-            if line[:17] == '<NUMBER OF STEPS>': 
-                metadata['num_steps'] = int(line[17:])
-            if line[:17] == '<NUMBER OF TYPES>':
-                metadata['num_types'] = int(line[17:])
-            if line[:10] == '<END TIME>':
-                metadata['end_time'] = int(line[10:])
-            if line[:17] == '<NUMBER OF LINKS>': 
-                metadata['num_links'] = int(line[17:])
-            if line[:10] == '<EXPLICIT>':
-                metadata['explicit'] = int(line[10:])
-    return metadata
-
+    # only the metadata is parsed, see txt_reader.py
+    with TxtFile(filepath) as f: return f.metadata
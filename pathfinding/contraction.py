@@ -0,0 +1,259 @@
+# This module implements contraction hierarchies for the shortest path queries
+# on a static base network, e.g. networks/ChicagoSketch_net.pkl
+# see Geisberger, Sanders, Schultes and Delling, Contraction Hierarchies:
+# Faster and Simpler Hierarchical Routing in Road Networks, 2008
+# preprocessing: the vertices are contracted one by one in the order of their
+# priority (edge difference + number of contracted neighbors, updated lazily)
+# contracting v removes it from the remaining graph and, for each pair of
+# remaining neighbors u -> v -> x, adds a shortcut u -> x of weight
+# w(u,v) + w(v,x) unless a witness search (a small dijkstra from u that avoids
+# v and settles at most witness_limit vertices) finds a path that is not longer
+# rank[v] is the position of v in the contraction order
+# the augmented graph has the edges of the graph (same edge ids) followed by
+# the shortcuts, children[e] = (e1, e2) are the two edges replaced by the
+# shortcut e, (-1, -1) for the edges of the graph
+# query: a forward dijkstra from s on the upward edges (rank increases) and a
+# backward dijkstra from t on the downward edges, the shortest path goes up to
+# its vertex of highest rank and down again, hence it is the best vertex
+# labeled by both searches, then the shortcuts are unpacked into edges of the
+# graph, the searches settle about a hundred vertices on ChicagoSketch
+# the hierarchy is saved as .npy files and loaded with memory mapping
+# as in dijkstra(), the path from s to s is []
+# example:
+# ch = ContractionHierarchy.build(g, 'weight')
+# ch.save('/tmp/chicago_ch')
+# ch = ContractionHierarchy.load('/tmp/chicago_ch')
+# cost, epath = ch.distance(s, t), ch.query(s, t, output="epath")
+
+import json
+import os
+import numpy as np
+from .csr import CSRGraph, as_csr
+from .queues import make_queue
+from .pathfinding import get_weights
+
+__author__ = "jeromethai"
+
+
+class ContractionHierarchy(object):
+
+    def __init__(self, num_vs, sources, targets, weights, children, rank,
+        queue="binary"):
+        # sources, targets, weights, children are ordered by edge id of the
+        # augmented graph, see the beginning of file
+        self.num_vs = num_vs
+        self.sources = np.asarray(sources, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.children = np.asarray(children, dtype=np.int64).reshape((-1, 2))
+        self.rank = np.asarray(rank, dtype=np.int64)
+        self.queue = queue
+        self.num_settled = 0
+        # upward edges by source and downward edges by target
+        up = self.rank[self.targets] > self.rank[self.sources]
+        self.up = _search_graph(num_vs, self.sources, self.targets, up, "OUT")
+        self.down = _search_graph(num_vs, self.sources, self.targets, ~up, "IN")
+        self.w = self.weights.tolist()
+        self._children = self.children.tolist()
+
+
+    @classmethod
+    def build(cls, graph, weights='weight', witness_limit=50, queue="binary"):
+        # contracts all the vertices of an igraph or a CSRGraph
+        # weights is the name of the edge attribute or a list by edge id
+        graph = as_csr(graph, weights)
+        num_vs = graph.vcount()
+        w = get_weights(graph, weights)
+        if w is None: w = [1.0] * graph.ecount()
+        sources, targets = graph.edge_sources.tolist(), graph.edge_targets.tolist()
+        children = [(-1, -1)] * len(w)
+        w = list(w)
+        # out_adj[u][x] = (weight, eid) of the best edge between remaining vertices
+        out_adj = [{} for u in range(num_vs)]
+        in_adj = [{} for u in range(num_vs)]
+        for e, (u, x) in enumerate(zip(sources, targets)):
+            if u != x and w[e] < out_adj[u].get(x, (np.inf,))[0]:
+                out_adj[u][x] = in_adj[x][u] = (w[e], e)
+
+        def shortcuts(v):
+            # returns the list of shortcuts (u, x, weight, e1, e2) needed to
+            # contract v
+            out = []
+            for u, (w1, e1) in in_adj[v].items():
+                heads = dict((x, (w1 + w2, e2)) for x, (w2, e2)
+                    in out_adj[v].items() if x != u)
+                if len(heads) == 0: continue
+                dist = _witness_search(out_adj, u, v, heads,
+                    max(d for d, e2 in heads.values()), witness_limit)
+                for x, (d, e2) in heads.items():
+                    if dist.get(x, np.inf) > d: out.append((u, x, d, e1, e2))
+            return out
+
+        def priority(v):
+            return len(shortcuts(v)) - len(in_adj[v]) - len(out_adj[v]) + deleted[v]
+
+        deleted = [0] * num_vs # number of contracted neighbors
+        rank = [-1] * num_vs
+        Q = make_queue("binary")
+        for v in range(num_vs): Q.push(v, priority(v))
+        for r in range(num_vs):
+            while True: # lazy update of the priority of the least vertex
+                v, p = Q.pop()
+                p_new = priority(v)
+                if len(Q) == 0 or p_new <= p: break
+                Q.push(v, p_new)
+            rank[v] = r
+            for u, x, d, e1, e2 in shortcuts(v):
+                if d < out_adj[u].get(x, (np.inf,))[0]:
+                    out_adj[u][x] = in_adj[x][u] = (d, len(w))
+                sources.append(u)
+                targets.append(x)
+                w.append(d)
+                children.append((e1, e2))
+            for u in in_adj[v]:
+                del out_adj[u][v]
+                deleted[u] += 1
+            for x in out_adj[v]:
+                del in_adj[x][v]
+                deleted[x] += 1
+            out_adj[v], in_adj[v] = {}, {}
+        return cls(num_vs, sources, targets, w, children, rank, queue)
+
+
+    def save(self, directory):
+        # saves the hierarchy as .npy files in directory
+        if not os.path.isdir(directory): os.makedirs(directory)
+        for key in ('sources', 'targets', 'weights', 'children', 'rank'):
+            np.save(os.path.join(directory, 'ch_' + key + '.npy'), getattr(self, key))
+        with open(os.path.join(directory, 'ch.json'), 'w') as f:
+            json.dump({'num_vs': self.num_vs}, f)
+
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r', queue="binary"):
+        with open(os.path.join(directory, 'ch.json')) as f: info = json.load(f)
+        load = lambda key: np.load(os.path.join(directory, 'ch_' + key + '.npy'),
+            mmap_mode=mmap_mode)
+        return cls(info['num_vs'], load('sources'), load('targets'), load('weights'),
+            load('children'), load('rank'), queue)
+
+
+    def search(self, s, t):
+        # bidirectional upward search, returns (distance, meet, labels) where
+        # labels = (prev_edge forward, prev_edge backward)
+        w = self.w
+        labels = []
+        dist_f = None
+        best, meet = np.inf, -1
+        num_settled = 0
+        for (offsets, heads, eids), v in ((self.up, s), (self.down, t)):
+            dist, prev_edge = {v: 0.0}, {v: -1}
+            Q = make_queue(self.queue)
+            Q.push(v, 0.0)
+            while len(Q) > 0:
+                u, dist_u = Q.pop()
+                if dist_u >= best: break # the backward search is pruned by best
+                num_settled += 1
+                if dist_f is not None and u in dist_f and dist_f[u] + dist_u < best:
+                    best, meet = dist_f[u] + dist_u, u
+                for k in range(offsets[u], offsets[u+1]):
+                    x = heads[k]
+                    alt = dist_u + w[eids[k]]
+                    if alt < dist.get(x, np.inf):
+                        dist[x] = alt
+                        prev_edge[x] = eids[k]
+                        Q.push(x, alt)
+            dist_f = dist
+            labels.append(prev_edge)
+        self.num_settled = num_settled
+        return best, meet, labels
+
+
+    def distance(self, s, t):
+        # length of the shortest path from s to t, np.inf if not reachable
+        return self.search(s, t)[0]
+
+
+    def query(self, s, t, output="vpath"):
+        # shortest path from s to t as vertex ids or edge ids of the graph
+        best, meet, (forward, backward) = self.search(s, t)
+        if meet == -1 or s == t: return []
+        sources, targets = self.sources, self.targets
+        edges, u = [], meet # edges of the augmented graph from s to t
+        while forward[u] != -1:
+            edges.append(forward[u])
+            u = int(sources[forward[u]])
+        edges, u = edges[::-1], meet
+        while backward[u] != -1:
+            edges.append(backward[u])
+            u = int(targets[backward[u]])
+        epath = self.unpack(edges)
+        if output == "epath": return epath
+        return [s] + targets[epath].tolist()
+
+
+    def search_space(self, v, backward=False):
+        # returns the distances {u: dist} of the complete upward search from v
+        # (on the downward edges towards v if backward), used by the
+        # many-to-many distances of many_to_many.py
+        offsets, heads, eids = self.down if backward else self.up
+        w = self.w
+        dist = {v: 0.0}
+        Q = make_queue(self.queue)
+        Q.push(v, 0.0)
+        while len(Q) > 0:
+            u, dist_u = Q.pop()
+            for k in range(offsets[u], offsets[u+1]):
+                x = heads[k]
+                alt = dist_u + w[eids[k]]
+                if alt < dist.get(x, np.inf):
+                    dist[x] = alt
+                    Q.push(x, alt)
+        return dist
+
+
+    def unpack(self, edges):
+        # replaces the shortcuts by the edges of the graph, in order
+        children = self._children
+        out, stack = [], edges[::-1]
+        while len(stack) > 0:
+            e = stack.pop()
+            e1, e2 = children[e]
+            if e1 == -1:
+                out.append(e)
+            else:
+                stack.append(e2)
+                stack.append(e1)
+        return out
+
+
+def _search_graph(num_vs, sources, targets, mask, mode):
+    # (offsets, heads, eids) as python lists of the edges in mask, where the
+    # eids are edge ids of the augmented graph
+    csr = CSRGraph(num_vs, sources[mask], targets[mask], mode=mode)
+    offsets, heads, eids = csr.lists()
+    ids = np.flatnonzero(mask)
+    return offsets, heads, ids[csr.eids].tolist()
+
+
+def _witness_search(out_adj, u, v, targets, max_dist, limit):
+    # dijkstra from u on the remaining graph without v, stops when all the
+    # targets are settled, the distance exceeds max_dist or limit vertices
+    # are settled, returns the labels {vertex: distance}
+    dist = {u: 0.0}
+    Q = make_queue("binary")
+    Q.push(u, 0.0)
+    remaining = len(targets)
+    settled = 0
+    while len(Q) > 0 and remaining > 0 and settled < limit:
+        y, dist_y = Q.pop()
+        if dist_y > max_dist: break
+        settled += 1
+        if y in targets: remaining -= 1
+        for x, (weight, e) in out_adj[y].items():
+            if x == v: continue
+            alt = dist_y + weight
+            if alt < dist.get(x, np.inf):
+                dist[x] = alt
+                Q.push(x, alt)
+    return dist
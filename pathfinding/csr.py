@@ -0,0 +1,250 @@
+# This module implements a compiled snapshot of a graph in CSR format
+# (Compressed Sparse Row) that the pathfinding algorithms use instead of
+# querying igraph for every relaxed edge
+# the out-edges of vertex u are stored at positions offsets[u]:offsets[u+1] in
+# targets: the vertex at the other end of each edge
+# eids: the id of each edge in the original igraph
+# edge attributes are stored by edge id, e.g. attrs['weight'][eid]
+# the snapshot is built once with CSRGraph.from_igraph(g) and can be passed to
+# dijkstra(), dijkstra_with_heap() and dijkstra_extended() in place of g
+# note that the snapshot does not follow later modifications of g
+# but it can be modified in place with set_attr(), add_edges() and delete_edges()
+# the snapshot can be saved as .npy files with save() and loaded back with
+# memory mapping with CSRGraph.load(), see graph_utils/supernetwork_cache.py
+
+import json
+import os
+import numpy as np
+
+__author__ = "jeromethai"
+
+
+class CSRGraph(object):
+
+    def __init__(self, num_vs, sources, targets, attrs=None, mode="OUT", name=None):
+        # num_vs is the number of vertices
+        # sources, targets are the end points of the edges ordered by edge id
+        # attrs is a dictionary {attr: values ordered by edge id}
+        # mode="OUT" stores out-edges, mode="IN" stores in-edges of each vertex
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        assert sources.shape == targets.shape
+        self.num_vs = num_vs
+        self.mode = mode.upper()
+        self.name = name
+        self.edge_sources = sources
+        self.edge_targets = targets
+        tails, heads = (sources, targets) if self.mode == "OUT" else (targets, sources)
+        # stable sort keeps the edges of each vertex ordered by edge id
+        order = np.argsort(tails, kind='mergesort')
+        self.offsets = np.zeros(num_vs+1, dtype=np.int64)
+        np.cumsum(np.bincount(tails, minlength=num_vs), out=self.offsets[1:])
+        self.targets = heads[order]
+        self.eids = order.astype(np.int64)
+        self.attrs = {}
+        if attrs is not None:
+            for attr, values in attrs.items(): self.attrs[attr] = np.asarray(values)
+        self._lists = None # cached python lists used in the inner loops
+        self._attr_lists = {}
+        self.es = _EdgeSeq(self)
+
+
+    @classmethod
+    def from_igraph(cls, graph, attrs=None, mode="OUT"):
+        # compile igraph object into a CSRGraph in one bulk call per array
+        # attrs is the list of edge attributes to copy, all of them if None
+        if attrs is None: attrs = graph.es.attributes()
+        edges = np.array(graph.get_edgelist(), dtype=np.int64).reshape((-1, 2))
+        values = dict((attr, graph.es[attr]) for attr in attrs)
+        name = graph["name"] if "name" in graph.attributes() else None
+        return cls(graph.vcount(), edges[:,0], edges[:,1], values, mode, name)
+
+
+    def save(self, directory):
+        # saves the arrays of the snapshot as .npy files in directory
+        # the edge attributes are saved as attr_<name>.npy
+        if not os.path.isdir(directory): os.makedirs(directory)
+        arrays = {'edge_sources': self.edge_sources, 'edge_targets': self.edge_targets,
+            'offsets': self.offsets, 'targets': self.targets, 'eids': self.eids}
+        for attr, values in self.attrs.items(): arrays['attr_' + attr] = values
+        for key, values in arrays.items():
+            np.save(os.path.join(directory, key + '.npy'), values)
+        info = {'num_vs': self.num_vs, 'mode': self.mode, 'name': self.name,
+            'attrs': sorted(self.attrs.keys())}
+        with open(os.path.join(directory, 'graph.json'), 'w') as f: json.dump(info, f)
+
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        # loads a snapshot saved with save() without sorting the edges again
+        # with mmap_mode='r' the arrays are memory-mapped read-only
+        with open(os.path.join(directory, 'graph.json')) as f: info = json.load(f)
+        load = lambda key: np.load(os.path.join(directory, key + '.npy'), mmap_mode=mmap_mode)
+        graph = cls.__new__(cls)
+        graph.num_vs = info['num_vs']
+        graph.mode = str(info['mode'])
+        graph.name = info['name'] and str(info['name'])
+        for key in ('edge_sources', 'edge_targets', 'offsets', 'targets', 'eids'):
+            setattr(graph, key, load(key))
+        graph.attrs = dict((str(attr), load('attr_' + attr)) for attr in info['attrs'])
+        graph._lists = None
+        graph._attr_lists = {}
+        graph.es = _EdgeSeq(graph)
+        return graph
+
+
+    def set_attr(self, attr, eids, values):
+        # sets the edge attribute of the edges eids to values in place
+        # the cached python list of the attribute is patched, not rebuilt
+        array = self.attrs[attr]
+        if not array.flags.writeable: # memory-mapped read-only
+            array = self.attrs[attr] = np.array(array)
+        eids = np.asarray(eids, dtype=np.int64)
+        array[eids] = values
+        if attr in self._attr_lists:
+            values = self._attr_lists[attr]
+            for e, x in zip(eids.tolist(), array[eids].tolist()): values[e] = x
+
+
+    def add_edges(self, sources, targets, attrs=None):
+        # appends edges with ids ecount(), ecount()+1, ... and returns their ids
+        # attrs is a dictionary {attr: values} with all the edge attributes
+        # the new edges are inserted at the end of the rows of their vertices
+        # hence the edges of each row stay ordered by edge id without sorting
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        attrs = {} if attrs is None else attrs
+        if sorted(attrs.keys()) != sorted(self.attrs.keys()):
+            raise ValueError("the new edges must have the attributes %s" % self.attrs.keys())
+        tails, heads = (sources, targets) if self.mode == "OUT" else (targets, sources)
+        eids = np.arange(self.ecount(), self.ecount() + len(sources), dtype=np.int64)
+        positions = self.offsets[tails + 1]
+        self.targets = np.insert(self.targets, positions, heads)
+        self.eids = np.insert(self.eids, positions, eids)
+        self.offsets = self.offsets.copy()
+        self.offsets[1:] += np.cumsum(np.bincount(tails, minlength=self.num_vs))
+        self.edge_sources = np.concatenate((self.edge_sources, sources))
+        self.edge_targets = np.concatenate((self.edge_targets, targets))
+        for attr, values in attrs.items():
+            self.attrs[attr] = np.concatenate((self.attrs[attr], values))
+        self._lists = None
+        self._attr_lists = {}
+        return eids
+
+
+    def delete_edges(self, eids):
+        # removes the edges eids, the other edges keep their order and are
+        # renumbered from 0 as in igraph.Graph.delete_edges()
+        eids = np.unique(np.asarray(eids, dtype=np.int64))
+        keep = np.ones(self.ecount(), dtype=bool)
+        keep[eids] = False
+        row_keep = keep[self.eids]
+        tails = np.repeat(np.arange(self.num_vs), np.diff(self.offsets))[row_keep]
+        self.offsets = np.zeros(self.num_vs+1, dtype=np.int64)
+        np.cumsum(np.bincount(tails, minlength=self.num_vs), out=self.offsets[1:])
+        self.targets = self.targets[row_keep]
+        old = self.eids[row_keep]
+        self.eids = old - np.searchsorted(eids, old)
+        self.edge_sources = self.edge_sources[keep]
+        self.edge_targets = self.edge_targets[keep]
+        for attr, values in self.attrs.items(): self.attrs[attr] = values[keep]
+        self._lists = None
+        self._attr_lists = {}
+
+
+    def vcount(self):
+        return self.num_vs
+
+
+    def ecount(self):
+        return len(self.edge_sources)
+
+
+    def lists(self):
+        # returns (offsets, targets, eids) as python lists
+        # indexing lists is much faster than indexing numpy arrays one at a time
+        if self._lists is None:
+            self._lists = (self.offsets.tolist(), self.targets.tolist(),
+                self.eids.tolist())
+        return self._lists
+
+
+    def attr_list(self, attr):
+        # returns the values of the edge attribute as a python list by edge id
+        # attr is either the name of an attribute or a list of values
+        if attr is None: return None
+        if not isinstance(attr, basestring): return list(attr)
+        if attr not in self._attr_lists:
+            self._attr_lists[attr] = self.attrs[attr].tolist()
+        return self._attr_lists[attr]
+
+
+    def neighbors(self, u, mode="out"):
+        # same as igraph.Graph.neighbors() in the direction of the snapshot
+        return self.targets[self.offsets[u]:self.offsets[u+1]].tolist()
+
+
+    def get_eid(self, s, t):
+        # same as igraph.Graph.get_eid(), returns the first edge from s to t
+        if self.mode == "IN": s, t = t, s
+        offsets, targets, eids = self.lists()
+        for k in range(offsets[s], offsets[s+1]):
+            if targets[k] == t: return eids[k]
+        raise ValueError("no edge between vertices %d and %d" % (s, t))
+
+
+class _EdgeSeq(object):
+    # minimal equivalent of igraph.EdgeSeq such that graph.es[eid]['weight']
+    # and graph.es[eid].tuple work on CSRGraph objects
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, eid):
+        # graph.es[attr] returns the list of values of the attribute as in igraph
+        if isinstance(eid, basestring): return self.graph.attr_list(eid)
+        return CSREdge(self.graph, eid)
+
+    def __len__(self):
+        return self.graph.ecount()
+
+    def attributes(self):
+        return self.graph.attrs.keys()
+
+
+class CSREdge(object):
+    # minimal equivalent of igraph.Edge
+
+    __slots__ = ('graph', 'index')
+
+    def __init__(self, graph, eid):
+        self.graph = graph
+        self.index = eid
+
+    def __getitem__(self, attr):
+        return self.graph.attr_list(attr)[self.index]
+
+    @property
+    def source(self):
+        return int(self.graph.edge_sources[self.index])
+
+    @property
+    def target(self):
+        return int(self.graph.edge_targets[self.index])
+
+    @property
+    def tuple(self):
+        return (self.source, self.target)
+
+
+def as_csr(graph, attrs=None, mode="OUT"):
+    # returns graph if it is already a CSRGraph in the direction mode
+    # otherwise compiles the igraph with the edge attributes in attrs
+    # raises ValueError if graph is a CSRGraph in the other direction
+    if isinstance(graph, CSRGraph):
+        if graph.mode != mode.upper():
+            raise ValueError("CSRGraph in mode %s used in mode %s" % (graph.mode, mode))
+        return graph
+    if isinstance(attrs, basestring): attrs = [attrs]
+    if attrs is not None: attrs = [a for a in attrs if isinstance(a, basestring)]
+    return CSRGraph.from_igraph(graph, attrs, mode)
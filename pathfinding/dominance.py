@@ -0,0 +1,161 @@
+# This module implements dominance pruning of the labels (u,a) of
+# dijkstra_extended() (see pathfinding_extended.py) with a TransitionTable
+# without pruning, a label (u,a) is kept whenever it is the shortest for its
+# own counter a, hence up to num_vs * 2**num_types labels are settled
+# the labels of a vertex u are kept in a Pareto bucket {mask: dist} and a
+# label is pruned if a label of its bucket dominates it, the rules are
+# inclusion: (u,m1) at distance d1 dominates (u,m2) at distance d2 if m1 is a
+#            strict subset of m2 and d1 <= d2, since any path that extends
+#            (u,m2) can extend (u,m1) (the rules of transitions.py only forbid
+#            an edge because of a bit already set) and ends with a subset of
+#            the activities for no more cost, hence the targets that are not
+#            reached are the activity combinations dominated by a cheaper
+#            combination with fewer activities
+# bound: h(u) is the least cost from u to the targets when the activities can
+#        be done again (the rewards still available are bounded by the rewards
+#        of all the activity edges after u), computed by a backward dijkstra
+#        ignoring the counters, and (u,a) at distance d is pruned if
+#        d + h(u) > the least distance of a target label reached so far, hence
+#        only the best target is found (the search stops when it is popped)
+# the Dominance object holds the rules and the counters of the last search
+# example:
+# dominance = Dominance(inclusion=True, bound=False)
+# paths = dijkstra_dominance(g, home, targets, table, dominance)
+# dominance.settled, dominance.pruned_inclusion, dominance.pruned_bound
+
+import numpy as np
+from .csr import CSRGraph, as_csr
+from .queues import make_queue
+from .pathfinding import ShortestPathSolver
+from .pathfinding_extended import ActivityCodec, label_store
+from .paths import trace_vpaths, trace_epaths
+
+__author__ = "jeromethai"
+
+
+class Dominance(object):
+    # rules of dominance and counters of the last search:
+    # created: labels whose distance was set or decreased
+    # settled: labels popped and expanded
+    # pruned_inclusion: labels pruned by the inclusion rule (when relaxed or
+    #                   when popped if dominated after they were queued)
+    # pruned_bound: labels pruned by the bound rule
+
+    def __init__(self, inclusion=True, bound=False):
+        self.inclusion = inclusion
+        self.bound = bound
+        self.reset()
+
+
+    def reset(self):
+        self.created = 0
+        self.settled = 0
+        self.pruned_inclusion = 0
+        self.pruned_bound = 0
+
+
+    @property
+    def pruned(self):
+        return self.pruned_inclusion + self.pruned_bound
+
+
+def dominated(bucket, mask, d):
+    # True if a label of the bucket {mask: dist} dominates (mask, d) by inclusion
+    for m, dist in bucket.iteritems():
+        if dist <= d and m != mask and m & ~mask == 0: return True
+    return False
+
+
+def insert(bucket, mask, d):
+    # inserts (mask, d) into the bucket and removes the labels it dominates
+    for m in [m for m, dist in bucket.iteritems() if d <= dist and m != mask
+        and mask & ~m == 0]:
+        del bucket[m]
+    bucket[mask] = d
+
+
+def relaxed_bounds(graph, table, vertices, mode="OUT"):
+    # returns h as a list by vertex id, h(u) is the least cost from u to the
+    # vertices by the edges allowed by the table whatever the counters
+    # following the edges in the direction mode
+    graph = as_csr(graph, [], mode)
+    reverse = "IN" if graph.mode == "OUT" else "OUT"
+    backward = CSRGraph(graph.vcount(), graph.edge_sources, graph.edge_targets, mode=reverse)
+    weights = np.where(table.allowed, table.weights, np.inf).tolist()
+    solver = ShortestPathSolver(backward, weights, reverse)
+    h = np.full(graph.vcount(), np.inf)
+    for v in set(vertices):
+        solver.solve(v, output=None)
+        np.minimum(h, solver.dist, out=h)
+    return h.tolist()
+
+
+def dijkstra_dominance(graph, v, to, table, dominance, mode="OUT", output="vpath",
+    queue="binary"):
+    # same as dijkstra_extended() with a TransitionTable and the dominance
+    # rules of the beginning of file, the paths of the targets that are
+    # pruned (or not popped when the bound rule stops the search) are []
+    graph = as_csr(graph, [], mode)
+    offsets, heads, eids = graph.lists()
+    weights, check, sets, allowed = table.lists()
+    codec = ActivityCodec(table.num_types)
+    num_states = codec.num_states
+    dist, prev, prev_edge = label_store(graph.vcount() * num_states)
+    labels = codec.labels(to)
+    targets = dict.fromkeys(labels)
+    targets.pop(None, None)
+    inclusion = dominance.inclusion
+    h = None
+    if dominance.bound:
+        h = relaxed_bounds(graph, table, [l // num_states for l in targets], mode)
+    dominance.reset()
+    buckets = {} # Pareto bucket {mask: dist} of each vertex
+    incumbent = np.inf # least distance of a target label reached
+    found = set() # target labels popped
+    dist[v * num_states] = 0.0
+    buckets[v] = {0: 0.0}
+    Q = make_queue(queue)
+    Q.push(v * num_states, 0.0)
+
+    while len(Q) > 0 and len(targets) > 0:
+        label, dist_e = Q.pop()
+        u = label // num_states
+        mask = label % num_states
+        if inclusion and dominated(buckets[u], mask, dist_e):
+            dominance.pruned_inclusion += 1
+            targets.pop(label, None)
+            continue
+        if h is not None and dist_e + h[u] > incumbent:
+            dominance.pruned_bound += 1
+            targets.pop(label, None)
+            continue
+        dominance.settled += 1
+        if label in targets:
+            targets.pop(label)
+            found.add(label)
+            if h is not None: break # the best target
+        for k in range(offsets[u], offsets[u+1]):
+            e = eids[k]
+            if mask & check[e] or not allowed[e]: continue
+            alt = dist_e + weights[e]
+            head = heads[k]
+            nm = mask | sets[e]
+            nl = head * num_states + nm
+            if alt < dist[nl]:
+                bucket = buckets.setdefault(head, {})
+                if inclusion and dominated(bucket, nm, alt):
+                    dominance.pruned_inclusion += 1
+                    continue
+                if h is not None and alt + h[head] > incumbent:
+                    dominance.pruned_bound += 1
+                    continue
+                if inclusion: insert(bucket, nm, alt)
+                if nl in targets and alt < incumbent: incumbent = alt
+                dominance.created += 1
+                dist[nl] = alt
+                prev[nl] = label
+                prev_edge[nl] = e
+                Q.push(nl, alt)
+    labels = [l if l in found else None for l in labels]
+    if output == "vpath": return trace_vpaths(prev, labels, num_states).tolist()
+    if output == "epath": return trace_epaths(prev, prev_edge, labels).tolist()
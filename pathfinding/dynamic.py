@@ -0,0 +1,197 @@
+# This module implements a dynamic single-source shortest path solver that
+# repairs its shortest path tree after edge weight changes instead of running
+# dijkstra from scratch (in the style of Ramalingam and Reps, 1996)
+# the solver keeps dist, prev (previous label) and prev_edge (edge from the
+# previous label) of every label, where a label is a vertex u, or an element
+# (u,a) encoded as u * 2**num_types + mask when a TransitionTable is given
+# (see pathfinding_extended.py and transitions.py)
+# after a batch of weight changes, update() does:
+# 1. the labels whose shortest path uses an edge whose weight increased, i.e.
+#    the subtrees of the shortest path tree below these edges, are affected
+#    and their distances are reset to infinity
+# 2. each affected label gets the best distance through its in-edges from the
+#    labels that are not affected, and is pushed into the queue
+# 3. each edge whose weight decreased is relaxed from the labels at its tail
+# 4. dijkstra runs from the queue and only settles the labels whose distance
+#    changes, hence the cost is proportional to the affected region
+# the weights must be non-negative
+
+import numpy as np
+from .csr import CSRGraph, as_csr
+from .queues import make_queue
+from .pathfinding import get_vpaths
+from .paths import trace_epaths
+from .pathfinding_extended import ActivityCodec, MAX_DENSE_LABELS, _SparseStore
+from .pathfinding_extended import get_vpaths as get_label_vpaths
+
+__author__ = "jeromethai"
+
+
+class DynamicSSSP(object):
+
+    def __init__(self, graph, v, weights='weight', table=None, queue="binary"):
+        # solves the shortest paths from v in graph (igraph or CSRGraph)
+        # weights is the name of the edge attribute or a list by edge id
+        # table is an optional TransitionTable, then the weights of the table
+        # are used and the labels are the elements (u,a) starting from (v,0)
+        self.table = table
+        graph = as_csr(graph, [] if table is not None else weights)
+        self.graph = graph
+        self.num_vs = graph.vcount()
+        self.out_lists = graph.lists()
+        # in-edges of each vertex for step 2
+        self.in_lists = CSRGraph(self.num_vs, graph.edge_sources, graph.edge_targets,
+            mode="IN").lists()
+        self.heads = graph.edge_targets.tolist()
+        if table is None:
+            self.weights = list(graph.attr_list(weights))
+            self.codec = ActivityCodec(0)
+        else:
+            weights, check, sets, allowed = table.lists()
+            self.weights = list(weights)
+            self.check, self.sets, self.allowed = check, sets, allowed
+            self.codec = ActivityCodec(table.num_types)
+        if len(self.weights) > 0: assert min(self.weights) >= 0.0
+        self.num_states = self.codec.num_states
+        self.queue = queue
+        num_labels = self.num_vs * self.num_states
+        if num_labels <= MAX_DENSE_LABELS:
+            self.dist = [np.inf] * num_labels
+            self.prev = [-1] * num_labels
+            self.prev_edge = [-1] * num_labels
+        else:
+            self.dist = _SparseStore(np.inf)
+            self.prev = _SparseStore(-1)
+            self.prev_edge = _SparseStore(-1)
+        self.source = v * self.num_states
+        self.dist[self.source] = 0.0
+        Q = make_queue(queue)
+        Q.push(self.source, 0.0)
+        self.num_settled = self.run(Q)
+
+
+    def out_transitions(self, label):
+        # returns the list of (eid, next label) of the edges leaving label
+        offsets, heads, eids = self.out_lists
+        S = self.num_states
+        u, mask = label // S, label % S
+        if self.table is None:
+            return [(eids[k], heads[k]) for k in range(offsets[u], offsets[u+1])]
+        check, sets, allowed = self.check, self.sets, self.allowed
+        return [(eids[k], heads[k] * S + (mask | sets[eids[k]]))
+            for k in range(offsets[u], offsets[u+1])
+            if allowed[eids[k]] and not mask & check[eids[k]]]
+
+
+    def in_transitions(self, label):
+        # returns the list of (eid, previous label) of the edges entering label
+        offsets, tails, eids = self.in_lists
+        S = self.num_states
+        x, mask = label // S, label % S
+        if self.table is None:
+            return [(eids[k], tails[k]) for k in range(offsets[x], offsets[x+1])]
+        out = []
+        for k in range(offsets[x], offsets[x+1]):
+            e = eids[k]
+            if not self.allowed[e]: continue
+            bits = self.sets[e]
+            # previous masks m such that m | bits == mask, allowed by check[e]
+            for m in set([mask, mask & ~bits]):
+                if m | bits == mask and not m & self.check[e]:
+                    out.append((e, tails[k] * S + m))
+        return out
+
+
+    def run(self, Q):
+        # dijkstra from the labels in Q, returns the number of settled labels
+        dist, prev, prev_edge, w = self.dist, self.prev, self.prev_edge, self.weights
+        num_settled = 0
+        while len(Q) > 0:
+            label, dist_l = Q.pop()
+            if dist_l > dist[label]: continue
+            num_settled += 1
+            for e, nl in self.out_transitions(label):
+                alt = dist_l + w[e]
+                if alt < dist[nl]:
+                    dist[nl] = alt
+                    prev[nl] = label
+                    prev_edge[nl] = e
+                    Q.push(nl, alt)
+        return num_settled
+
+
+    def update(self, eids, weights):
+        # sets the weights of the edges eids and repairs the shortest paths
+        # returns the number of labels settled by the repair
+        dist, prev, prev_edge, w = self.dist, self.prev, self.prev_edge, self.weights
+        S = self.num_states
+        increased, decreased = [], []
+        for e, weight in zip(eids, weights):
+            e, weight = int(e), float(weight)
+            if weight < 0.0: raise ValueError("weights must be non-negative")
+            if weight > w[e]: increased.append(e)
+            if weight < w[e]: decreased.append(e)
+            w[e] = weight
+        # 1. subtrees below the tree edges whose weight increased
+        stack = []
+        for e in increased:
+            head = self.heads[e] * S
+            stack += [l for l in range(head, head+S) if prev_edge[l] == e]
+        affected = set(stack)
+        while len(stack) > 0:
+            label = stack.pop()
+            for e, nl in self.out_transitions(label):
+                if prev_edge[nl] == e and prev[nl] == label and nl not in affected:
+                    affected.add(nl)
+                    stack.append(nl)
+        for label in affected:
+            dist[label] = np.inf
+            prev[label] = -1
+            prev_edge[label] = -1
+        # 2. best distance of the affected labels from the other labels
+        Q = make_queue(self.queue)
+        for label in affected:
+            for e, pl in self.in_transitions(label):
+                if pl in affected: continue
+                alt = dist[pl] + w[e]
+                if alt < dist[label]:
+                    dist[label] = alt
+                    prev[label] = pl
+                    prev_edge[label] = e
+            if dist[label] < np.inf: Q.push(label, dist[label])
+        # 3. edges whose weight decreased
+        for e in decreased:
+            tail = int(self.graph.edge_sources[e]) * S
+            for label in range(tail, tail+S):
+                if dist[label] == np.inf: continue
+                for f, nl in self.out_transitions(label):
+                    if f != e: continue
+                    alt = dist[label] + w[e]
+                    if alt < dist[nl]:
+                        dist[nl] = alt
+                        prev[nl] = label
+                        prev_edge[nl] = e
+                        Q.push(nl, alt)
+        # 4. propagate
+        self.num_settled = self.run(Q)
+        return self.num_settled
+
+
+    def distances(self, to):
+        # returns the distances to the vertices in to, or to the elements (u,a)
+        # in to if the solver has a TransitionTable
+        if self.table is None: return [self.dist[u] for u in to]
+        return [np.inf if l is None else self.dist[l] for l in self.codec.labels(to)]
+
+
+    def get_vpaths(self, to):
+        # returns the vertex paths to the vertices (or elements (u,a)) in to
+        # in the format of dijkstra() (resp. dijkstra_extended())
+        if self.table is None: return get_vpaths(self.prev, to)
+        return get_label_vpaths(self.prev, to, self.codec)
+
+
+    def get_epaths(self, to):
+        # returns the edge paths to the vertices (or elements (u,a)) in to
+        labels = to if self.table is None else self.codec.labels(to)
+        return trace_epaths(self.prev, self.prev_edge, labels).tolist()
@@ -0,0 +1,182 @@
+# This module enumerates several paths per source instead of the single
+# shortest path of each target label (u,a) of dijkstra_extended(), e.g. the
+# k best distinct schedules of an agent on the supernetwork or the Pareto set
+# of its schedules over (travel cost, reward)
+# k_shortest_extended(): Yen's algorithm on the labels (u,a) encoded as in
+# pathfinding_extended.py with the transitions of a TransitionTable, see
+# Yen, Finding the K Shortest Loopless Paths in a Network, 1971
+# the paths end at any of the target labels, the (i+1)-th path deviates from
+# the i-th at a spur label: the prefix up to the spur (root) is kept and a
+# dijkstra from the spur (spur search) avoids the labels of the root and the
+# edges leaving the spur on the accepted paths with the same root
+# the candidates are kept in a heap bounded by the number of paths still
+# needed and the enumeration stops as soon as k paths are accepted
+# pareto_layered(): bi-criteria label-setting on a time-expanded network
+# (see pathfinding_layered.py), the label (u,a) holds a bucket of entries
+# (c1, c2) none of which dominates another, where (c1, c2) dominates (d1, d2)
+# if c1 <= d1 and c2 <= d2, the time slices are processed in order and the
+# entries of a slice are popped in lexicographic order of (c1, c2), hence an
+# entry is not dominated iff its c2 is lower than the c2 of all the entries
+# of its bucket popped before, which is an O(1) test
+# the criteria within a time slice must be >= 0 (e.g. travel times and 0 for
+# the reward), the edges going forward in time can have any criteria
+# example:
+# paths = k_shortest_extended(g, home, targets, table, k=5, output="epath")
+# front = pareto_layered(g, home, [to], table, num_nodes, (travel, loss))
+
+import heapq as hq
+import numpy as np
+from .csr import as_csr
+from .queues import make_queue
+from .pathfinding_extended import ActivityCodec
+from .pathfinding_layered import edge_directions
+
+__author__ = "jeromethai"
+
+
+def k_shortest_extended(graph, v, to, table, k, output="vpath", queue="binary"):
+    # returns the list of the (at most) k shortest loopless paths from v with
+    # a = (0,...,0) to any of the targets [(u,a)] in to, as (cost, a, path)
+    # sorted by cost where a is the activity counter of the target and path
+    # is a list of vertex ids or edge ids (output "epath")
+    # table is a TransitionTable whose weights are >= 0
+    graph = as_csr(graph, [])
+    lists = graph.lists()
+    transitions = table.lists()
+    weights = transitions[0]
+    codec = ActivityCodec(table.num_types)
+    num_states = codec.num_states
+    targets = set(l for l in codec.labels(to) if l is not None)
+    first = _spur_search(lists, transitions, num_states, v * num_states, 0.0,
+        targets, set(), set(), queue)
+    if first is None or k <= 0: return []
+    accepted = [first] # (cost, labels, edges)
+    candidates = [] # heap of (cost, edges, labels)
+    seen = set([tuple(first[2])])
+    while len(accepted) < k:
+        cost, labels, edges = accepted[-1]
+        root_cost = 0.0
+        for i in range(len(labels)-1):
+            root = labels[:i+1]
+            blocked_edges = set(p[2][i] for p in accepted if p[1][:i+1] == root)
+            spur = _spur_search(lists, transitions, num_states, labels[i], root_cost,
+                targets, set(root[:-1]), blocked_edges, queue)
+            root_cost += weights[edges[i]]
+            if spur is None: continue
+            path = tuple(edges[:i] + spur[2])
+            if path in seen: continue
+            seen.add(path)
+            hq.heappush(candidates, (spur[0], path, labels[:i] + spur[1]))
+        # only the best k - len(accepted) candidates can still be accepted
+        if len(candidates) > k - len(accepted):
+            candidates = hq.nsmallest(k - len(accepted), candidates)
+            hq.heapify(candidates)
+        if len(candidates) == 0: break
+        cost, edges, labels = hq.heappop(candidates)
+        accepted.append((cost, labels, list(edges)))
+    return [(cost, codec.decode(labels[-1] % num_states),
+        edges if output == "epath" else [l // num_states for l in labels])
+        for cost, labels, edges in accepted]
+
+
+def _spur_search(lists, transitions, num_states, source, cost, targets, blocked,
+    blocked_edges, queue="binary"):
+    # dijkstra on the labels from source at distance cost to the first target
+    # popped, without the labels in blocked and the edges in blocked_edges
+    # leaving source, returns (cost, labels, edges) of the path or None
+    offsets, heads, eids = lists
+    weights, check, sets, allowed = transitions
+    dist, prev, prev_edge = {source: cost}, {source: -1}, {source: -1}
+    Q = make_queue(queue)
+    Q.push(source, cost)
+    while len(Q) > 0:
+        label, dist_e = Q.pop()
+        if label in targets:
+            labels, edges = [], []
+            while label != -1:
+                labels.append(label)
+                edges.append(prev_edge[label])
+                label = prev[label]
+            return dist_e, labels[::-1], edges[-2::-1]
+        u = label // num_states
+        mask = label % num_states
+        for k in range(offsets[u], offsets[u+1]):
+            e = eids[k]
+            if mask & check[e] or not allowed[e]: continue
+            if label == source and e in blocked_edges: continue
+            nl = heads[k] * num_states + (mask | sets[e])
+            if nl in blocked: continue
+            alt = dist_e + weights[e]
+            if alt < dist.get(nl, np.inf):
+                dist[nl] = alt
+                prev[nl] = label
+                prev_edge[nl] = e
+                Q.push(nl, alt)
+    return None
+
+
+def pareto_layered(graph, v, to, table, num_nodes, criteria, output="epath",
+    queue="binary"):
+    # returns the Pareto set of the paths from v with a = (0,...,0) to the
+    # vertices in to (with any activity counter) on a time-expanded network
+    # with num_nodes vertices per time slice, see the beginning of file
+    # criteria = (c1, c2) are two lists of costs by edge id
+    # table is a TransitionTable (its weights are not used)
+    # returns the list of (c1, c2, a, path) sorted by c1 where a is the
+    # activity counter at the end of the path
+    graph = as_csr(graph, [])
+    offsets, heads, eids = graph.lists()
+    forward = edge_directions(graph, num_nodes).tolist()
+    c1, c2 = [np.asarray(c, dtype=np.float64) for c in criteria]
+    intra = np.logical_not(forward)
+    if np.any(c1[intra] < 0.0) or np.any(c2[intra] < 0.0):
+        raise ValueError("criteria within a time slice must be >= 0")
+    c1, c2 = c1.tolist(), c2.tolist()
+    weights, check, sets, allowed = table.lists()
+    codec = ActivityCodec(table.num_types)
+    num_states = codec.num_states
+    num_steps = -(-graph.vcount() // num_nodes)
+    # entries[j] = (label, c1, c2, parent entry, edge), bucket[label] is the
+    # least c2 of the entries of the label popped so far
+    entries = [(v * num_states, 0.0, 0.0, -1, -1)]
+    bucket = {}
+    reached = [[] for i in range(num_steps)] # entries pushed into each slice
+    reached[v // num_nodes].append(0)
+    targets = set(to)
+    found = []
+    for i in range(num_steps):
+        if len(reached[i]) == 0: continue
+        Q = make_queue(queue)
+        for j in reached[i]: Q.push(j, entries[j][1:3])
+        while len(Q) > 0:
+            j, (x1, x2) = Q.pop()
+            label = entries[j][0]
+            if x2 >= bucket.get(label, np.inf): continue # dominated
+            bucket[label] = x2
+            u = label // num_states
+            mask = label % num_states
+            if u in targets: found.append(j)
+            for k in range(offsets[u], offsets[u+1]):
+                e = eids[k]
+                if mask & check[e] or not allowed[e]: continue
+                nl = heads[k] * num_states + (mask | sets[e])
+                y1, y2 = x1 + c1[e], x2 + c2[e]
+                if y2 >= bucket.get(nl, np.inf): continue # dominated
+                entries.append((nl, y1, y2, j, e))
+                if forward[e]:
+                    reached[heads[k] // num_nodes].append(len(entries)-1)
+                else:
+                    Q.push(len(entries)-1, (y1, y2))
+    # Pareto set over all the target labels
+    front, best = [], np.inf
+    for j in sorted(found, key=lambda j: entries[j][1:3]):
+        label, x1, x2 = entries[j][:3]
+        if x2 >= best: continue
+        best = x2
+        path, p = [], j
+        while entries[p][3] != -1:
+            path.append(entries[p][4] if output == "epath" else entries[p][0] // num_states)
+            p = entries[p][3]
+        if output != "epath": path.append(v)
+        front.append((x1, x2, codec.decode(label % num_states), path[::-1]))
+    return front
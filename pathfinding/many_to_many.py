@@ -0,0 +1,134 @@
+# This module computes the matrix of the shortest path distances from a list
+# of sources to a list of targets, e.g. the zone-to-zone skims of the networks
+# D[i,j] is the distance from sources[i] to targets[j], np.inf if not reachable
+# the methods are
+# "sssp": one dijkstra per source with ShortestPathSolver (see pathfinding.py)
+#         that stops when all the targets are settled
+# "floyd": Floyd-Warshall on the dense matrix of the graph, each pivot k is a
+#          min-plus update D = min(D, D[:,k] + D[k,:]) done with numpy on blocks
+#          of rows, for small graphs since the matrix has num_vs**2 entries
+# "buckets": many-to-many with a contraction hierarchy (see contraction.py),
+#            the backward upward search of each target t leaves (t, dist) in
+#            the bucket of each vertex it reaches, then the forward upward
+#            search of each source s gives D[s,t] = min over the vertices u of
+#            its search space of dist(s,u) + dist(u,t) read in the buckets
+# "auto" selects "floyd" for graphs of at most MAX_FLOYD_VERTICES vertices and
+# "buckets" otherwise
+# the rows are computed by chunks of chunk sources and, if out is a filename,
+# written to a memory-mapped .npy file, hence only one chunk of rows is in
+# memory (besides the dense matrix of "floyd")
+# example:
+# D = distance_matrix(g, weights='weight', out='/tmp/chicago_skim.npy')
+
+import numpy as np
+from .csr import as_csr
+from .pathfinding import ShortestPathSolver, get_weights
+from .contraction import ContractionHierarchy
+
+__author__ = "jeromethai"
+
+
+MAX_FLOYD_VERTICES = 1024
+
+
+def distance_matrix(graph, sources=None, targets=None, weights=None, method="auto",
+    out=None, chunk=256, hierarchy=None, queue="binary"):
+    # returns the matrix D of shape (len(sources), len(targets)) described at
+    # the beginning of file, sources and targets are all the vertices if None
+    # out is an optional filename of the .npy file of D, then D is a memmap
+    # hierarchy is an optional ContractionHierarchy of the graph for "buckets"
+    graph = as_csr(graph, weights)
+    num_vs = graph.vcount()
+    sources = np.arange(num_vs) if sources is None else np.asarray(sources, dtype=np.int64)
+    targets = np.arange(num_vs) if targets is None else np.asarray(targets, dtype=np.int64)
+    if method == "auto": method = "floyd" if num_vs <= MAX_FLOYD_VERTICES else "buckets"
+    if method == "sssp":
+        rows = sssp_rows(graph, sources, targets, weights, chunk, queue)
+    elif method == "floyd":
+        rows = floyd_rows(graph, sources, targets, weights, chunk)
+    elif method == "buckets":
+        if hierarchy is None:
+            hierarchy = ContractionHierarchy.build(graph, weights, queue=queue)
+        rows = bucket_rows(hierarchy, sources, targets, chunk)
+    else:
+        raise ValueError("unknown method %s" % method)
+    shape = (len(sources), len(targets))
+    if out is None:
+        D = np.empty(shape)
+    else:
+        D = np.lib.format.open_memmap(out, mode='w+', dtype=np.float64, shape=shape)
+    for i, block in rows: D[i:i+len(block)] = block
+    if out is not None: D.flush()
+    return D
+
+
+def sssp_rows(graph, sources, targets, weights=None, chunk=256, queue="binary"):
+    # generator of (i, rows i:i+chunk of D) with one dijkstra per source
+    solver = ShortestPathSolver(graph, weights, queue=queue)
+    to = targets.tolist()
+    for i in range(0, len(sources), chunk):
+        block = np.empty((len(sources[i:i+chunk]), len(to)))
+        for r, s in enumerate(sources[i:i+chunk].tolist()):
+            solver.solve(s, to, output=None)
+            block[r] = solver.distances(to)
+        yield i, block
+
+
+def floyd_warshall(graph, weights=None, block=256):
+    # returns the dense matrix of the distances between all the vertices
+    num_vs = graph.vcount()
+    w = get_weights(graph, weights)
+    D = np.full((num_vs, num_vs), np.inf)
+    np.minimum.at(D, (graph.edge_sources, graph.edge_targets),
+        1.0 if w is None else np.asarray(w, dtype=np.float64))
+    np.fill_diagonal(D, 0.0)
+    for k in range(num_vs):
+        # row k and column k do not change during pivot k since D[k,k] = 0
+        row = D[k]
+        for i in range(0, num_vs, block):
+            rows = D[i:i+block]
+            np.minimum(rows, rows[:, k, None] + row, out=rows)
+    return D
+
+
+def floyd_rows(graph, sources, targets, weights=None, chunk=256):
+    # generator of (i, rows i:i+chunk of D) with Floyd-Warshall
+    D = floyd_warshall(graph, weights)
+    for i in range(0, len(sources), chunk):
+        yield i, D[np.ix_(sources[i:i+chunk], targets)]
+
+
+def bucket_rows(hierarchy, sources, targets, chunk=256):
+    # generator of (i, rows i:i+chunk of D) with the buckets of a
+    # ContractionHierarchy, the buckets are stored in CSR format by vertex
+    # the forward search spaces of a chunk of sources are grouped by vertex
+    # too, then each vertex u updates the block of its sources and targets
+    # with D[s,t] = min(D[s,t], dist(s,u) + dist(u,t)) in one numpy operation
+    columns, dists, offsets = buckets(hierarchy, targets, backward=True)
+    for i in range(0, len(sources), chunk):
+        rows, fdists, foffsets = buckets(hierarchy, sources[i:i+chunk])
+        block = np.full((len(sources[i:i+chunk]), len(targets)), np.inf)
+        for u in np.flatnonzero(np.diff(foffsets) * np.diff(offsets)).tolist():
+            f, b = slice(foffsets[u], foffsets[u+1]), slice(offsets[u], offsets[u+1])
+            index = np.ix_(rows[f], columns[b])
+            block[index] = np.minimum(block[index], fdists[f, None] + dists[None, b])
+        yield i, block
+
+
+def buckets(hierarchy, vertices, backward=False):
+    # returns (index, dists, offsets) of the upward search spaces of the
+    # vertices in CSR format by vertex u of the hierarchy, i.e. the entries
+    # offsets[u]:offsets[u+1] are the positions index of the vertices whose
+    # search space contains u and the distances dists between them and u
+    us, index, dists = [], [], []
+    for j, v in enumerate(vertices.tolist()):
+        space = hierarchy.search_space(v, backward)
+        us.extend(space.keys())
+        index.extend([j] * len(space))
+        dists.extend(space.values())
+    us = np.asarray(us, dtype=np.int64)
+    order = np.argsort(us, kind='mergesort')
+    offsets = np.zeros(hierarchy.num_vs+1, dtype=np.int64)
+    np.cumsum(np.bincount(us, minlength=hierarchy.num_vs), out=offsets[1:])
+    return np.asarray(index, dtype=np.int64)[order], \
+        np.asarray(dists, dtype=np.float64)[order], offsets
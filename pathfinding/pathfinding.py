@@ -1,134 +1,132 @@
 # This module implements some pathfinding algorithms
 import numpy as np
-import heapq as hq
+from .csr import as_csr
+from .queues import make_queue
+from .paths import trace_vpaths, trace_epaths
 
 __author__ = "jeromethai"
 
 
-def dijkstra(graph, v, to=None, weights=None, mode="OUT", output="vpath"):
+def dijkstra(graph, v, to=None, weights=None, mode="OUT", output="vpath",
+    queue="linear"):
     # simple python implementation of the get_shortest_paths() from igraph
     # https://pythonhosted.org/python-igraph/igraph.GraphBase-class.html#get_shortest_paths
     # check: http://en.wikipedia.org/wiki/Dijkstra%27s_algorithm
-    num_vs = graph.vcount()
-    dist = np.array([np.inf] * num_vs)
-    dist[v] = 0.0
-    prev = [-1] * num_vs
-    Q = {v: 0.0} # set of visited neighbors
-    if to is None: to = range(num_vs)
-    targets = dict.fromkeys(to,None) # set of target vertices
-
-    while len(Q) > 0 and len(targets) > 0:
-        u = min(Q, key=Q.get) # Get key with the least value from Q
-        dist_u = Q.pop(u) # pop key and get value
-        if u in targets.keys(): targets.pop(u)
-        for neighbor in graph.neighbors(u, mode="out"):
-            if weights is None: 
-                weight = 1.0
-            else:
-                weight = graph.es[graph.get_eid(u, neighbor)][weights]
-                assert weight >= 0.0
-            alt = dist_u + weight
-            if alt < dist[neighbor]:
-                dist[neighbor] = alt
-                prev[neighbor] = u
-                Q[neighbor] = alt
-    if output == "vpath": return get_vpaths(prev, to)
-    if output == "epath": return get_epaths(graph, prev, to)
-
-
-def dijkstra_with_heap(graph, v, to=None, weights=None, mode="OUT", output="vpath"):
+    # graph is either an igraph or a CSRGraph compiled from it (see csr.py)
+    # queue is the priority queue of visited neighbors (see queues.py)
+    # to run many queries on the same graph, use ShortestPathSolver directly
+    solver = ShortestPathSolver(graph, weights, mode, queue)
+    return solver.solve(v, to, output)
+
+
+class ShortestPathSolver(object):
+    # dijkstra() bound to a graph that owns the buffers dist, prev and prev_edge
+    # of all the vertices, they are allocated once and a query only resets the
+    # entries touched by the previous query, hence back-to-back queries cost
+    # O(visited part of the graph) instead of O(V) of initialization
+    # example:
+    # solver = ShortestPathSolver(g, weights='weight', queue="binary")
+    # for v in sources: paths = solver.solve(v, to=[4,5,6])
+
+    def __init__(self, graph, weights=None, mode="OUT", queue="binary"):
+        self.graph = as_csr(graph, weights, mode)
+        self.num_vs = self.graph.vcount()
+        self.lists = self.graph.lists()
+        self.w = get_weights(self.graph, weights)
+        self.queue = queue
+        self.dist = [np.inf] * self.num_vs
+        self.prev = [-1] * self.num_vs
+        self.prev_edge = [-1] * self.num_vs # edge from prev[u] to u
+        self.target = [0] * self.num_vs # target[u] == query if u is a target
+        self.touched = [] # vertices whose dist is finite
+        self.query = 0 # number of queries
+
+
+    def reset(self):
+        # resets the entries touched by the previous query
+        dist, prev, prev_edge = self.dist, self.prev, self.prev_edge
+        for u in self.touched:
+            dist[u] = np.inf
+            prev[u] = -1
+            prev_edge[u] = -1
+        self.touched = []
+
+
+    def solve(self, v, to=None, output="vpath"):
+        # shortest paths from v to the vertices in to (all the vertices if None)
+        # output is "vpath" or "epath" as in dijkstra(), or None to only
+        # compute dist, prev and prev_edge (valid until the next query)
+        self.reset()
+        self.query += 1
+        query, target = self.query, self.target
+        offsets, heads, eids = self.lists
+        w = self.w
+        dist, prev, prev_edge, touched = self.dist, self.prev, self.prev_edge, self.touched
+        dist[v] = 0.0
+        touched.append(v)
+        Q = make_queue(self.queue) # set of visited neighbors
+        Q.push(v, 0.0)
+        if to is None: to = range(self.num_vs)
+        remaining = 0 # number of target vertices not popped yet
+        for u in to:
+            if target[u] != query:
+                target[u] = query
+                remaining += 1
+
+        while len(Q) > 0 and remaining > 0:
+            u, dist_u = Q.pop() # pop vertex with the least value from Q
+            if target[u] == query:
+                target[u] = 0
+                remaining -= 1
+            for k in range(offsets[u], offsets[u+1]):
+                neighbor = heads[k]
+                alt = dist_u + (1.0 if w is None else w[eids[k]])
+                if alt < dist[neighbor]:
+                    if dist[neighbor] == np.inf: touched.append(neighbor)
+                    dist[neighbor] = alt
+                    prev[neighbor] = u
+                    prev_edge[neighbor] = eids[k]
+                    Q.push(neighbor, alt) # insert or decrease-key
+        if output == "vpath": return get_vpaths(prev, to)
+        if output == "epath": return get_epaths(prev, prev_edge, to)
+
+
+    def distances(self, to=None):
+        # distances of the last query to the vertices in to
+        if to is None: to = range(self.num_vs)
+        return [self.dist[u] for u in to]
+
+
+def dijkstra_with_heap(graph, v, to=None, weights=None, mode="OUT", output="vpath",
+    queue="binary"):
     # improve implementation of dijkstra() with heap (or priority queue)
     # https://pythonhosted.org/python-igraph/igraph.GraphBase-class.html#get_shortest_paths
     # check: http://en.wikipedia.org/wiki/Dijkstra%27s_algorithm
-    num_vs = graph.vcount()
-    dist = np.array([np.inf] * num_vs)
-    dist[v] = 0.0
-    prev = [-1] * num_vs
-    Q = {v: 0.0} # set of visited neighbors
-    h = []
-    hq.heappush(h, (0.0, v))
-    if to is None: to = range(num_vs)
-    targets = dict.fromkeys(to,None) # set of target vertices
-
-
-    while len(Q) > 0 and len(targets) > 0:
-        u = hq.heappop(h)[1]
-        dist_u = Q.pop(u) # pop key and get value
-        if u in targets.keys(): targets.pop(u)
-        for neighbor in graph.neighbors(u, mode="out"):
-            if weights is None: 
-                weight = 1.0
-            else:
-                weight = graph.es[graph.get_eid(u, neighbor)][weights]
-                assert weight >= 0.0
-            alt = dist_u + weight
-            if alt < dist[neighbor]:
-                prev[neighbor] = u
-                Q[neighbor] = alt
-                # update heap
-                if dist[neighbor] == np.inf: # insert vertex
-                    hq.heappush(h, (alt, neighbor))
-                else: # to update vertex, have to reconstruct heap
-                    h = []
-                    for key,value in Q.items(): hq.heappush(h, (value, key))
-                dist[neighbor] = alt
-
-    if output == "vpath": return get_vpaths(prev, to)
-    if output == "epath": return get_epaths(graph, prev, to)
+    # the default is a binary heap with lazy deletion, an update of the
+    # distance of a vertex costs O(log n) instead of rebuilding the heap
+    return dijkstra(graph, v, to, weights, mode, output, queue)
+
+
+def get_weights(graph, weights=None):
+    # returns the weights of the edges of the CSRGraph as a list by edge id
+    # or None if the graph is unweighted (each edge has weight 1.0)
+    w = graph.attr_list(weights)
+    if w is not None and len(w) > 0: assert min(w) >= 0.0
+    return w
 
 
 def get_vpaths(prev, to=None):
     # if output == "vpath"
     # returns list of vertex IDs, one path for each target vertex
-    # executed in dijkstra(ouput=="vpath")
-    vpaths = {} # constructed vpaths
-    for u in to:
-        if u in vpaths.keys() or prev[u] == -1: continue # found path or u unreachable
-        previous = prev[u]
-        vpath = [u]
-        while previous >= 0 and previous not in vpaths.keys():
-            vpath.append(previous)
-            previous = prev[previous]
-        if previous in vpaths.keys(): vpath += vpaths[previous] # found subpath
-        vpaths[u] = vpath # add it the constructed vpaths
-        for i in range(1, len(vpath)-1): # add all subpaths to constructed paths
-            if vpath[i] not in vpaths.keys():
-                vpaths[vpath[i]] = vpath[i:]
-            else: break
-    out = []
-    for u in to:
-        if u in vpaths.keys(): 
-            out.append(vpaths[u][::-1])
-        else: 
-            out.append([])
-    return out
-
-
-def get_epaths(graph, prev, to=None):
-    # if output == "vpath" (resp. "epath")
-    # returns list of vertex (resp. edge) IDs, one path for each target vertex
-    # executed in dijkstra(ouput=="vpath") (resp. dijkstra(ouput=="epath"))
-    epaths = {} # constructed paths
-    for u in to:
-        if u in epaths.keys() or prev[u] == -1: continue # found path or u unreachable
-        previous = u
-        epath, vpath = [], []
-        while previous not in epaths.keys():
-            tmp = previous
-            previous = prev[previous]
-            if previous == -1: break
-            epath.append(graph.get_eid(previous, tmp))
-            vpath.append(tmp)
-        if previous in epaths.keys(): epath += epaths[previous] # found subpath
-        epaths[u] = epath # add it the constructed paths
-        for i in range(1, len(vpath)-1): # add all subpaths to constructed paths
-            if vpath[i] not in epaths.keys():
-                epaths[vpath[i]] = epath[i:]
-            else: break
-    out = []
-    for u in to:
-        if u in epaths.keys(): 
-            out.append(epaths[u][::-1])
-        else: 
-            out.append([])
-    return out
+    # executed in dijkstra(ouput=="vpath"), see paths.py
+    if to is None: to = range(len(prev))
+    return trace_vpaths(prev, to).tolist()
+
+
+def get_epaths(prev, prev_edge, to=None):
+    # if output == "epath"
+    # returns list of edge IDs, one path for each target vertex
+    # prev_edge[u] is the edge from prev[u] to u recorded during the search
+    # executed in dijkstra(ouput=="epath"), see paths.py
+    if to is None: to = range(len(prev))
+    return trace_epaths(prev, prev_edge, to).tolist()
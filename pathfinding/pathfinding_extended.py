@@ -23,65 +23,288 @@
 #             Q(n,an) = alt
 
 import numpy as np
+from .csr import as_csr
+from .queues import make_queue
+from .transitions import TransitionTable
+from .time_expanded import TimeExpandedGraph
+from .paths import trace_vpaths, trace_epaths
 
 __author__ = "jeromethai"
 
 
-def dijkstra_extended(graph, v, to, modifier, mode="OUT", output="vpath"):
+# Implementation notes:
+# with a TransitionTable, the activity counters a are 0/1 vectors encoded as
+# bitmasks m = sum(a[i] << i) and the element (u,a) is encoded as the label
+# u * 2**num_types + m
+# with a callable modifier, the counters can be any tuples, e.g. a=(2,1,...)
+# above, and the elements (u,a) are numbered as they are reached, see
+# dijkstra_counters()
+# dist, prev and prev_edge are dense arrays indexed by labels when there are
+# at most MAX_DENSE_LABELS labels, and sparse dictionaries otherwise
+# prev_edge[label] is the id of the edge relaxed from prev[label] to label
+# hence the edge paths (output == "epath") are read without graph.get_eid()
+# Q is a heap of labels (see queues.py)
+
+MAX_DENSE_LABELS = 10**7
+
+
+def dijkstra_extended(graph, v, to, modifier, mode="OUT", output="vpath",
+    queue="binary"):
     # extension of dijkstra algorithm described at the beginning of file
     # v is a start vertex with a = (0,...,0)
     # to is a list of targets [(u,a)] with u the vertex and a the activity counter
+    # queue is the priority queue of visited elements (see queues.py)
+    # graph is either an igraph or a CSRGraph compiled from it (see csr.py)
+    # modifier is either a callable as described at the beginning of file
+    # or a TransitionTable (see transitions.py) which is much faster
+    # graph can also be a TimeExpandedGraph (see time_expanded.py)
+    if isinstance(graph, TimeExpandedGraph):
+        if mode.upper() != "OUT": raise ValueError("TimeExpandedGraph only supports mode OUT")
+        return dijkstra_time_expanded(graph, v, to, modifier, output, queue)
+    table = isinstance(modifier, TransitionTable)
+    graph = as_csr(graph, [] if table else None, mode)
+    offsets, heads, eids = graph.lists()
+    if not table:
+        out_edges = lambda u: eids[offsets[u]:offsets[u+1]]
+        return dijkstra_counters(graph, v, to, modifier, out_edges, output, queue)
     num_vs = graph.vcount()
-    num_types = modifier()
-    zero_tuple = tuple([0]*num_types)
-    dist = [{} for i in range(num_vs)]
-    dist[v][zero_tuple] = 0.0 # dist[v] = {a: dist} with a the activity counter
-    prev = [{} for i in range(num_vs)]
-    prev[v][zero_tuple] = -1 # prev[v] = {a: previous} with a the activity counter
-    Q = {(v, zero_tuple): 0.0} # set of visited neighbors
-    targets = dict.fromkeys(to,None) # set of target vertices
+    num_types = modifier.num_types
+    weights, check, sets, allowed = modifier.lists()
+    codec = ActivityCodec(num_types)
+    num_states = codec.num_states
+    dist, prev, prev_edge = label_store(num_vs * num_states)
+    dist[v * num_states] = 0.0 # dist[label] with label = u*num_states + mask
+    Q = make_queue(queue) # set of visited labels
+    Q.push(v * num_states, 0.0)
+    targets = dict.fromkeys(codec.labels(to)) # set of target labels
+    targets.pop(None, None) # remove targets with counters that are not 0/1
+
+    while len(Q) > 0 and len(targets) > 0:
+        label, dist_e = Q.pop() # pop label of e=(u,a) with the least value
+        if label in targets: targets.pop(label)
+        u = label // num_states
+        # transitions are bit operations on the mask of the label
+        mask = label % num_states
+        for k in range(offsets[u], offsets[u+1]):
+            e = eids[k]
+            if mask & check[e] or not allowed[e]: continue
+            alt = dist_e + weights[e]
+            nl = heads[k] * num_states + (mask | sets[e])
+            if alt < dist[nl]:
+                dist[nl] = alt
+                prev[nl] = label
+                prev_edge[nl] = e
+                Q.push(nl, alt)
+    if output == "vpath": return get_vpaths(prev, to, codec)
+    if output == "epath": return get_epaths(prev, prev_edge, to, codec)
+
+
+def dijkstra_time_expanded(graph, v, to, modifier, output="vpath", queue="binary"):
+    # same as dijkstra_extended() on a TimeExpandedGraph whose road edges are
+    # generated on the fly from the base network and the weights of the slices
+    # and whose activity records are expanded into activity edges on the fly
+    # if modifier is a TransitionTable, it describes the extra edges and the
+    # records of the graph, see TimeExpandedGraph.transition_table()
+    if not isinstance(modifier, TransitionTable):
+        out_edges = lambda u: [eid for eid, head in graph.out_edges(u)]
+        return dijkstra_counters(graph, v, to, modifier, out_edges, output, queue)
+    num_nodes = graph.num_nodes
+    base_offsets, base_heads, links = graph.base.lists()
+    extra_offsets, extra_heads, extra_eids = graph.extra.lists()
+    num_extra = graph.extra.ecount()
+    num_links, num_roads, num_fixed = graph.num_links, graph.num_roads, graph.num_fixed
+    record_first, record_offsets = graph.record_first, graph.record_offsets
+    records, records_at, shift = graph.records, graph.records_at, graph.shift
+    weights, check, sets, allowed = modifier.lists()
+    if len(weights) != num_extra + len(records):
+        raise ValueError("the transition table does not describe the extra edges")
+    codec = ActivityCodec(modifier.num_types)
+    num_states = codec.num_states
+    dist, prev, prev_edge = label_store(graph.vcount() * num_states)
+    dist[v * num_states] = 0.0
+    Q = make_queue(queue)
+    Q.push(v * num_states, 0.0)
+    targets = dict.fromkeys(codec.labels(to))
+    targets.pop(None, None)
 
     while len(Q) > 0 and len(targets) > 0:
-        e = min(Q, key=Q.get) # Get element e=(u,a) with the least value from Q
-        dist_e = Q.pop(e) # pop key and get value
-        if e in targets.keys(): targets.pop(e)
-        for nv in graph.neighbors(e[0], mode="out"):
-            edge = graph.es[graph.get_eid(e[0], nv)]
-            weight, ne = modifier(edge, e[1]) # ne = (nv, nva)
+        label, dist_e = Q.pop()
+        if label in targets: targets.pop(label)
+        u = label // num_states
+        mask = label % num_states
+        # road edges of the slice never modify the mask
+        node, i = u % num_nodes, u // num_nodes
+        road = graph.slice_weights(i)
+        offset = i * num_nodes
+        first = i * num_links # edge id of link 0 in slice i
+        for k in range(base_offsets[node], base_offsets[node+1]):
+            alt = dist_e + road[links[k]]
+            nl = (base_heads[k] + offset) * num_states + mask
+            if alt < dist[nl]:
+                dist[nl] = alt
+                prev[nl] = label
+                prev_edge[nl] = first + links[k]
+                Q.push(nl, alt)
+        for k in range(extra_offsets[u], extra_offsets[u+1]):
+            e = extra_eids[k]
+            if mask & check[e] or not allowed[e]: continue
+            alt = dist_e + weights[e]
+            nl = extra_heads[k] * num_states + (mask | sets[e])
+            if alt < dist[nl]:
+                dist[nl] = alt
+                prev[nl] = label
+                prev_edge[nl] = num_roads + e
+                Q.push(nl, alt)
+        s = i + 1 # activities of the records start at slice s
+        for r in records_at[node]:
+            type_edge, reward, deprecation, start, end, min_time, max_time = \
+                records[r][1:]
+            if s < start or s > end - min_time: continue
+            e = num_extra + r
+            if mask & check[e] or not allowed[e]: continue
+            nm = mask | sets[e]
+            # edge id of the activity ending at slice t is first + t
+            first = num_fixed + int(record_first[r] + record_offsets[r][s-start]) \
+                - s - min_time
+            # same weights as activity_reward() and the shift
+            base_reward = reward*min_time
+            for t in range(s+min_time, min(s+max_time, end)+1):
+                alt = dist_e + (-(base_reward + reward*(t-s-min_time)) + (1+t-s)*shift)
+                nl = (node + t*num_nodes) * num_states + nm
+                if alt < dist[nl]:
+                    dist[nl] = alt
+                    prev[nl] = label
+                    prev_edge[nl] = first + t
+                    Q.push(nl, alt)
+    if output == "vpath": return get_vpaths(prev, to, codec)
+    if output == "epath": return get_epaths(prev, prev_edge, to, codec)
+
+
+def dijkstra_counters(graph, v, to, modifier, out_edges, output="vpath", queue="binary"):
+    # same as dijkstra_extended() with a callable modifier whose counters a
+    # can be any tuples (e.g. the number of traversals of each type), the
+    # elements (u,a) are numbered by a CounterCodec as they are reached and
+    # dist, prev and prev_edge are sparse dictionaries indexed by these labels
+    # out_edges(u) returns the ids of the out-edges of vertex u
+    edges = graph.es
+    codec = CounterCodec()
+    dist, prev, prev_edge = _SparseStore(np.inf), _SparseStore(-1), _SparseStore(-1)
+    source = codec.label(v, tuple([0]*modifier()))
+    dist[source] = 0.0
+    Q = make_queue(queue)
+    Q.push(source, 0.0)
+    targets = dict.fromkeys(to) # set of target elements
+
+    while len(Q) > 0 and len(targets) > 0:
+        label, dist_e = Q.pop()
+        u, a = codec.elements[label]
+        targets.pop((u, a), None)
+        for e in out_edges(u):
+            weight, ne = modifier(edges[e], a) # ne = (nv, nva)
             if weight == np.inf: continue
             alt = dist_e + weight
-            if ne[1] not in dist[ne[0]].keys() or alt < dist[ne[0]][ne[1]]:
-                dist[ne[0]][ne[1]] = alt
-                prev[ne[0]][ne[1]] = e
-                Q[ne] = alt
-    if output == "vpath": return get_vpaths(prev, to)
-    if output == "epath": pass
-
-
-def get_vpaths(prev, to):
-    vpaths = {} # constructed vpaths
-    for e in to:
-        if e[1] not in prev[e[0]].keys() or e in vpaths.keys() or prev[e[0]][e[1]]==-1: 
-            continue
-        previous  = prev[e[0]][e[1]]
-        vpath = [e]
-        while previous != -1 and previous not in vpaths.keys():
-            vpath.append(previous)
-            previous = prev[previous[0]][previous[1]]
-        if previous in vpaths.keys(): vpath += vpaths[previous]
-        vpaths[e] = vpath
-        for i in range(1, len(vpath)-1):
-            if vpath[i] not in vpaths.keys():
-                vpaths[vpath[i]] = vpath[i:]
-            else: break
-    out = []
-    for e in to:
-        if e in vpaths.keys():
-            # out.append(vpaths[e][::-1])
-            out.append([i[0] for i in vpaths[e][::-1]])
-        else:
-            out.append([])
-    return out
+            nl = codec.label(*ne)
+            if alt < dist[nl]:
+                dist[nl] = alt
+                prev[nl] = label
+                prev_edge[nl] = e
+                Q.push(nl, alt)
+    labels = codec.labels(to)
+    if output == "vpath":
+        vertices = codec.vertices()
+        return [[vertices[l] for l in path] for path in trace_vpaths(prev, labels)]
+    if output == "epath": return trace_epaths(prev, prev_edge, labels).tolist()
+
+
+class CounterCodec(object):
+    # numbers the elements (u,a) of dijkstra_counters() in the order they are
+    # reached, a can be any hashable counter
+
+    def __init__(self):
+        self.ids = {}
+        self.elements = []
+
+    def label(self, u, a):
+        if (u, a) not in self.ids:
+            self.ids[(u, a)] = len(self.elements)
+            self.elements.append((u, a))
+        return self.ids[(u, a)]
+
+    def labels(self, to):
+        # returns the labels of the elements (u,a) in to, None if not reached
+        return [self.ids.get((u, a)) for u, a in to]
+
+    def vertices(self):
+        # vertex id by label
+        return [u for u, a in self.elements]
+
+
+class ActivityCodec(object):
+    # encodes the activity counters a = (a[0], ..., a[num_types-1]) in {0,1}
+    # into bitmasks m = sum(a[i] << i) and decodes them, with caching
+
+    def __init__(self, num_types):
+        self.num_types = num_types
+        self.num_states = 2**num_types
+        self.masks = {}
+        self.tuples = {}
+
+    def encode(self, a):
+        if a not in self.masks:
+            if len(a) != self.num_types or any(x not in (0, 1) for x in a):
+                raise ValueError("activity counter %s is not a 0/1 vector" % (a,))
+            mask = sum(x << i for i, x in enumerate(a))
+            self.masks[a] = mask
+            self.tuples[mask] = a
+        return self.masks[a]
+
+    def decode(self, mask):
+        if mask not in self.tuples:
+            a = tuple((mask >> i) & 1 for i in range(self.num_types))
+            self.tuples[mask] = a
+            self.masks[a] = mask
+        return self.tuples[mask]
+
+    def labels(self, to):
+        # returns the labels of the elements (u,a) in to
+        # None for the elements that cannot be encoded (hence never reached)
+        out = []
+        for u, a in to:
+            try:
+                out.append(u * self.num_states + self.encode(a))
+            except ValueError:
+                out.append(None)
+        return out
+
+
+class _SparseStore(dict):
+    # dictionary with a default value for missing keys
+
+    def __init__(self, default):
+        dict.__init__(self)
+        self.default = default
+
+    def __missing__(self, key):
+        return self.default
+
+
+def label_store(num_labels):
+    # returns (dist, prev, prev_edge) indexed by labels
+    # dist is initialized at np.inf, prev and prev_edge at -1
+    if num_labels <= MAX_DENSE_LABELS:
+        return np.full(num_labels, np.inf), np.full(num_labels, -1, dtype=np.int64), \
+            np.full(num_labels, -1, dtype=np.int64)
+    return _SparseStore(np.inf), _SparseStore(-1), _SparseStore(-1)
+
 
+def get_vpaths(prev, to, codec):
+    # returns the list of vertex IDs, one path for each target (u,a) in to
+    # prev[label] is the previous label of the label on the shortest path
+    # see paths.py
+    return trace_vpaths(prev, codec.labels(to), codec.num_states).tolist()
 
 
+def get_epaths(prev, prev_edge, to, codec):
+    # returns the list of edge IDs, one path for each target (u,a) in to
+    # prev_edge[label] is the edge from prev[label] to label, see paths.py
+    return trace_epaths(prev, prev_edge, codec.labels(to)).tolist()
@@ -0,0 +1,100 @@
+# This module implements a label-setting algorithm specialized to
+# time-expanded networks such as the supernetwork (see txt_to_supernetwork.py)
+# vertex u of the supernetwork belongs to the time slice u // num_nodes and
+# every edge either stays within a time slice (road edges) or goes forward in
+# time (activity edges), hence the slices are processed in topological order:
+# for each time slice i that has been reached:
+#     run a small dijkstra restricted to the edges within slice i
+#     starting from all the labels (u,a) of slice i reached so far
+#     relax the edges leaving slice i towards later slices without any queue
+# there is no global priority queue and each label is settled once, hence the
+# algorithm is linear in the size of the supernetwork (up to the log factors of
+# the small heaps) and the edges going forward in time can have negative
+# weights, e.g. minus the reward of the activities without shifting
+# only the edges within a time slice need non-negative weights
+# the labels (u,a) are encoded as in pathfinding_extended.py
+
+import numpy as np
+from .csr import CSRGraph, as_csr
+from .queues import make_queue
+from .transitions import TransitionTable
+from .pathfinding_extended import ActivityCodec, label_store, get_vpaths, \
+    get_epaths
+
+__author__ = "jeromethai"
+
+
+def dijkstra_layered(graph, v, to, modifier, num_nodes, mode="OUT",
+    output="vpath", queue="binary"):
+    # same as dijkstra_extended() on a time-expanded network with num_nodes
+    # vertices per time slice, see the beginning of file
+    # v is a start vertex with a = (0,...,0)
+    # to is a list of targets [(u,a)] with u the vertex and a the activity counter
+    # modifier is a TransitionTable or a callable (see pathfinding_extended.py)
+    table = isinstance(modifier, TransitionTable)
+    graph = as_csr(graph, [] if table else None, mode)
+    offsets, heads, eids = graph.lists()
+    edges = graph.es
+    num_vs = graph.vcount()
+    num_steps = -(-num_vs // num_nodes)
+    forward = edge_directions(graph, num_nodes).tolist()
+    num_types = modifier.num_types if table else modifier()
+    if table:
+        weights, check, sets, allowed = modifier.lists()
+        intra = np.logical_not(np.asarray(forward, dtype=bool))
+        if np.any(modifier.weights[intra] < 0.0):
+            raise ValueError("edges within a time slice must have weights >= 0")
+    codec = ActivityCodec(num_types)
+    num_states = codec.num_states
+    dist, prev, prev_edge = label_store(num_vs * num_states)
+    dist[v * num_states] = 0.0
+    # reached[i] is the list of labels of slice i reached from previous slices
+    reached = [[] for i in range(num_steps)]
+    reached[v // num_nodes].append(v * num_states)
+    target_labels = [l for l in codec.labels(to) if l is not None]
+    last = max([l // num_states // num_nodes for l in target_labels] + [-1])
+
+    for i in range(last+1):
+        if len(reached[i]) == 0: continue # slice i is not reachable
+        Q = make_queue(queue) # small queue of the labels of slice i
+        for label in reached[i]: Q.push(label, dist[label])
+        while len(Q) > 0:
+            label, dist_e = Q.pop()
+            u = label // num_states
+            mask = label % num_states
+            if not table: a = codec.decode(mask)
+            for k in range(offsets[u], offsets[u+1]):
+                e = eids[k]
+                if table:
+                    if mask & check[e] or not allowed[e]: continue
+                    weight = weights[e]
+                    nl = heads[k] * num_states + (mask | sets[e])
+                else:
+                    weight, ne = modifier(edges[e], a)
+                    if weight == np.inf: continue
+                    if weight < 0.0 and not forward[e]:
+                        raise ValueError("edges within a time slice must have weights >= 0")
+                    nl = ne[0] * num_states + codec.encode(ne[1])
+                alt = dist_e + weight
+                if alt < dist[nl]:
+                    if forward[e] and dist[nl] == np.inf:
+                        reached[nl // num_states // num_nodes].append(nl)
+                    dist[nl] = alt
+                    prev[nl] = label
+                    prev_edge[nl] = e
+                    if not forward[e]: Q.push(nl, alt)
+    if output == "vpath": return get_vpaths(prev, to, codec)
+    if output == "epath": return get_epaths(prev, prev_edge, to, codec)
+
+
+def edge_directions(graph, num_nodes):
+    # returns boolean array by edge id, True if the edge goes forward in time
+    # and False if it stays within its time slice
+    # raises ValueError if an edge goes backward in time
+    # graph can be a CSRGraph in any direction
+    if not isinstance(graph, CSRGraph): graph = as_csr(graph, [])
+    source_slices = graph.edge_sources // num_nodes
+    target_slices = graph.edge_targets // num_nodes
+    if np.any(target_slices < source_slices):
+        raise ValueError("network is not time-expanded: an edge goes back in time")
+    return target_slices > source_slices
@@ -0,0 +1,113 @@
+# This module reconstructs the shortest paths from the arrays recorded by the
+# pathfinding algorithms
+# prev[u] is the previous vertex (or label) of u on the shortest path, -1 if
+# u is the source or is not reached
+# prev_edge[u] is the edge id from prev[u] to u
+# the paths of all the targets are walked back at the same time with numpy,
+# one step of every path per iteration, a first walk counts the lengths of the
+# paths and a second one writes them in a flat array, hence the cost is
+# O(total path length) without any dictionary of subpaths nor graph.get_eid()
+# the result is a Paths object that stores the concatenated paths with offsets
+# (as the rows of a CSR matrix) and decodes a path only when it is accessed
+# as in igraph, the path of a target that is not reached is [] and, as in the
+# previous implementation of get_vpaths(), so is the path of the source
+# the labels (u,a) of pathfinding_extended.py are converted to the vertices u
+# with num_states
+# converting prev to an array costs O(len(prev)), hence if prev is a sparse
+# dictionary or if there are only a few targets (e.g. the queries of
+# ShortestPathSolver in pathfinding.py), the paths are walked in python
+
+import numpy as np
+
+__author__ = "jeromethai"
+
+
+MIN_TARGETS_RATIO = 16 # prev is converted to an array if len(to) >= len(prev) / 16
+
+
+class Paths(object):
+    # paths[i] = flat[offsets[i]:offsets[i+1]] as a list, decoded on access
+
+    def __init__(self, flat, offsets):
+        self.flat = flat
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.flat[self.offsets[i]:self.offsets[i+1]].tolist()
+
+    def __iter__(self):
+        for i in range(len(self)): yield self[i]
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def tolist(self):
+        return [self[i] for i in range(len(self))]
+
+
+def trace_vpaths(prev, to, num_states=1):
+    # returns the Paths of vertex ids to the vertices (or labels) in to
+    # a label None in to (see ActivityCodec.labels()) gives an empty path
+    return trace(prev, to, None, num_states)
+
+
+def trace_epaths(prev, prev_edge, to):
+    # returns the Paths of edge ids to the vertices (or labels) in to
+    return trace(prev, to, prev_edge)
+
+
+def trace(prev, to, prev_edge=None, num_states=1):
+    # see the beginning of file
+    to = np.array([-1 if u is None else u for u in to], dtype=np.int64)
+    if isinstance(prev, dict) or len(to) * MIN_TARGETS_RATIO < len(prev):
+        return trace_python(prev, to, prev_edge, num_states)
+    prev = np.asarray(prev, dtype=np.int64)
+    if prev_edge is not None: prev_edge = np.asarray(prev_edge, dtype=np.int64)
+    reached = np.zeros(len(to), dtype=bool)
+    valid = to >= 0
+    reached[valid] = prev[to[valid]] != -1
+    # first walk: number of vertices of the paths
+    lengths = np.zeros(len(to), dtype=np.int64)
+    current, index = to[reached], np.flatnonzero(reached)
+    while len(current) > 0:
+        lengths[index] += 1
+        previous = prev[current]
+        keep = previous != -1
+        current, index = previous[keep], index[keep]
+    if prev_edge is not None: lengths[reached] -= 1 # number of edges
+    offsets = np.zeros(len(to)+1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    # second walk: the paths are written from their end
+    flat = np.empty(offsets[-1], dtype=np.int64)
+    current, position = to[reached], offsets[1:][reached] - 1
+    while len(current) > 0:
+        previous = prev[current]
+        keep = previous != -1
+        if prev_edge is None:
+            flat[position] = current // num_states
+        else:
+            flat[position[keep]] = prev_edge[current[keep]]
+        current, position = previous[keep], position[keep] - 1
+    return Paths(flat, offsets)
+
+
+def trace_python(prev, to, prev_edge=None, num_states=1):
+    # same as trace() with a python loop over the targets
+    paths = []
+    for u in to.tolist():
+        path = []
+        if u >= 0 and prev[u] != -1:
+            while u != -1:
+                if prev_edge is None:
+                    path.append(u // num_states)
+                elif prev[u] != -1:
+                    path.append(prev_edge[u])
+                u = prev[u]
+        paths.append(path[::-1])
+    offsets = np.zeros(len(paths)+1, dtype=np.int64)
+    np.cumsum([len(path) for path in paths], out=offsets[1:])
+    flat = np.array([x for path in paths for x in path], dtype=np.int64)
+    return Paths(flat, offsets)
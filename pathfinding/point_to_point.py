@@ -0,0 +1,245 @@
+# This module implements point-to-point shortest path queries from a source s
+# to a single target t, which stop long before dijkstra() has grown the full
+# ball of radius dist(s,t) around s
+# bidirectional dijkstra: a forward search from s on the out-edges and a
+# backward search from t on the in-edges, the side with the smaller queue is
+# expanded first, mu is the length of the best s-t path seen when an edge
+# reaches a vertex labeled by the other side, and the search stops as soon as
+# the sum of the last popped distances of both sides is at least mu
+# A*: dijkstra from s where the priority of u is dist(s,u) + h(u) for a
+# heuristic h(u) that never overestimates dist(u,t) and is consistent, i.e.
+# h(u) <= w(u,x) + h(x), the search stops when t is popped
+# ALT (A*, Landmarks, Triangle inequality): A* with the heuristic of Landmarks
+# dist(u,t) >= dist(u,L) - dist(t,L) and dist(u,t) >= dist(L,t) - dist(L,u)
+# for a few landmarks L whose distance tables are computed once (see
+# Landmarks.build()) and saved as .npy files next to a CSRGraph (see csr.py)
+# the labels are stored in dictionaries, hence the cost of a query only
+# depends on the part of the graph it visits, not on the size of the graph
+# and the test for the target is O(1) per pop
+# as in dijkstra(), the path from s to s is []
+# example:
+# p2p = PointToPoint(g, weights='weight', landmarks=Landmarks.build(g, 8, 'weight'))
+# path = p2p.alt(s, t) # or p2p.bidirectional(s, t) or p2p.astar(s, t, h)
+# cost = p2p.distance
+
+import os
+import numpy as np
+from .csr import CSRGraph, as_csr
+from .queues import make_queue
+from .pathfinding import ShortestPathSolver, get_weights
+
+__author__ = "jeromethai"
+
+
+def bidirectional_dijkstra(graph, s, t, weights=None, output="vpath", queue="binary"):
+    # shortest path from s to t with bidirectional dijkstra
+    # output is "vpath" or "epath" as in dijkstra()
+    return PointToPoint(graph, weights, queue).bidirectional(s, t, output)
+
+
+def astar(graph, s, t, heuristic, weights=None, output="vpath", queue="binary"):
+    # shortest path from s to t with A* and the heuristic h(u) of dist(u,t)
+    return PointToPoint(graph, weights, queue).astar(s, t, heuristic, output)
+
+
+class PointToPoint(object):
+    # point-to-point queries on a graph compiled once (see the beginning of file)
+    # after a query, distance is the length of the path (np.inf if t is not
+    # reachable) and num_settled the number of settled vertices
+
+    def __init__(self, graph, weights=None, queue="binary", landmarks=None):
+        graph = as_csr(graph, weights)
+        self.graph = graph
+        self.out_lists = graph.lists()
+        self.in_lists = reverse(graph).lists()
+        self.w = get_weights(graph, weights)
+        if self.w is None: self.w = [1.0] * graph.ecount()
+        self.queue = queue
+        self.landmarks = landmarks
+        self.distance = np.inf
+        self.num_settled = 0
+
+
+    def bidirectional(self, s, t, output="vpath"):
+        # shortest path from s to t with bidirectional dijkstra
+        w = self.w
+        lists = (self.out_lists, self.in_lists)
+        dist = ({s: 0.0}, {t: 0.0}) # forward and backward labels
+        prev = ({s: -1}, {t: -1}) # prev[1][u] is the next vertex towards t
+        prev_edge = ({s: -1}, {t: -1})
+        Q = (make_queue(self.queue), make_queue(self.queue))
+        Q[0].push(s, 0.0)
+        Q[1].push(t, 0.0)
+        last = [0.0, 0.0] # last popped distance of each side
+        mu, meet = (0.0, s) if s == t else (np.inf, -1)
+        num_settled = 0
+        while len(Q[0]) > 0 and len(Q[1]) > 0:
+            side = 0 if len(Q[0]) <= len(Q[1]) else 1
+            u, dist_u = Q[side].pop()
+            last[side] = dist_u
+            if last[0] + last[1] >= mu: break
+            num_settled += 1
+            offsets, heads, eids = lists[side]
+            D, P, E, other = dist[side], prev[side], prev_edge[side], dist[1-side]
+            for k in range(offsets[u], offsets[u+1]):
+                x = heads[k]
+                alt = dist_u + w[eids[k]]
+                if alt < D.get(x, np.inf):
+                    D[x] = alt
+                    P[x] = u
+                    E[x] = eids[k]
+                    Q[side].push(x, alt)
+                    if x in other and alt + other[x] < mu:
+                        mu, meet = alt + other[x], x
+        self.distance, self.num_settled = mu, num_settled
+        if meet == -1 or s == t: return []
+        # forward part from s to meet, then backward part from meet to t
+        vpath, epath, u = [], [], meet
+        while u != -1:
+            vpath.append(u)
+            epath.append(prev_edge[0][u])
+            u = prev[0][u]
+        vpath, epath = vpath[::-1], epath[-2::-1]
+        u = meet
+        while prev[1][u] != -1:
+            epath.append(prev_edge[1][u])
+            u = prev[1][u]
+            vpath.append(u)
+        return vpath if output == "vpath" else epath
+
+
+    def astar(self, s, t, heuristic=None, output="vpath"):
+        # shortest path from s to t with A* and a consistent heuristic h(u)
+        # that returns a lower bound of dist(u,t), np.inf if t is not reachable
+        # from u, without heuristic, this is dijkstra stopped when t is popped
+        w = self.w
+        offsets, heads, eids = self.out_lists
+        if heuristic is None: heuristic = lambda u: 0.0
+        h = {s: heuristic(s)} # cached values of the heuristic
+        dist, prev, prev_edge = {s: 0.0}, {s: -1}, {s: -1}
+        Q = make_queue(self.queue)
+        if h[s] < np.inf: Q.push(s, h[s])
+        num_settled = 0
+        while len(Q) > 0:
+            u, key = Q.pop()
+            if u == t: break
+            num_settled += 1
+            dist_u = dist[u]
+            for k in range(offsets[u], offsets[u+1]):
+                x = heads[k]
+                alt = dist_u + w[eids[k]]
+                if alt < dist.get(x, np.inf):
+                    if x not in h: h[x] = heuristic(x)
+                    if h[x] == np.inf: continue # t is not reachable from x
+                    dist[x] = alt
+                    prev[x] = u
+                    prev_edge[x] = eids[k]
+                    Q.push(x, alt + h[x])
+        self.distance, self.num_settled = dist.get(t, np.inf), num_settled
+        if t not in dist or s == t: return []
+        vpath, epath, u = [], [], t
+        while prev[u] != -1:
+            vpath.append(u)
+            epath.append(prev_edge[u])
+            u = prev[u]
+        vpath.append(s)
+        return vpath[::-1] if output == "vpath" else epath[::-1]
+
+
+    def alt(self, s, t, output="vpath"):
+        # shortest path from s to t with A* and the heuristic of the landmarks
+        if self.landmarks is None: raise ValueError("no landmarks")
+        return self.astar(s, t, self.landmarks.heuristic(t), output)
+
+
+class Landmarks(object):
+    # distance tables of the landmarks of a graph
+    # dist_from[i,u] is dist(vertices[i], u) and dist_to[i,u] is dist(u, vertices[i])
+    # the tables are only valid for the weights they are built with
+
+    def __init__(self, vertices, dist_from, dist_to):
+        self.vertices = np.asarray(vertices, dtype=np.int64)
+        self.dist_from = np.asarray(dist_from, dtype=np.float64)
+        self.dist_to = np.asarray(dist_to, dtype=np.float64)
+
+
+    @classmethod
+    def build(cls, graph, num_landmarks=8, weights=None, vertices=None):
+        # computes the tables with one dijkstra per landmark and direction
+        # vertices are the landmarks, otherwise they are selected greedily
+        # among the vertices with edges: the first landmark is the vertex
+        # farthest from the vertex of largest degree and each next landmark is
+        # the reached vertex farthest from all the previous ones
+        graph = as_csr(graph, weights)
+        forward = ShortestPathSolver(graph, weights)
+        backward = ShortestPathSolver(reverse(graph), weights, "IN")
+        dist_from, dist_to = [], []
+        if vertices is None:
+            degree = np.diff(graph.offsets) + np.bincount(graph.edge_targets,
+                minlength=graph.vcount())
+            forward.solve(int(np.argmax(degree)), output=None)
+            closest = np.array(forward.dist) # distance to the closest landmark
+            vertices = []
+            for i in range(min(num_landmarks, np.count_nonzero(degree))):
+                score = np.where(np.isfinite(closest) & (degree > 0), closest, -1.0)
+                score[vertices] = -2.0
+                if score.max() < 0.0: score = np.where(degree > 0, score, -2.0)
+                vertices.append(int(np.argmax(score)))
+                forward.solve(vertices[-1], output=None)
+                dist_from.append(np.array(forward.dist))
+                closest = np.minimum(closest, dist_from[-1]) if i > 0 else dist_from[-1]
+        else:
+            for v in vertices:
+                forward.solve(v, output=None)
+                dist_from.append(np.array(forward.dist))
+        for v in vertices:
+            backward.solve(v, output=None)
+            dist_to.append(np.array(backward.dist))
+        return cls(vertices, dist_from, dist_to)
+
+
+    def heuristic(self, t):
+        # returns the function h(u), lower bound of dist(u,t), see the
+        # beginning of file, the terms with an infinite distance subtracted
+        # are skipped and h(u) = np.inf if t is not reachable from u
+        # the columns of the tables are read for the vertices visited by the
+        # query only, hence the tables can stay memory-mapped (see load())
+        to_t, from_t = self.row(t)
+        rows = {} # rows of the visited vertices
+        row = self.row
+        def h(u):
+            if u not in rows: rows[u] = row(u)
+            to_u, from_u = rows[u]
+            best = 0.0
+            for a, b in zip(to_u, to_t): # dist(u,L) - dist(t,L)
+                if b < np.inf and a - b > best: best = a - b
+            for a, b in zip(from_t, from_u): # dist(L,t) - dist(L,u)
+                if b < np.inf and a - b > best: best = a - b
+            return best
+        return h
+
+
+    def row(self, u):
+        # distances of u to and from all the landmarks as lists
+        return self.dist_to[:, u].tolist(), self.dist_from[:, u].tolist()
+
+
+    def save(self, directory):
+        # saves the tables as landmarks*.npy, e.g. in the directory of
+        # CSRGraph.save() such that they are loaded with the graph
+        if not os.path.isdir(directory): os.makedirs(directory)
+        np.save(os.path.join(directory, 'landmarks.npy'), self.vertices)
+        np.save(os.path.join(directory, 'landmarks_from.npy'), self.dist_from)
+        np.save(os.path.join(directory, 'landmarks_to.npy'), self.dist_to)
+
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        load = lambda key: np.load(os.path.join(directory, key + '.npy'), mmap_mode=mmap_mode)
+        return cls(load('landmarks'), load('landmarks_from'), load('landmarks_to'))
+
+
+def reverse(graph):
+    # CSRGraph of the in-edges of a CSRGraph of out-edges with the same edge ids
+    return CSRGraph(graph.vcount(), graph.edge_sources, graph.edge_targets,
+        graph.attrs, mode="IN", name=graph.name)
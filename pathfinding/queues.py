@@ -0,0 +1,192 @@
+# This module implements the priority queues used by the pathfinding algorithms
+# all queues are addressable: push(item, priority) inserts the item or
+# decreases its priority if it is already in the queue (decrease-key)
+# and pop() returns the pair (item, priority) with the least priority
+# available queues (selected with the argument queue= of the algorithms):
+# "linear": dictionary scanned at each pop, O(n) per pop, O(1) per push
+# "binary": binary heap with lazy deletion, a decrease-key pushes a new entry
+#           and the stale entries are skipped when popped, O(log n)
+# "dary": indexed d-ary heap with true decrease-key (d=4 by default), O(log n)
+# "radix": radix heap for non-negative integer priorities, the popped
+#          priorities must be non-decreasing (which is the case in Dijkstra)
+
+import heapq as hq
+import itertools
+
+__author__ = "jeromethai"
+
+
+class LinearQueue(object):
+    # dictionary {item: priority} scanned at each pop
+    # this is the queue of the original implementation of dijkstra()
+
+    def __init__(self):
+        self.Q = {}
+
+    def __len__(self):
+        return len(self.Q)
+
+    def __contains__(self, item):
+        return item in self.Q
+
+    def push(self, item, priority):
+        if item not in self.Q or priority < self.Q[item]: self.Q[item] = priority
+
+    def pop(self):
+        item = min(self.Q, key=self.Q.get) # Get key with the least value from Q
+        return item, self.Q.pop(item)
+
+
+class BinaryHeapQueue(object):
+    # binary heap with lazy deletion
+    # entries are (priority, count, item) where count breaks ties by insertion
+    # self.best = {item: priority} for the items in the queue, entries of the
+    # heap which do not match self.best are stale and skipped by pop()
+
+    def __init__(self):
+        self.heap = []
+        self.best = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.best)
+
+    def __contains__(self, item):
+        return item in self.best
+
+    def push(self, item, priority):
+        if item in self.best and priority >= self.best[item]: return
+        self.best[item] = priority
+        hq.heappush(self.heap, (priority, next(self.counter), item))
+
+    def pop(self):
+        while True:
+            priority, count, item = hq.heappop(self.heap)
+            if self.best.get(item) == priority: # skip stale entries
+                del self.best[item]
+                return item, priority
+
+
+class DaryHeapQueue(object):
+    # indexed d-ary heap with decrease-key
+    # self.heap is a list of [priority, count, item]
+    # self.position = {item: index of item in self.heap}
+
+    def __init__(self, d=4):
+        self.d = d
+        self.heap = []
+        self.position = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def push(self, item, priority):
+        if item in self.position:
+            i = self.position[item]
+            if priority >= self.heap[i][0]: return
+            self.heap[i][0] = priority # decrease-key
+        else:
+            i = len(self.heap)
+            self.heap.append([priority, next(self.counter), item])
+            self.position[item] = i
+        self._sift_up(i)
+
+    def pop(self):
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        del self.position[top[2]]
+        if len(heap) > 0:
+            heap[0] = last
+            self.position[last[2]] = 0
+            self._sift_down(0)
+        return top[2], top[0]
+
+    def _sift_up(self, i):
+        heap, position, d = self.heap, self.position, self.d
+        entry = heap[i]
+        while i > 0:
+            parent = (i-1) // d
+            if heap[parent][:2] <= entry[:2]: break
+            heap[i] = heap[parent]
+            position[heap[i][2]] = i
+            i = parent
+        heap[i] = entry
+        position[entry[2]] = i
+
+    def _sift_down(self, i):
+        heap, position, d = self.heap, self.position, self.d
+        n = len(heap)
+        entry = heap[i]
+        while True:
+            first = d*i + 1
+            if first >= n: break
+            child = min(range(first, min(first+d, n)), key=lambda c: heap[c][:2])
+            if entry[:2] <= heap[child][:2]: break
+            heap[i] = heap[child]
+            position[heap[i][2]] = i
+            i = child
+        heap[i] = entry
+        position[entry[2]] = i
+
+
+class RadixQueue(object):
+    # radix heap for non-negative integer priorities (e.g. integer weights)
+    # an entry of key k is stored in bucket bit_length(k ^ last) where last
+    # is the last popped key, such that bucket 0 contains the keys == last
+    # pushing a key < last raises a ValueError (the queue is monotone)
+    # decrease-key is lazy as in BinaryHeapQueue
+
+    def __init__(self):
+        self.buckets = [[] for i in range(65)]
+        self.best = {}
+        self.last = 0
+
+    def __len__(self):
+        return len(self.best)
+
+    def __contains__(self, item):
+        return item in self.best
+
+    def push(self, item, priority):
+        if item in self.best and priority >= self.best[item]: return
+        key = int(priority)
+        if key != priority or key < self.last:
+            raise ValueError("radix queue needs non-decreasing integer priorities")
+        self.best[item] = priority
+        self.buckets[(key ^ self.last).bit_length()].append((key, item))
+
+    def pop(self):
+        buckets = self.buckets
+        while True:
+            if len(buckets[0]) == 0:
+                i = 1
+                while len(buckets[i]) == 0: i += 1
+                # redistribute the least non-empty bucket around its minimum
+                entries = buckets[i]
+                buckets[i] = []
+                self.last = min(entries)[0]
+                for key, item in entries:
+                    buckets[(key ^ self.last).bit_length()].append((key, item))
+            key, item = buckets[0].pop()
+            if self.best.get(item) == key: # skip stale entries
+                return item, self.best.pop(item)
+
+
+queues = {"linear": LinearQueue,
+          "binary": BinaryHeapQueue,
+          "dary": DaryHeapQueue,
+          "radix": RadixQueue}
+
+
+def make_queue(queue="binary"):
+    # returns an empty priority queue
+    # queue is either one of the names in queues or a class with no arguments
+    if isinstance(queue, basestring):
+        if queue not in queues: raise ValueError("unknown queue %s" % queue)
+        return queues[queue]()
+    return queue()
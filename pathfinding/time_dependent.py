@@ -0,0 +1,161 @@
+# This module implements time-dependent shortest paths (TD-Dijkstra) on a base
+# network whose links have piecewise-constant travel time functions, e.g. the
+# weight columns of *_net_times.txt with one travel time per time slice
+# unlike the supernetwork (see txt_to_supernetwork.py) where a trip stays in
+# its time slice, the clock moves forward along the path: a link l entered at
+# time tau takes weights[l, j] with j = tau // slice_length the slice of tau,
+# hence a long trip is driven with the weights of the slices it goes through
+# the vehicles can wait at the entrance of a link, hence the arrival time is
+# arrival(l, tau) = min(tau + weights[l, j], waiting[l, j+1]) with
+# waiting[l, j] = min_{j' >= j} j' * slice_length + weights[l, j']
+# the earliest time to get through l by entering it at the beginning of a later
+# slice, arrival(l, .) is non-decreasing (FIFO property), hence dijkstra on the
+# arrival times is exact, see Dreyfus 1969 and Kaufman and Smith 1993
+# the weights of the last slice hold after the end of the day
+# the functions are stored as two arrays of shape (num_links, num_steps) and
+# (num_links, num_steps+1) and the solver reads them as flat lists, hence the
+# relaxation of a link is O(1) whatever the number of slices
+# the times are measured from the beginning of the first slice in the unit of
+# the weights
+# example:
+# functions = TravelTimeFunctions(weights, slice_length=15.0) # 96 slices a day
+# solver = TimeDependentSolver(CSRGraph(num_nodes, sources, targets), functions)
+# path = solver.solve(v, departure=480.0, to=[t])[0]
+# solver.arrival[t] - 480.0 # travel time leaving v at 8am
+
+import numpy as np
+from .csr import as_csr
+from .queues import make_queue
+from .pathfinding import get_vpaths, get_epaths
+
+__author__ = "jeromethai"
+
+
+class TravelTimeFunctions(object):
+    # piecewise-constant travel time functions of the links by edge id
+    # weights[l, j] is the travel time of link l entered during slice j
+
+    def __init__(self, weights, slice_length):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.slice_length = float(slice_length)
+        self.num_links, self.num_steps = self.weights.shape
+        entries = np.arange(self.num_steps) * self.slice_length + self.weights
+        self.waiting = np.full((self.num_links, self.num_steps+1), np.inf)
+        self.waiting[:, :-1] = np.minimum.accumulate(entries[:, ::-1], axis=1)[:, ::-1]
+        self._lists = None
+
+
+    def lists(self):
+        # the two tables as flat python lists, computed once
+        if self._lists is None:
+            self._lists = self.weights.ravel().tolist(), self.waiting.ravel().tolist()
+        return self._lists
+
+
+    def slices(self, tau):
+        # slice of the times tau, the times before (after) the day are in the
+        # first (last) slice
+        last = (self.num_steps-1) * self.slice_length
+        return (np.clip(tau, 0.0, last) // self.slice_length).astype(np.int64)
+
+
+    def arrival(self, l, tau):
+        # arrival time through link l entered at time tau
+        j = int(self.slices(tau))
+        return min(tau + self.weights[l, j], self.waiting[l, j+1])
+
+
+    def arrivals(self, tau):
+        # arrival times through the links entered at times tau[..., l], where
+        # the last axis is the edge id, np.inf if tau is np.inf
+        j = self.slices(tau)
+        links = np.arange(self.num_links)
+        return np.minimum(tau + self.weights[links, j], self.waiting[links, j+1])
+
+
+def td_dijkstra(graph, functions, v, departure=0.0, to=None, output="vpath",
+    queue="binary"):
+    # earliest arrival paths from v leaving at time departure
+    # functions is a TravelTimeFunctions by edge id of graph
+    return TimeDependentSolver(graph, functions, queue).solve(v, departure, to, output)
+
+
+class TimeDependentSolver(object):
+    # TD-Dijkstra bound to a graph and its travel time functions, the buffers
+    # are reused across the queries as in ShortestPathSolver (see pathfinding.py)
+    # after a query, arrival[u] is the earliest arrival time at u (np.inf if
+    # not reachable), valid until the next query
+
+    def __init__(self, graph, functions, queue="binary"):
+        self.graph = as_csr(graph, [])
+        self.num_vs = self.graph.vcount()
+        self.lists = self.graph.lists()
+        self.functions = functions
+        self.queue = queue
+        self.arrival = [np.inf] * self.num_vs
+        self.prev = [-1] * self.num_vs
+        self.prev_edge = [-1] * self.num_vs
+        self.target = [0] * self.num_vs
+        self.touched = []
+        self.query = 0
+
+
+    def reset(self):
+        # resets the entries touched by the previous query
+        arrival, prev, prev_edge = self.arrival, self.prev, self.prev_edge
+        for u in self.touched:
+            arrival[u] = np.inf
+            prev[u] = -1
+            prev_edge[u] = -1
+        self.touched = []
+
+
+    def solve(self, v, departure=0.0, to=None, output="vpath"):
+        # earliest arrival paths from v leaving at time departure to the
+        # vertices in to (all the vertices if None)
+        # output is "vpath" or "epath" as in dijkstra(), or None
+        self.reset()
+        self.query += 1
+        query, target = self.query, self.target
+        offsets, heads, eids = self.lists
+        w, waiting = self.functions.lists()
+        num_steps = self.functions.num_steps
+        length = self.functions.slice_length
+        arrival, prev, prev_edge, touched = self.arrival, self.prev, self.prev_edge, self.touched
+        arrival[v] = departure
+        touched.append(v)
+        Q = make_queue(self.queue)
+        Q.push(v, departure)
+        if to is None: to = range(self.num_vs)
+        remaining = 0
+        for u in to:
+            if target[u] != query:
+                target[u] = query
+                remaining += 1
+
+        while len(Q) > 0 and remaining > 0:
+            u, tau = Q.pop()
+            if target[u] == query:
+                target[u] = 0
+                remaining -= 1
+            j = min(max(int(tau // length), 0), num_steps-1)
+            for k in range(offsets[u], offsets[u+1]):
+                neighbor, e = heads[k], eids[k]
+                alt = tau + w[e*num_steps + j]
+                wait = waiting[e*(num_steps+1) + j+1]
+                if wait < alt: alt = wait
+                if alt < arrival[neighbor]:
+                    if arrival[neighbor] == np.inf: touched.append(neighbor)
+                    arrival[neighbor] = alt
+                    prev[neighbor] = u
+                    prev_edge[neighbor] = e
+                    Q.push(neighbor, alt)
+        if output == "vpath": return get_vpaths(prev, to)
+        if output == "epath": return get_epaths(prev, prev_edge, to)
+
+
+    def travel_times(self, to=None):
+        # arrival times of the last query minus its departure time
+        if to is None: to = range(self.num_vs)
+        departure = self.arrival[self.touched[0]]
+        return [self.arrival[u] - departure for u in to]
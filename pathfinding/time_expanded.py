@@ -0,0 +1,302 @@
+# This module implements an implicit time-expanded network that generates the
+# edges of the supernetwork on the fly (see graph_utils/txt_to_supernetwork.py)
+# instead of storing the num_links * num_steps road edges
+# it only keeps
+# the base network of num_nodes nodes and num_links links in CSR format
+# the weights of the links of shape (num_links, num_steps)
+# the extra edges (activity and home edges) in CSR format
+# the activity records of files with implicit times, see
+# txt_to_activity_records() in graph_utils/txt_to_supernetwork.py
+# a record has O(num_steps**2) activity edges (one for each start and end
+# time) that are generated on the fly, hence the number of edges stored by the
+# graph grows linearly with the number of time steps
+# the vertices and edges have the same ids as in txt_to_supernetwork(), i.e.
+# vertex u = node + i*num_nodes is node in time slice i
+# edge i*num_links + l is link l in time slice i
+# edge num_links*num_steps + x is the extra edge x
+# followed by the edges of the records in the order of all_times_combinations()
+# (without records, an edge repeated in the files is kept once as in
+# txt_to_supernetwork(), the edges of the records are never merged)
+# the road edges all have type -1, hence they never modify the activity counter
+# and a TransitionTable (see transitions.py) for the graph only describes the
+# extra edges and then the records, it is built with graph.transition_table()
+# the weights of the road edges of a time slice are converted into a python
+# list when the slice is first visited and at most max_slices lists are cached
+# the graph can be passed to dijkstra_extended() in place of the supernetwork
+# the weights and the extra edges can be modified in place, see
+# graph_utils/supernetwork_update.py
+
+import numpy as np
+from collections import OrderedDict
+from .csr import CSRGraph
+from .transitions import TransitionTable
+
+__author__ = "jeromethai"
+
+
+class TimeExpandedGraph(object):
+
+    def __init__(self, num_nodes, num_steps, sources, targets, weights,
+        extra_sources, extra_targets, extra_attrs, alpha=1.0, name=None,
+        max_slices=64, records=None, shift=0.0):
+        # sources, targets are the end nodes of the links of the base network
+        # weights[l,i] is the travel time of link l in time slice i
+        # extra_sources, extra_targets are the end vertices of the extra edges
+        # extra_attrs = {'weight': w, 'type': y, 'raw_weight': z} by extra edge
+        # alpha is a coefficient to translate travel times to travel costs
+        # records is a list of activity records
+        # (node, type_edge, reward, deprecation, start, end, min_time, max_time)
+        # and shift the shift of their weights, see txt_to_activity_records()
+        self.num_nodes = num_nodes
+        self.num_steps = num_steps
+        self.num_links = len(sources)
+        self.num_roads = self.num_links * num_steps
+        self.alpha = alpha
+        self.name = name
+        self.mode = "OUT"
+        self.base = CSRGraph(num_nodes, sources, targets)
+        # slice-major copy such that the weights of a slice are contiguous
+        self.weights = np.ascontiguousarray(np.asarray(weights, dtype=np.float64).T)
+        assert self.weights.shape == (num_steps, self.num_links)
+        self.extra = CSRGraph(num_nodes * num_steps, extra_sources, extra_targets,
+            extra_attrs)
+        self.max_slices = max_slices
+        self._slices = OrderedDict() # cached weights of the slices
+        self.shift = shift
+        self.set_records([] if records is None else records)
+        self.es = _EdgeSeq(self)
+
+
+    def set_records(self, records):
+        # records[r] = (node, type_edge, reward, deprecation, start, end,
+        # min_time, max_time), the edges of record r starting at slice s-1 are
+        # numbered from record_first[r] + record_offsets[r][s-start]
+        self.records = [tuple(r) for r in records]
+        self.records_at = [[] for n in range(self.num_nodes)] # records by node
+        self.record_first = np.zeros(len(records)+1, dtype=np.int64)
+        self.record_offsets = []
+        for r, (node, type_edge, reward, deprecation, start, end, min_time,
+            max_time) in enumerate(self.records):
+            self.records_at[node].append(r)
+            # number of end times for each start time s
+            counts = np.minimum(max_time, end - np.arange(start, end-min_time+1)) \
+                - min_time + 1
+            offsets = np.zeros(len(counts)+1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+            self.record_offsets.append(offsets)
+            self.record_first[r+1] = self.record_first[r] + offsets[-1]
+        self.num_fixed = self.num_roads + self.extra.ecount() # first record edge
+
+
+    def vcount(self):
+        return self.num_nodes * self.num_steps
+
+
+    def ecount(self):
+        return self.num_fixed + int(self.record_first[-1])
+
+
+    def slice_weights(self, i):
+        # returns the weights (times alpha) of the links in slice i as a list
+        weights = self._slices.pop(i, None)
+        if weights is None:
+            weights = (self.alpha * self.weights[i]).tolist()
+            if len(self._slices) >= self.max_slices: self._slices.popitem(last=False)
+        self._slices[i] = weights
+        return weights
+
+
+    def update_weights(self, links, slices, weights):
+        # sets the travel time of link links[k] in slice slices[k] to weights[k]
+        # the cached lists of the slices are patched, not rebuilt
+        links = np.asarray(links, dtype=np.int64)
+        slices = np.asarray(slices, dtype=np.int64)
+        self.weights[slices, links] = weights
+        for i, l, w in zip(slices.tolist(), links.tolist(),
+            self.weights[slices, links].tolist()):
+            if i in self._slices: self._slices[i][l] = self.alpha * w
+
+
+    def add_extra_edges(self, sources, targets, attrs):
+        # appends extra edges and returns their edge ids
+        # the edge ids of the records are shifted by the number of new edges
+        eids = self.extra.add_edges(sources, targets, attrs)
+        self.num_fixed = self.num_roads + self.extra.ecount()
+        return self.num_roads + eids
+
+
+    def delete_extra_edges(self, eids):
+        # removes the extra edges eids, see CSRGraph.delete_edges()
+        eids = np.asarray(eids, dtype=np.int64)
+        if np.any(eids < self.num_roads) or np.any(eids >= self.num_fixed):
+            raise ValueError("only the extra edges can be deleted")
+        self.extra.delete_edges(eids - self.num_roads)
+        self.num_fixed = self.num_roads + self.extra.ecount()
+
+
+    def out_edges(self, u):
+        # returns the list of (eid, head) of the out-edges of vertex u
+        # the road edges first, then the extra edges
+        node, i = u % self.num_nodes, u // self.num_nodes
+        offsets, targets, eids = self.base.lists()
+        out = [(i*self.num_links + eids[k], targets[k] + i*self.num_nodes)
+            for k in range(offsets[node], offsets[node+1])]
+        offsets, targets, eids = self.extra.lists()
+        out += [(self.num_roads + eids[k], targets[k])
+            for k in range(offsets[u], offsets[u+1])]
+        s = i + 1 # activities of the records start at slice s
+        for r in self.records_at[node]:
+            start, end, min_time, max_time = self.records[r][4:]
+            if s < start or s > end - min_time: continue
+            first = self.num_fixed + int(self.record_first[r] +
+                self.record_offsets[r][s-start]) - s - min_time
+            out += [(first + t, node + t*self.num_nodes)
+                for t in range(s+min_time, min(s+max_time, end)+1)]
+        return out
+
+
+    def neighbors(self, u, mode="out"):
+        return [head for eid, head in self.out_edges(u)]
+
+
+    def record_edge(self, eid):
+        # returns (r, s, t) of the edge of record r from slice s-1 to t
+        x = eid - self.num_fixed
+        r = int(np.searchsorted(self.record_first, x, side='right')) - 1
+        x -= self.record_first[r]
+        start, min_time = self.records[r][4], self.records[r][6]
+        k = int(np.searchsorted(self.record_offsets[r], x, side='right')) - 1
+        s = start + k
+        return r, s, int(s + min_time + x - self.record_offsets[r][k])
+
+
+    def edge(self, eid):
+        # returns (source, target) of the edge
+        if eid >= self.num_fixed:
+            r, s, t = self.record_edge(eid)
+            node = self.records[r][0]
+            return node + (s-1)*self.num_nodes, node + t*self.num_nodes
+        if eid < self.num_roads:
+            i, l = divmod(eid, self.num_links)
+            offset = i * self.num_nodes
+            return (int(self.base.edge_sources[l]) + offset,
+                int(self.base.edge_targets[l]) + offset)
+        x = eid - self.num_roads
+        return int(self.extra.edge_sources[x]), int(self.extra.edge_targets[x])
+
+
+    def attr(self, attr, eid):
+        # returns the value of the edge attribute 'weight', 'type' or 'raw_weight'
+        if eid >= self.num_fixed:
+            r, s, t = self.record_edge(eid)
+            node, type_edge, reward, deprecation, start, end, min_time, max_time = \
+                self.records[r]
+            if attr == 'type': return type_edge
+            total_reward = activity_reward(reward, min_time, t-s)
+            if attr == 'weight': return -total_reward + (1+t-s)*self.shift
+            if attr == 'raw_weight': return -total_reward
+            raise KeyError(attr)
+        if eid >= self.num_roads: return self.extra.attr_list(attr)[eid - self.num_roads]
+        if attr == 'type': return -1
+        i, l = divmod(eid, self.num_links)
+        if attr == 'weight': return self.alpha * float(self.weights[i, l])
+        if attr == 'raw_weight': return float(self.weights[i, l])
+        raise KeyError(attr)
+
+
+    def get_eid(self, s, t):
+        # same as igraph.Graph.get_eid(), returns the first edge from s to t
+        for eid, head in self.out_edges(s):
+            if head == t: return eid
+        raise ValueError("no edge between vertices %d and %d" % (s, t))
+
+
+    def transition_table(self, num_types=None, rules=None):
+        # TransitionTable of the extra edges then the records (with weight 0),
+        # see the beginning of file
+        types = self.extra.attr_list('type') + [r[1] for r in self.records]
+        weights = self.extra.attr_list('weight') + [0.0] * len(self.records)
+        return TransitionTable(types, weights, num_types, rules)
+
+
+    def to_csr(self):
+        # materializes the supernetwork as a CSRGraph with the same edge ids
+        offsets = self.num_nodes * np.arange(self.num_steps, dtype=np.int64)[:,None]
+        eids = range(self.num_fixed, self.ecount())
+        lazy = np.array([self.edge(eid) for eid in eids], dtype=np.int64).reshape((-1, 2))
+        sources = np.concatenate(((self.base.edge_sources + offsets).ravel(),
+            self.extra.edge_sources, lazy[:,0]))
+        targets = np.concatenate(((self.base.edge_targets + offsets).ravel(),
+            self.extra.edge_targets, lazy[:,1]))
+        attrs = {
+            'weight': np.concatenate((self.alpha * self.weights.ravel(),
+                self.extra.attrs['weight'], [self.attr('weight', e) for e in eids])),
+            'type': np.concatenate((np.full(self.num_roads, -1, dtype=np.int64),
+                self.extra.attrs['type'], np.array([self.attr('type', e) for e in eids],
+                dtype=np.int64))),
+            'raw_weight': np.concatenate((self.weights.ravel(),
+                self.extra.attrs['raw_weight'], [self.attr('raw_weight', e) for e in eids])),
+            }
+        return CSRGraph(self.vcount(), sources, targets, attrs, name=self.name)
+
+
+class _EdgeSeq(object):
+    # graph.es[eid] is an edge computed on the fly and graph.es[attr] is a
+    # sequence of the values of the attribute indexed by edge id
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, eid):
+        if isinstance(eid, basestring): return _AttrSeq(self.graph, eid)
+        return TimeExpandedEdge(self.graph, eid)
+
+    def __len__(self):
+        return self.graph.ecount()
+
+    def attributes(self):
+        return ['weight', 'type', 'raw_weight']
+
+
+class _AttrSeq(object):
+
+    def __init__(self, graph, attr):
+        self.graph = graph
+        self.attr = attr
+
+    def __getitem__(self, eid):
+        return self.graph.attr(self.attr, eid)
+
+    def __len__(self):
+        return self.graph.ecount()
+
+
+class TimeExpandedEdge(object):
+    # minimal equivalent of igraph.Edge
+
+    __slots__ = ('graph', 'index')
+
+    def __init__(self, graph, eid):
+        self.graph = graph
+        self.index = eid
+
+    def __getitem__(self, attr):
+        return self.graph.attr(attr, self.index)
+
+    @property
+    def source(self):
+        return self.graph.edge(self.index)[0]
+
+    @property
+    def target(self):
+        return self.graph.edge(self.index)[1]
+
+    @property
+    def tuple(self):
+        return self.graph.edge(self.index)
+
+
+def activity_reward(reward, min_time, d):
+    # reward of an activity record (see txt_to_activity_records()) done from
+    # slice s to t with d = t-s, note that the deprecation is not taken into account
+    return reward*min_time + reward*(d-min_time)
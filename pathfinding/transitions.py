@@ -0,0 +1,88 @@
+# This module implements state transition tables for dijkstra_extended()
+# a transition table replaces the modifier(edge, a) callback when the effect of
+# an edge on the activity counter only depends on the type of the edge:
+# edges of type -1 never modify the counter
+# edges of type i >= 0 follow the rule of type i which is one of
+# ONCE: the edge can be taken if a[i] == 0 and then sets a[i] = 1 (default)
+# REPEATABLE: the edge can always be taken and sets a[i] = 1
+# FORBIDDEN: the edge can never be taken
+# the table is compiled into arrays by edge id, such that with the counter a
+# encoded as a bitmask (see pathfinding_extended.py) an edge e can be taken
+# if allowed[e] and mask & check[e] == 0, and leads to the mask mask | sets[e]
+
+import numpy as np
+
+__author__ = "jeromethai"
+
+
+ONCE = 0
+REPEATABLE = 1
+FORBIDDEN = 2
+
+
+class TransitionTable(object):
+
+    def __init__(self, types, weights, num_types=None, rules=None):
+        # types is the type of each edge ordered by edge id
+        # weights is the weight of each edge ordered by edge id
+        # num_types is the number of types i >= 0 (max(types)+1 if None)
+        # rules is a dictionary {type: rule}, rules are ONCE by default
+        types = np.asarray(types, dtype=np.int64)
+        if num_types is None: num_types = int(types.max()) + 1 if len(types) > 0 else 0
+        if len(types) > 0 and types.max() >= num_types:
+            raise ValueError("edge type %d >= num_types %d" % (types.max(), num_types))
+        self.num_types = num_types
+        self.rules = np.full(num_types, ONCE, dtype=np.int64)
+        if rules is not None:
+            for i, rule in rules.items(): self.rules[i] = rule
+        self.weights = np.asarray(weights, dtype=np.float64)
+        # compile the rules into arrays by edge id
+        typed = types >= 0
+        bits = np.zeros(len(types), dtype=np.int64)
+        bits[typed] = np.left_shift(1, types[typed])
+        rule = np.full(len(types), REPEATABLE, dtype=np.int64)
+        rule[typed] = self.rules[types[typed]]
+        self.check = np.where(rule == ONCE, bits, 0)
+        self.sets = np.where(rule == FORBIDDEN, 0, bits)
+        self.allowed = rule != FORBIDDEN
+        self._lists = None
+
+
+    @classmethod
+    def from_graph(cls, graph, types='type', weights='weight', num_types=None,
+        rules=None):
+        # build the table from the edge attributes of an igraph or a CSRGraph
+        return cls(graph.es[types] if isinstance(types, basestring) else types,
+            graph.es[weights] if isinstance(weights, basestring) else weights,
+            num_types, rules)
+
+
+    def __call__(self, edge=None, a=None):
+        # the table can also be used as a callable modifier (slow path)
+        # see pathfinding_extended.py for the specification of modifier
+        if edge is None and a is None: return self.num_types
+        e = edge.index
+        mask = sum(x << i for i, x in enumerate(a))
+        if not self.allowed[e] or mask & self.check[e]: return np.inf, -1
+        mask |= self.sets[e]
+        return self.weights[e], (edge.tuple[1],
+            tuple((mask >> i) & 1 for i in range(self.num_types)))
+
+
+    def set_weights(self, eids, weights):
+        # sets the weights of the edges eids in place, see update_travel_times()
+        # in graph_utils/supernetwork_update.py
+        eids = np.asarray(eids, dtype=np.int64)
+        if not self.weights.flags.writeable: self.weights = np.array(self.weights)
+        self.weights[eids] = weights
+        if self._lists is not None:
+            values = self._lists[0]
+            for e, x in zip(eids.tolist(), self.weights[eids].tolist()): values[e] = x
+
+
+    def lists(self):
+        # returns (weights, check, sets, allowed) as python lists by edge id
+        if self._lists is None:
+            self._lists = (self.weights.tolist(), self.check.tolist(),
+                self.sets.tolist(), self.allowed.tolist())
+        return self._lists
@@ -0,0 +1,64 @@
+import unittest
+import os
+import tempfile
+from activity_engine.activity_batch import *
+from activity_engine.activity_engine import activity_engine
+from graph_utils.txt_to_supernetwork import snap_activities_to_time_grid_get_shift
+
+__author__ = 'jeromethai'
+
+
+def activities_with_home(filepath_act, home):
+    # copy of the activity file with another home location
+    fd, filepath = tempfile.mkstemp(suffix='_activities.txt')
+    with os.fdopen(fd, 'w') as f:
+        for line in open(filepath_act):
+            if line.startswith('<HOME LOCATION>'): line = '<HOME LOCATION> %d\n' % home
+            f.write(line)
+    return filepath
+
+
+class TestActivityBatch(unittest.TestCase):
+
+    def test_batch_activity_engine(self):
+        # the batch gives the same costs as activity_engine for each agent
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        metadata = {'start_time': 5, 'end_time': 21, 'num_steps': 16, 'num_nodes': 6}
+        activities = snap_activities_to_time_grid_get_shift(filepath_act, metadata)[0]
+        agents = [(0, filepath_act, 1.0), (3, filepath_act, 1.0),
+                  (0, filepath_act, 2.0), (0, activities, 1.0), (4, activities, 0.5)]
+        out = batch_activity_engine(filepath_net, agents)
+        self.assertTrue(len(out) == len(agents))
+        for (home, acts, alpha), (trajs, costs) in zip(agents, out):
+            filepath = activities_with_home(filepath_act, home)
+            try:
+                truth = activity_engine(filepath_net, filepath, alpha=alpha)[1]
+            finally:
+                os.remove(filepath)
+            self.assertTrue(costs == truth)
+        self.assertTrue(out[0][1] == {(0,): -395., (1,): -554.})
+        self.assertTrue(out[0][0][(1,)] == [(6, 7, [0, 3, 4, 5]), (17, 18, [5, 2]),
+            (20, 21, [2, 1, 0])])
+        self.assertTrue(out[3] == out[0])
+
+
+    def test_batch_chunks(self):
+        # agents are solved by chunks of homes when the tensors are too large
+        import activity_engine.activity_batch as ab
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        agents = [(h, filepath_act, 1.0) for h in range(6)]
+        network = load_network(filepath_net)
+        out1 = batch_activity_engine(filepath_net, agents, network=network)
+        max_tensor = ab.MAX_TENSOR
+        ab.MAX_TENSOR = 1
+        try:
+            out2 = batch_activity_engine(filepath_net, agents, network=network)
+        finally:
+            ab.MAX_TENSOR = max_tensor
+        self.assertTrue([c for a, c in out1] == [c for a, c in out2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from activity_engine.activity_dp import *
+from activity_engine.activity_engine import activity_engine
+from graph_utils.txt_to_supernetwork import txt_to_link_arrays, txt_to_supernetwork
+import numpy as np
+
+__author__ = 'jeromethai'
+
+
+class TestActivityDP(unittest.TestCase):
+
+    def test_slice_travel_times(self):
+        # travel times and successors within each slice of the small grid
+        # (0)--(1)--(2)
+        #  |    |    |
+        # (3)--(4)--(5)
+        sources, targets, weights = txt_to_link_arrays('networks/SmallGrid_net_times.txt')
+        self.assertTrue(weights.shape == (14, 16))
+        D, succ = slice_travel_times(sources, targets, weights, 6)
+        self.assertTrue(D.shape == (16, 6, 6))
+        # at 6am, 0-3-4-5 takes 7+7+7 and 0-1-2-5 takes 10+10+10
+        self.assertTrue(D[1, 0, 5] == 21.)
+        self.assertTrue(succ[1, 0, 5] == 3 and succ[1, 3, 5] == 4)
+        self.assertTrue(slice_path(succ[1], 0, 5) == [0, 3, 4, 5])
+        self.assertTrue(np.all(np.diag(D[4]) == 0.))
+        # D is consistent with the paths given by succ
+        for i in range(16):
+            for k in range(6):
+                for n in range(6):
+                    path = slice_path(succ[i], k, n)
+                    cost = sum([weights[np.nonzero((sources==s) & (targets==t))[0][0], i]
+                        for s, t in zip(path[:-1], path[1:])])
+                    self.assertTrue(cost == D[i, k, n])
+
+
+    def test_mask_transitions(self):
+        # masks from which an edge of each type can be taken
+        out = mask_transitions(2, {1: REPEATABLE})
+        self.assertTrue(out[-1][0].tolist() == [0, 1, 2, 3])
+        self.assertTrue(out[0][0].tolist() == [0, 2])
+        self.assertTrue(out[0][1].tolist() == [1, 3])
+        self.assertTrue(out[1][1].tolist() == [2, 3, 2, 3])
+
+
+    def test_activity_dp(self):
+        # same costs as the graph search on both time grids
+        # and the trajectories are paths of the supernetwork with these costs
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        for filepath_net, truth in [('networks/SmallGrid_net_times.txt', [-395., -554.]),
+            ('networks/SmallGrid_net_times_32_steps.txt', [-395., -526.])]:
+            raw, costs = activity_dp(filepath_net, filepath_act)
+            self.assertTrue(costs == truth)
+            g = txt_to_supernetwork(filepath_net, filepath_act)
+            for traj, cost in zip(raw, costs):
+                self.assertTrue(traj[0] == 0 and traj[-1] == g.vcount()-6)
+                edges = [g.es[g.get_eid(s, t)] for s, t in zip(traj[:-1], traj[1:])]
+                self.assertTrue(sum([e['raw_weight'] for e in edges]) == cost)
+
+
+    def test_activity_engine_dp(self):
+        # activity_engine with the dynamic programming solver
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        activities, costs = activity_engine(filepath_net, filepath_act, solver="dp")
+        self.assertTrue(costs == {(0,): -395., (1,): -554.})
+        self.assertTrue(activities[(1,)] == [(6, 7, [0, 3, 4, 5]), (17, 18, [5, 2]),
+            (20, 21, [2, 1, 0])])
+        # forbidding the mall
+        activities, costs = activity_engine(filepath_net, filepath_act, solver="dp",
+            rules={0: FORBIDDEN})
+        self.assertTrue(costs == {(0,): -395., (1,): np.inf})
+
+
+if __name__ == '__main__':
+    unittest.main()
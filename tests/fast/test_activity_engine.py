@@ -3,9 +3,10 @@ from activity_engine.activity_engine import *
 
 __author__ = "jeromethai"
 
-# two optimal trajectories when does not visit the mall
+# three optimal trajectories when does not visit the mall
 optimal_0 = [(8, 9, [0,3,4,5]), (20, 21, [5,4,3,0])]
 optimal_1 = [(8, 9, [0,3,4,5]), (20, 21, [5,4,1,0])]
+optimal_4 = [(8, 9, [0,3,4,5]), (20, 21, [5,2,1,0])]
 # optimal trajectory when visits the mall
 optimal_2 = [(6, 7, [0, 3, 4, 5]), (17, 18, [5, 2]), (20, 21, [2, 1, 0])]
 
@@ -23,7 +24,7 @@ class TestActivityEngine(unittest.TestCase):
         for i, (start, end, traj) in enumerate(activities[(0,)]):
             self.assertTrue(start == optimal_0[i][0])
             self.assertTrue(end == optimal_0[i][1])
-            self.assertTrue(traj == optimal_0[i][2] or traj == optimal_1[i][2])
+            self.assertTrue(traj in (optimal_0[i][2], optimal_1[i][2], optimal_4[i][2]))
         for i, (start, end, traj) in enumerate(activities[(1,)]):
             self.assertTrue(start == optimal_2[i][0])
             self.assertTrue(end == optimal_2[i][1])
@@ -32,6 +33,28 @@ class TestActivityEngine(unittest.TestCase):
         self.assertTrue(costs[(1,)] == -554.0)
 
 
+    def test_activity_engine_modifier(self):
+        # the callable modifier gives the same costs as the transition table
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        activities, costs = activity_engine(filepath_net, filepath_act,
+            modifier=make_modifier(1))
+        self.assertTrue(costs[(0,)] == -395.0)
+        self.assertTrue(costs[(1,)] == -554.0)
+        self.assertTrue(activities[(1,)] == optimal_2)
+
+
+    def test_activity_engine_layered(self):
+        # the layered solver gives the same results without shifting
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        activities, costs = activity_engine(filepath_net, filepath_act,
+            solver="layered")
+        self.assertTrue(costs[(0,)] == -395.0)
+        self.assertTrue(costs[(1,)] == -554.0)
+        self.assertTrue(activities[(1,)] == optimal_2)
+
+
     def test_activity_engine_2(self):
         # test on the small grid without the mall activity
         filepath_net = 'networks/SmallGrid_net_times.txt'
@@ -40,7 +63,7 @@ class TestActivityEngine(unittest.TestCase):
         for i, (start, end, traj) in enumerate(activities[()]):
             self.assertTrue(start == optimal_0[i][0])
             self.assertTrue(end == optimal_0[i][1])
-            self.assertTrue(traj == optimal_0[i][2] or traj == optimal_1[i][2])
+            self.assertTrue(traj in (optimal_0[i][2], optimal_1[i][2], optimal_4[i][2]))
         self.assertTrue(costs[()] == -395.0)
 
 
@@ -52,7 +75,7 @@ class TestActivityEngine(unittest.TestCase):
         for i, (start, end, traj) in enumerate(activities[(0,)]):
             self.assertTrue(start == optimal_0[i][0])
             self.assertTrue(end == optimal_0[i][1])
-            self.assertTrue(traj == optimal_0[i][2] or traj == optimal_1[i][2])
+            self.assertTrue(traj in (optimal_0[i][2], optimal_1[i][2], optimal_4[i][2]))
         for i, (start, end, traj) in enumerate(activities[(1,)]):
             self.assertTrue(start == optimal_2[i][0])
             self.assertTrue(end == optimal_2[i][1])
@@ -71,5 +94,41 @@ class TestActivityEngine(unittest.TestCase):
         print costs
 
 
+    def test_raw_to_cost(self):
+        # the costs of the vertex trajectories and of their edge paths
+        from graph_utils.txt_to_supernetwork import txt_to_supernetwork, read_metadata
+        from pathfinding.transitions import TransitionTable
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        g = txt_to_supernetwork(filepath_net, filepath_act)
+        metadata = read_metadata(filepath_act)
+        targets = [(90, (0,)), (90, (1,))]
+        table = TransitionTable.from_graph(g)
+        raw = dijkstra_extended(g, 0, targets, table)
+        epaths = dijkstra_extended(g, 0, targets, table, output="epath")
+        costs = raw_to_cost(raw, g, metadata)
+        self.assertTrue(costs == epaths_to_cost(epaths, g, metadata))
+        self.assertTrue(costs[(0,)] == -395.0 and costs[(1,)] == -554.0)
+
+
+    def test_activity_engine_fifo(self):
+        # with slices of one hour the trips stay in their slice and the
+        # time-dependent transport gives the same trajectories
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        truth = activity_engine(filepath_net, filepath_act, solver="dp")
+        result = activity_engine(filepath_net, filepath_act, solver="dp", transport="fifo")
+        self.assertTrue(result == truth)
+        # with slices of half an hour the trip to work takes two slices
+        filepath_net = 'networks/SmallGrid_net_times_32_steps.txt'
+        filepath_act = 'networks/SmallGrid_activities_reduced.txt'
+        activities, costs = activity_engine(filepath_net, filepath_act, solver="dp",
+            transport="fifo")
+        self.assertTrue(activities[(0,)][0] == (8.0, 8.5, [0, 3, 4]))
+        self.assertTrue(costs[(0,)] == -395.0)
+        self.assertRaises(ValueError, activity_engine, filepath_net, filepath_act,
+            transport="fifo")
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
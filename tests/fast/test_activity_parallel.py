@@ -0,0 +1,29 @@
+import unittest
+from activity_engine.activity_parallel import *
+from activity_engine.activity_batch import batch_activity_engine
+from graph_utils.txt_to_supernetwork import snap_activities_to_time_grid_get_shift
+
+__author__ = 'jeromethai'
+
+
+class TestActivityParallel(unittest.TestCase):
+
+    def test_parallel_activity_engine(self):
+        # same results in the same order as batch_activity_engine
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        metadata = {'start_time': 5, 'end_time': 21, 'num_steps': 16, 'num_nodes': 6}
+        activities = snap_activities_to_time_grid_get_shift(filepath_act, metadata)[0]
+        agents = [(h, filepath_act if h % 2 else activities, 1.0 + h % 3)
+            for h in range(6)] * 2
+        truth = batch_activity_engine(filepath_net, agents)
+        reports = []
+        progress = lambda done, total, elapsed: reports.append((done, total))
+        out = parallel_activity_engine(filepath_net, agents, processes=2,
+            chunksize=5, progress=progress)
+        self.assertTrue(out == truth)
+        self.assertTrue(reports == [(5, 12), (10, 12), (12, 12)])
+
+
+if __name__ == '__main__':
+    unittest.main()
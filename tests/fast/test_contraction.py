@@ -0,0 +1,36 @@
+import unittest
+import shutil
+import tempfile
+import numpy as np
+from igraph import Graph
+from pathfinding.contraction import *
+
+__author__ = 'jeromethai'
+
+
+class TestContraction(unittest.TestCase):
+
+    def test_contraction(self):
+        # all the distances and paths of the hierarchy are shortest paths
+        # before and after saving it
+        g = Graph.Read_Pickle('networks/SiouxFalls_net.pkl')
+        ch = ContractionHierarchy.build(g, 'weight')
+        self.assertTrue(sorted(ch.rank.tolist()) == range(g.vcount()))
+        directory = tempfile.mkdtemp()
+        try:
+            ch.save(directory)
+            loaded = ContractionHierarchy.load(directory)
+        finally:
+            shutil.rmtree(directory)
+        truth = g.shortest_paths(weights='weight')
+        for hierarchy in (ch, loaded):
+            for s in range(g.vcount()):
+                for t in range(g.vcount()):
+                    self.assertTrue(hierarchy.distance(s, t) == truth[s][t])
+                    vpath = hierarchy.query(s, t)
+                    epath = hierarchy.query(s, t, output="epath")
+                    self.assertTrue([g.es[e].tuple for e in epath] ==
+                        zip(vpath[:-1], vpath[1:]))
+                    if s != t and truth[s][t] < np.inf:
+                        self.assertTrue(vpath[0] == s and vpath[-1] == t)
+                        self.assertTrue(sum(g.es[epath]['weight']) == truth[s][t])
@@ -0,0 +1,120 @@
+import unittest
+from igraph import *
+from pathfinding.csr import *
+from pathfinding.pathfinding import *
+from pathfinding.pathfinding_extended import *
+import numpy as np
+import shutil
+import tempfile
+
+__author__ = 'jeromethai'
+
+
+class TestCSR(unittest.TestCase):
+
+    def test_from_igraph(self):
+        # check that the CSR arrays describe the same graph as the igraph
+        g = Graph.Read_Pickle('networks/SiouxFalls_net.pkl')
+        csr = CSRGraph.from_igraph(g)
+        self.assertTrue(csr.vcount() == g.vcount())
+        self.assertTrue(csr.ecount() == g.ecount())
+        for u in range(g.vcount()):
+            self.assertTrue(sorted(csr.neighbors(u)) == sorted(g.neighbors(u, mode="out")))
+            for k in range(csr.offsets[u], csr.offsets[u+1]):
+                eid = csr.eids[k]
+                self.assertTrue(g.es[eid].tuple == (u, csr.targets[k]))
+                self.assertTrue(csr.es[eid]['weight'] == g.es[eid]['weight'])
+                self.assertTrue(csr.es[eid].tuple == g.es[eid].tuple)
+        for edge in g.es:
+            self.assertTrue(csr.get_eid(*edge.tuple) == g.get_eid(*edge.tuple))
+
+
+    def test_mode_in(self):
+        # in mode "IN", the rows of the CSR are the in-edges of each vertex
+        g = Graph(edges=[(0,1),(0,2),(1,2),(2,0)], directed=True)
+        csr = CSRGraph.from_igraph(g, mode="IN")
+        self.assertTrue(csr.neighbors(2) == [0, 1])
+        self.assertTrue(csr.neighbors(0) == [2])
+        self.assertTrue(csr.get_eid(1, 2) == 2)
+
+
+    def test_save_load(self):
+        # the loaded snapshot is memory-mapped and describes the same graph
+        g = Graph.Read_Pickle('networks/SiouxFalls_net.pkl')
+        csr = CSRGraph.from_igraph(g, mode="IN")
+        directory = tempfile.mkdtemp()
+        try:
+            csr.save(directory)
+            loaded = CSRGraph.load(directory)
+            self.assertTrue(isinstance(loaded.offsets, np.memmap))
+            self.assertTrue(loaded.mode == "IN" and loaded.vcount() == csr.vcount())
+            for key in ('offsets', 'targets', 'eids', 'edge_sources', 'edge_targets'):
+                self.assertTrue(np.array_equal(getattr(loaded, key), getattr(csr, key)))
+            self.assertTrue(loaded.es['weight'] == g.es['weight'])
+            s, t = g.es[5].tuple
+            self.assertTrue(loaded.get_eid(s, t) == g.get_eid(s, t))
+        finally:
+            shutil.rmtree(directory)
+
+
+    def test_add_delete_edges(self):
+        # same CSR as compiling the igraph modified the same way
+        for mode in ("OUT", "IN"):
+            g = Graph.Read_Pickle('networks/SiouxFalls_net.pkl')
+            csr = CSRGraph.from_igraph(g, ['weight'], mode)
+            csr.lists()
+            eids = csr.add_edges([3, 0, 3], [5, 7, 1], {'weight': [1., 2., 3.]})
+            self.assertTrue(eids.tolist() == [g.ecount(), g.ecount()+1, g.ecount()+2])
+            g.add_edges([(3, 5), (0, 7), (3, 1)])
+            g.es[g.ecount()-3:]['weight'] = [1., 2., 3.]
+            csr.delete_edges([10, 0, g.ecount()-2])
+            g.delete_edges([10, 0, g.ecount()-2])
+            truth = CSRGraph.from_igraph(g, ['weight'], mode)
+            for key in ('offsets', 'targets', 'eids', 'edge_sources', 'edge_targets'):
+                self.assertTrue(np.array_equal(getattr(csr, key), getattr(truth, key)))
+            self.assertTrue(csr.lists() == truth.lists())
+            self.assertTrue(csr.es['weight'] == g.es['weight'])
+            csr.set_attr('weight', [1, 4], [7., 8.])
+            self.assertTrue(csr.es['weight'][1] == 7. and csr.attrs['weight'][4] == 8.)
+
+
+    def test_dijkstra_csr(self):
+        # dijkstra on the CSRGraph gives the same costs as on the igraph
+        g = Graph.Read_Pickle('networks/SiouxFalls_net.pkl')
+        csr = CSRGraph.from_igraph(g, ['weight'])
+        for v in range(g.vcount()):
+            output1 = g.get_shortest_paths(v, weights='weight', output='epath')
+            for algo in [dijkstra, dijkstra_with_heap]:
+                output2 = algo(csr, v, weights='weight', output='epath')
+                for path1,path2 in zip(output1, output2):
+                    cost1 = sum([g.es[eid]['weight'] for eid in path1])
+                    cost2 = sum([g.es[eid]['weight'] for eid in path2])
+                    self.assertTrue(cost1==cost2)
+        # the snapshot is not searched in the other direction
+        self.assertRaises(ValueError, dijkstra, csr, 0, weights='weight', mode="IN")
+        csr = CSRGraph.from_igraph(g, ['weight'], mode="IN")
+        self.assertTrue(dijkstra(csr, 0, weights='weight', mode="IN") ==
+            dijkstra(g, 0, weights='weight', mode="IN"))
+
+
+    def test_dijkstra_extended_csr(self):
+        # dijkstra_extended on the CSRGraph of networks/SmallGrid.pkl
+        # see test_pathfinding_extended_4 in test_pathfinding_extended.py
+        g = Graph.Read_Pickle('networks/SmallGrid.pkl')
+        csr = CSRGraph.from_igraph(g)
+
+        def modifier(edge=None, a=None):
+            if edge is None and a is None: return 1
+            w = edge['weight']
+            u = edge.tuple[1]
+            if edge['type'] == -1: return w, (u, a)
+            if edge['type'] == 0 and a[0] == 0: return w, (u, (1,))
+            if edge['type'] == 0 and a[0] == 1: return np.inf, -1
+
+        out = dijkstra_extended(csr, 0, [(90,(0,)), (90,(1,))], modifier)
+        self.assertTrue(out[0] == [0, 6, 12, 18, 21, 22, 23, 95, 94, 93, 90])
+        self.assertTrue(out[1] == [0, 6, 9, 10, 11, 77, 74, 92, 91, 90])
+
+
+if __name__ == '__main__':
+    unittest.main()
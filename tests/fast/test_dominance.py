@@ -0,0 +1,66 @@
+import unittest
+import itertools
+import random
+import numpy as np
+from igraph import Graph
+from pathfinding.dominance import *
+from pathfinding.pathfinding_extended import dijkstra_extended
+from pathfinding.transitions import TransitionTable
+from activity_engine.activity_engine import activity_engine
+
+__author__ = 'jeromethai'
+
+
+class TestDominance(unittest.TestCase):
+
+    def test_rules(self):
+        # on a random graph with 4 activity types, the targets that are kept
+        # have the costs of dijkstra_extended() and the others are dominated
+        random.seed(3) # igraph draws the graph with the random module
+        np.random.seed(3)
+        g = Graph.Erdos_Renyi(n=40, m=240, directed=True)
+        types = np.random.randint(-1, 4, g.ecount())
+        weights = np.random.randint(1, 20, g.ecount()).astype(float)
+        table = TransitionTable(types, weights, num_types=4)
+        combinations = list(itertools.product([0, 1], repeat=4))
+        targets = [(7, a) for a in combinations]
+        epaths = dijkstra_extended(g, 0, targets, table, output="epath")
+        costs = [weights[epath].sum() if len(epath) > 0 else np.inf for epath in epaths]
+        dominance = Dominance(inclusion=True)
+        pruned = dijkstra_dominance(g, 0, targets, table, dominance, output="epath")
+        self.assertTrue(dominance.pruned_inclusion > 0 and dominance.pruned_bound == 0)
+        for a, cost, epath in zip(combinations, costs, pruned):
+            if len(epath) > 0:
+                self.assertTrue(weights[epath].sum() == cost)
+            elif cost < np.inf: # dominated by a cheaper subset
+                self.assertTrue(any(c <= cost and b != a and all(x <= y for x, y in zip(b, a))
+                    for b, c in zip(combinations, costs)))
+        # the bound rule only keeps the best target
+        for inclusion in (False, True):
+            dominance = Dominance(inclusion, bound=True)
+            vpaths = dijkstra_dominance(g, 0, targets, table, dominance)
+            self.assertTrue(dominance.pruned_bound > 0)
+            self.assertTrue(sum(len(vpath) > 0 for vpath in vpaths) == 1)
+            best = np.argmin(costs)
+            self.assertTrue(vpaths[best] == [g.es[e].source for e in epaths[best]] + [7])
+
+
+    def test_activity_engine(self):
+        # the optimal schedule is kept and fewer labels are settled
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        truth = activity_engine(filepath_net, filepath_act)
+        settled = []
+        for rules in ((False, False), (True, False), (True, True)):
+            dominance = Dominance(*rules)
+            activities, costs = activity_engine(filepath_net, filepath_act,
+                dominance=dominance)
+            self.assertTrue(activities[(1,)] == truth[0][(1,)] and costs[(1,)] == -554.0)
+            settled.append(dominance.settled)
+        self.assertTrue(settled[0] > settled[1] > settled[2])
+        self.assertRaises(ValueError, activity_engine, filepath_net, filepath_act,
+            solver="layered", dominance=Dominance())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+from pathfinding.dynamic import *
+from pathfinding.pathfinding_extended import dijkstra_extended
+from pathfinding.transitions import TransitionTable
+from igraph import Graph
+from graph_utils.txt_to_supernetwork import txt_to_supernetwork
+
+__author__ = 'jeromethai'
+
+
+class TestDynamic(unittest.TestCase):
+
+    def test_dynamic(self):
+        # the repaired distances are the same as a full solve after random
+        # increases and decreases of the weights
+        g = Graph.Read_Pickle('networks/SiouxFalls_net.pkl')
+        solver = DynamicSSSP(g, 0)
+        to = range(g.vcount())
+        np.random.seed(0)
+        for k in range(10):
+            eids = np.random.choice(g.ecount(), 5, replace=False)
+            weights = np.array(g.es['weight'])[eids] * np.random.uniform(0.2, 3.0, 5)
+            g.es[eids.tolist()]['weight'] = weights.tolist()
+            solver.update(eids, weights)
+            dist = g.shortest_paths(0, weights='weight')[0]
+            self.assertTrue(np.allclose(solver.distances(to), dist))
+            # the edge paths follow the vertex paths
+            for vpath, epath in zip(solver.get_vpaths(to), solver.get_epaths(to)):
+                self.assertTrue([g.es[e].tuple for e in epath] == zip(vpath[:-1], vpath[1:]))
+        # an edge outside of the shortest path tree settles no label
+        tree = set(solver.prev_edge)
+        e = [x for x in range(g.ecount()) if x not in tree][0]
+        self.assertTrue(solver.update([e], [g.es[e]['weight'] + 1.0]) == 0)
+
+
+    def test_dynamic_table(self):
+        # same with the labels (u,a) of the supernetwork
+        g = txt_to_supernetwork('networks/SmallGrid_net_times.txt',
+            'networks/SmallGrid_activities.txt')
+        table = TransitionTable.from_graph(g)
+        solver = DynamicSSSP(g, 0, table=table)
+        to = [(u, a) for u in range(g.vcount()) for a in ((0,), (1,))]
+        np.random.seed(1)
+        roads = [e.index for e in g.es if e['type'] == -1]
+        for k in range(5):
+            eids = np.random.choice(roads, 10, replace=False)
+            weights = table.weights[eids] * np.random.uniform(0.2, 3.0, 10)
+            table.set_weights(eids, weights)
+            solver.update(eids, weights)
+            full = TransitionTable.from_graph(g, weights=table.weights)
+            out = dijkstra_extended(g, 0, to, full)
+            dist = solver.distances(to)
+            self.assertTrue(np.isfinite(dist).sum() > len(to) / 4)
+            self.assertTrue(sum(len(path) > 0 for path in out) > len(to) / 4)
+            for (u, a), path, d in zip(to, out, dist):
+                if path == []: # the source or not reached
+                    self.assertTrue(d == (0.0 if (u, a) == (0, (0,)) else np.inf))
+                    continue
+                cost = sum(full.weights[g.get_eid(x, y)] for x, y in zip(path[:-1], path[1:]))
+                self.assertTrue(np.isclose(d, cost))
@@ -0,0 +1,73 @@
+import unittest
+import random
+import numpy as np
+from igraph import Graph
+from pathfinding.enumeration import *
+from pathfinding.transitions import TransitionTable
+from graph_utils.txt_to_supernetwork import txt_to_supernetwork
+from activity_engine.activity_engine import activity_schedules, activity_engine
+
+__author__ = 'jeromethai'
+
+
+class TestEnumeration(unittest.TestCase):
+
+    def test_k_shortest(self):
+        # same costs as the enumeration of all the simple paths
+        random.seed(1) # igraph draws the graph with the random module
+        np.random.seed(1)
+        g = Graph.Erdos_Renyi(n=9, m=30, directed=True)
+        g.es['weight'] = np.random.randint(1, 10, g.ecount()).tolist()
+        table = TransitionTable([-1] * g.ecount(), g.es['weight'], num_types=0)
+        costs = sorted(sum(g.es[g.get_eid(u, x)]['weight'] for u, x in zip(p[:-1], p[1:]))
+            for p in g.get_all_simple_paths(0, to=8))
+        paths = k_shortest_extended(g, 0, [(8, ())], table, 12)
+        self.assertTrue([cost for cost, a, vpath in paths] == costs[:12])
+        k = min(12, len(costs))
+        self.assertTrue(len(set(tuple(vpath) for cost, a, vpath in paths)) == k)
+        for cost, a, vpath in paths:
+            self.assertTrue(vpath[0] == 0 and vpath[-1] == 8 and len(set(vpath)) == len(vpath))
+        epaths = k_shortest_extended(g, 0, [(8, ())], table, 12, output="epath")
+        for (cost, a, epath), (c, b, vpath) in zip(epaths, paths):
+            self.assertTrue(sum(g.es[epath]['weight']) == cost)
+        # fewer paths than k
+        self.assertTrue(len(k_shortest_extended(g, 0, [(8, ())], table, 10**6)) == len(costs))
+
+
+    def test_schedules(self):
+        # the k best schedules start with the optimal schedule and the Pareto
+        # set contains the optimal schedule of each activity combination
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        activities, costs = activity_engine(filepath_net, filepath_act)
+        schedules = activity_schedules(filepath_net, filepath_act, k=8)
+        self.assertTrue(len(schedules) == 8)
+        self.assertTrue(schedules[0][2] == min(costs.values()))
+        self.assertTrue(schedules[0][1] == activities[schedules[0][0]])
+        self.assertTrue(all(x[2] <= y[2] for x, y in zip(schedules[:-1], schedules[1:])))
+        self.assertTrue(len(set(repr(s[1]) for s in schedules)) == 8)
+        front = activity_schedules(filepath_net, filepath_act, pareto=True)
+        for a, schedule, travel, reward in front:
+            self.assertTrue(not any(t <= travel and r >= reward and (t, r) != (travel, reward)
+                for b, s, t, r in front))
+        for a, cost in costs.items():
+            self.assertTrue(min(t - r for b, s, t, r in front if b == a) == cost)
+
+
+    def test_pareto_layered(self):
+        # on the supernetwork with the travel times and minus the rewards
+        g = txt_to_supernetwork('networks/SmallGrid_net_times.txt',
+            'networks/SmallGrid_activities.txt', shifting=False)
+        table = TransitionTable.from_graph(g, num_types=1)
+        raw = np.array(g.es['raw_weight'])
+        travel, loss = np.where(raw > 0, raw, 0.0), np.where(raw > 0, 0.0, raw)
+        front = pareto_layered(g, 0, [90], table, 6, (travel, loss))
+        self.assertTrue([(x1, x2) for x1, x2, a, epath in front] ==
+            [(0.0, 0.0), (20.0, -200.0), (42.0, -320.0), (45.0, -440.0), (46.0, -600.0)])
+        for x1, x2, a, epath in front:
+            self.assertTrue(np.isclose(travel[epath].sum(), x1) and np.isclose(loss[epath].sum(), x2))
+        self.assertRaises(ValueError, pareto_layered, g, 0, [90], table, 6, (-travel, loss))
+
+
+if __name__ == '__main__':
+    unittest.main()
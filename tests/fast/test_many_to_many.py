@@ -0,0 +1,41 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from igraph import Graph
+from pathfinding.many_to_many import *
+from pathfinding.contraction import ContractionHierarchy
+
+__author__ = 'jeromethai'
+
+
+class TestManyToMany(unittest.TestCase):
+
+    def test_distance_matrix(self):
+        # the methods give the distances of igraph
+        g = Graph.Read_Pickle('networks/SiouxFalls_net.pkl')
+        truth = np.array(g.shortest_paths(weights='weight'))
+        sources, targets = [3, 1, 7, 0, 24], [5, 5, 2, 0, 11, 20]
+        hierarchy = ContractionHierarchy.build(g, 'weight')
+        for method in ("auto", "sssp", "floyd", "buckets"):
+            D = distance_matrix(g, weights='weight', method=method, chunk=7,
+                hierarchy=hierarchy if method == "buckets" else None)
+            self.assertTrue(np.array_equal(D, truth))
+            D = distance_matrix(g, sources, targets, 'weight', method, chunk=2)
+            self.assertTrue(np.array_equal(D, truth[np.ix_(sources, targets)]))
+        self.assertRaises(ValueError, distance_matrix, g, method="dense")
+
+
+    def test_memmap(self):
+        # the rows are streamed to a .npy file
+        g = Graph.Read_Pickle('networks/SiouxFalls_net.pkl')
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'skim.npy')
+            D = distance_matrix(g, weights='weight', method="sssp", out=filename, chunk=4)
+            self.assertTrue(isinstance(D, np.memmap))
+            self.assertTrue(np.array_equal(np.load(filename), D))
+            del D
+        finally:
+            shutil.rmtree(directory)
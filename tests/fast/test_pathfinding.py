@@ -114,5 +114,26 @@ class TestPathfinding(unittest.TestCase):
                 # remember that shortest paths are not unique
                 self.assertTrue(cost1==cost2)
 
+
+    def test_solver(self):
+        # back-to-back queries of ShortestPathSolver give the distances of
+        # igraph, the buffers of a query do not leak into the next one
+        g = Graph.Read_Pickle('networks/SiouxFalls_net.pkl')
+        solver = ShortestPathSolver(g, weights='weight')
+        np.random.seed(0)
+        for i in range(10):
+            v = np.random.randint(1, 25)
+            to = [4, 5, 6] if i % 2 == 0 else None
+            epaths = solver.solve(v, to, output="epath")
+            truth = g.shortest_paths(v, target=to, weights='weight')[0]
+            dist = solver.distances(to)
+            for path, d1, d2 in zip(epaths, dist, truth):
+                self.assertTrue(d1 == d2)
+                if d2 < np.inf: # vertex 0 is not reachable
+                    self.assertTrue(sum([g.es[eid]['weight'] for eid in path]) == d2)
+            # only the vertices visited by the query are reset by the next one
+            self.assertTrue(len(solver.touched) == sum(np.isfinite(solver.dist)))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -171,6 +171,85 @@ class TestPathfindingExtended(unittest.TestCase):
         self.assertTrue(out[2] == [])
 
 
+    def test_pathfinding_extended_sparse(self):
+        # same as test_pathfinding_extended_4 when dist and prev are
+        # stored in sparse dictionaries instead of dense arrays
+        import pathfinding.pathfinding_extended as pe
+        g = Graph.Read_Pickle('networks/SmallGrid.pkl')
+
+        def modifier(edge=None, a=None):
+            if edge is None and a is None: return 1
+            w = edge['weight']
+            u = edge.tuple[1]
+            if edge['type'] == -1: return w, (u, a)
+            if edge['type'] == 0 and a[0] == 0: return w, (u, (1,))
+            if edge['type'] == 0 and a[0] == 1: return np.inf, -1
+
+        max_dense = pe.MAX_DENSE_LABELS
+        pe.MAX_DENSE_LABELS = 0
+        try:
+            out = dijkstra_extended(g, 0, [(90,(0,)), (90,(1,)), (90,(2,))], modifier)
+        finally:
+            pe.MAX_DENSE_LABELS = max_dense
+        self.assertTrue(out[0] == [0, 6, 12, 18, 21, 22, 23, 95, 94, 93, 90])
+        self.assertTrue(out[1] == [0, 6, 9, 10, 11, 77, 74, 92, 91, 90])
+        self.assertTrue(out[2] == [])
+
+
+    def test_counting_modifier(self):
+        # a modifier that counts the traversals of the edges of type 0
+        # the counters are not 0/1 vectors
+        g = Graph(edges=[(0,1),(1,2),(2,3)], directed=True)
+        g.es['weight'] = [10, 10, 10]
+        g.es['type'] = [0, -1, 0]
+
+        def modifier(edge=None, a=None):
+            if edge is None and a is None: return 1
+            u = edge.tuple[1]
+            if edge['type'] == -1: return edge['weight'], (u, a)
+            return edge['weight'], (u, (a[0]+1,))
+
+        to = [(3,(1,)), (3,(2,))]
+        self.assertTrue(dijkstra_extended(g, 0, to, modifier) == [[], [0, 1, 2, 3]])
+        self.assertTrue(dijkstra_extended(g, 0, to, modifier, output="epath") ==
+            [[], [0, 1, 2]])
+
+
+    def test_activity_codec(self):
+        # activity counters are encoded as bitmasks
+        codec = ActivityCodec(3)
+        self.assertTrue(codec.encode((1,0,1)) == 5)
+        self.assertTrue(codec.decode(6) == (0,1,1))
+        self.assertTrue(codec.labels([(2,(0,0,1)), (1,(2,0,0))]) == [20, None])
+        self.assertRaises(ValueError, codec.encode, (0,2,0))
+
+
+    def test_epath(self):
+        # the edge paths recorded by the solvers follow their vertex paths
+        # on the supernetwork and on the implicit supernetwork
+        from pathfinding.pathfinding_layered import dijkstra_layered
+        from pathfinding.transitions import TransitionTable
+        from graph_utils.txt_to_supernetwork import txt_to_supernetwork, \
+            txt_to_time_expanded_graph
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        for filepath_act in ('networks/SmallGrid_activities.txt',
+            'networks/SmallGrid_activities_reduced.txt'):
+            g = txt_to_supernetwork(filepath_net, filepath_act)
+            implicit = txt_to_time_expanded_graph(filepath_net, filepath_act)
+            to = [(u, (x, y)) for u in range(g.vcount()) for x in (0,1) for y in (0,1)]
+            table = TransitionTable.from_graph(g, num_types=2)
+            solvers = [
+                lambda output: dijkstra_extended(g, 0, to, table, output=output),
+                lambda output: dijkstra_layered(g, 0, to, table, implicit.num_nodes,
+                    output=output),
+                lambda output: dijkstra_extended(implicit, 0, to,
+                    implicit.transition_table(2), output=output)]
+            for graph, solve in zip([g, g, implicit], solvers):
+                for vpath, epath in zip(solve("vpath"), solve("epath")):
+                    self.assertTrue([graph.es[e].tuple for e in epath] ==
+                        zip(vpath[:-1], vpath[1:]))
+
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from igraph import *
+from pathfinding.pathfinding_layered import *
+from pathfinding.pathfinding_extended import dijkstra_extended
+from pathfinding.transitions import TransitionTable
+import numpy as np
+
+__author__ = 'jeromethai'
+
+# this module tests pathfinding layered, which is a specialization of
+# pathfinding extended to time-expanded networks
+
+
+def modifier(edge=None, a=None):
+    # modifier of test_pathfinding_extended_2 in test_pathfinding_extended.py
+    if edge is None and a is None: return 2
+    w = edge['weight']
+    i = edge['type']
+    u = edge.tuple[1]
+    if i == -1: return w, (u, a)
+    if i >= 0 and a[i] == 0: return w, (u, a[:i]+(1,)+a[i+1:])
+    if i >= 0 and a[i] == 1: return np.inf, -1
+
+
+def layered_graph(activity_weights):
+    # network of test_pathfinding_extended_2 in test_pathfinding_extended.py
+    # with 3 time slices of 3 nodes
+    edges = [(0,1),(1,0),(0,2),(2,0),(1,2),(2,1),
+            (3,4),(4,3),(3,5),(5,3),(4,5),(5,4),
+            (6,7),(7,6),(6,8),(8,6),(7,8),(8,7),
+            (0,3),(1,4),(2,5),(3,6),(4,7),(5,8)]
+    g = Graph(edges=edges, directed=True)
+    g.es['weight'] = [10.]*18 + activity_weights
+    g.es['type'] = [-1]*18 + [-1, 0, 1, -1, 0, 1]
+    return g
+
+
+class TestPathfindingLayered(unittest.TestCase):
+
+    def test_pathfinding_layered_1(self):
+        # same paths as dijkstra_extended
+        g = layered_graph([100., 60., 40., 100., 50., 20.])
+        to = [(6,(0,0)), (6,(1,0)), (6,(0,1)), (6,(1,1))]
+        for m in [modifier, TransitionTable.from_graph(g)]:
+            out = dijkstra_layered(g, 0, to, m, 3)
+            self.assertTrue(out[0] == [0, 3, 6])
+            self.assertTrue(out[1] == [0, 3, 4, 7, 6])
+            self.assertTrue(out[2] == [0, 3, 5, 8, 6])
+            self.assertTrue(out[3] == [0, 1, 4, 5, 8, 6])
+
+
+    def test_pathfinding_layered_negative(self):
+        # activity edges have negative weights (minus the rewards) without shift
+        # the optimal paths are the same as with the shift of 100 per slice
+        g = layered_graph([0., -40., -60., 0., -50., -80.])
+        to = [(6,(0,0)), (6,(1,0)), (6,(0,1)), (6,(1,1))]
+        out = dijkstra_layered(g, 0, to, TransitionTable.from_graph(g), 3)
+        self.assertTrue(out[0] == [0, 3, 6])
+        self.assertTrue(out[1] == [0, 3, 4, 7, 6])
+        self.assertTrue(out[2] == [0, 3, 5, 8, 6])
+        self.assertTrue(out[3] == [0, 1, 4, 5, 8, 6])
+
+
+    def test_pathfinding_layered_errors(self):
+        # edges going back in time or negative weights within a slice
+        g = layered_graph([100., 60., 40., 100., 50., 20.])
+        g.add_edge(4, 0)
+        g.es[g.ecount()-1]['weight'] = 1.
+        g.es[g.ecount()-1]['type'] = -1
+        self.assertRaises(ValueError, dijkstra_layered, g, 0, [(6,(0,0))], modifier, 3)
+        g = layered_graph([100., 60., 40., 100., 50., 20.])
+        g.es[0]['weight'] = -1.
+        table = TransitionTable.from_graph(g)
+        self.assertRaises(ValueError, dijkstra_layered, g, 0, [(6,(0,0))], table, 3)
+
+
+    def test_pathfinding_layered_supernetwork(self):
+        # see test_pathfinding_extended_4 in test_pathfinding_extended.py
+        g = Graph.Read_Pickle('networks/SmallGrid.pkl')
+        table = TransitionTable.from_graph(g, num_types=1)
+        out = dijkstra_layered(g, 0, [(90,(0,)), (90,(1,)), (90,(2,))], table, 6)
+        self.assertTrue(out[0] == [0, 6, 12, 18, 21, 22, 23, 95, 94, 93, 90])
+        self.assertTrue(out[1] == [0, 6, 9, 10, 11, 77, 74, 92, 91, 90])
+        self.assertTrue(out[2] == [])
+
+
+if __name__ == '__main__':
+    unittest.main()
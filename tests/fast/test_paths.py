@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+from igraph import Graph
+from pathfinding.paths import *
+from pathfinding.pathfinding import dijkstra
+from pathfinding.pathfinding_extended import _SparseStore
+
+__author__ = 'jeromethai'
+
+
+class TestPaths(unittest.TestCase):
+
+    def test_trace(self):
+        # tree 0 -> 1 -> 2 -> 3 and 0 -> 4, vertex 5 is not reached
+        prev = [-1, 0, 1, 2, 0, -1]
+        prev_edge = [-1, 10, 11, 12, 13, -1]
+        to = [3, 4, 5, 0, 2]
+        vpaths = trace_vpaths(prev, to)
+        self.assertTrue(vpaths.tolist() == [[0,1,2,3], [0,4], [], [], [0,1,2]])
+        self.assertTrue(vpaths.lengths().tolist() == [4, 2, 0, 0, 3])
+        self.assertTrue(vpaths[1] == [0,4] and len(vpaths) == 5)
+        epaths = trace_epaths(prev, prev_edge, to)
+        self.assertTrue(list(epaths) == [[10,11,12], [13], [], [], [10,11]])
+        # labels with num_states = 2 and labels None
+        self.assertTrue(trace_vpaths(prev, [3, None], 2).tolist() == [[0,0,1,1], []])
+        # sparse dictionaries give the same paths
+        sparse, sparse_edge = _SparseStore(-1), _SparseStore(-1)
+        for u in range(6):
+            if prev[u] != -1: sparse[u], sparse_edge[u] = prev[u], prev_edge[u]
+        self.assertTrue(trace_vpaths(sparse, to).tolist() == vpaths.tolist())
+        self.assertTrue(trace_epaths(sparse, sparse_edge, to).tolist() == epaths.tolist())
+
+
+    def test_same_as_igraph(self):
+        # the edge paths of dijkstra() follow its vertex paths
+        g = Graph.Read_Pickle('networks/SiouxFalls_net.pkl')
+        for v in range(1, 6):
+            vpaths = dijkstra(g, v, weights='weight', queue="binary")
+            epaths = dijkstra(g, v, weights='weight', output="epath", queue="binary")
+            truth = g.shortest_paths(v, weights='weight')[0]
+            for u, (vpath, epath) in enumerate(zip(vpaths, epaths)):
+                self.assertTrue([g.es[e].tuple for e in epath] == zip(vpath[:-1], vpath[1:]))
+                if truth[u] == np.inf: self.assertTrue(epath == []) # vertex 0
+                else: self.assertTrue(np.isclose(sum(g.es[epath]['weight']), truth[u]))
@@ -0,0 +1,63 @@
+import unittest
+import shutil
+import tempfile
+import numpy as np
+from igraph import Graph
+from pathfinding.point_to_point import *
+from pathfinding.csr import CSRGraph
+
+__author__ = 'jeromethai'
+
+
+class TestPointToPoint(unittest.TestCase):
+
+    def test_point_to_point(self):
+        # bidirectional dijkstra, A* and ALT give the distances of igraph
+        g = Graph.Read_Pickle('networks/ChicagoSketch_net.pkl')
+        landmarks = Landmarks.build(g, 4, 'weight')
+        self.assertTrue(len(set(landmarks.vertices.tolist())) == 4)
+        p2p = PointToPoint(g, 'weight', landmarks=landmarks)
+        np.random.seed(0)
+        pairs = np.random.randint(g.vcount(), size=(20, 2)).tolist() + [[3, 3]]
+        truth = g.shortest_paths(weights='weight')
+        for s, t in pairs:
+            for query in (p2p.bidirectional, p2p.alt,
+                lambda s, t, output: p2p.astar(s, t, output=output)):
+                vpath = query(s, t, output="vpath")
+                epath = query(s, t, output="epath")
+                self.assertTrue(np.isclose(p2p.distance, truth[s][t]))
+                self.assertTrue([g.es[e].tuple for e in epath] == zip(vpath[:-1], vpath[1:]))
+                if s != t and truth[s][t] < np.inf:
+                    self.assertTrue(vpath[0] == s and vpath[-1] == t)
+                    self.assertTrue(np.isclose(sum(g.es[epath]['weight']), truth[s][t]))
+        # the functions
+        s, t = pairs[0]
+        self.assertTrue(bidirectional_dijkstra(g, s, t, 'weight') == p2p.bidirectional(s, t))
+        h = landmarks.heuristic(t)
+        self.assertTrue(np.isclose(sum(g.es[astar(g, s, t, h, 'weight', output="epath")]
+            ['weight']), truth[s][t]))
+
+
+    def test_landmarks_save_load(self):
+        # the landmarks are saved next to the graph and loaded with it
+        g = Graph.Read_Pickle('networks/SiouxFalls_net.pkl')
+        csr = CSRGraph.from_igraph(g)
+        landmarks = Landmarks.build(csr, 3, 'weight')
+        # vertex 0 has no edges and is never a landmark
+        self.assertTrue(0 not in landmarks.vertices.tolist())
+        directory = tempfile.mkdtemp()
+        try:
+            csr.save(directory)
+            landmarks.save(directory)
+            loaded = Landmarks.load(directory)
+            graph = CSRGraph.load(directory)
+        finally:
+            shutil.rmtree(directory)
+        self.assertTrue(np.array_equal(loaded.dist_from, landmarks.dist_from))
+        self.assertTrue(np.array_equal(loaded.dist_to, landmarks.dist_to))
+        p2p = PointToPoint(graph, 'weight', landmarks=loaded)
+        truth = g.shortest_paths(weights='weight')
+        for s in range(g.vcount()):
+            for t in range(g.vcount()):
+                p2p.alt(s, t)
+                self.assertTrue(np.isclose(p2p.distance, truth[s][t]))
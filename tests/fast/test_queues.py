@@ -0,0 +1,104 @@
+import unittest
+from igraph import *
+from pathfinding.queues import *
+from pathfinding.pathfinding import *
+from pathfinding.pathfinding_extended import *
+import numpy as np
+
+__author__ = 'jeromethai'
+
+
+class TestQueues(unittest.TestCase):
+
+    def test_queues_sort(self):
+        # pushing random priorities then popping everything sorts them
+        # with some decrease-keys on the way
+        for name in queues:
+            Q = make_queue(name)
+            priorities = {}
+            for i in range(200):
+                item = np.random.randint(50)
+                p = np.random.randint(1000)
+                Q.push(item, p)
+                priorities[item] = min(p, priorities.get(item, np.inf))
+            self.assertTrue(len(Q) == len(priorities))
+            out = []
+            while len(Q) > 0: out.append(Q.pop())
+            self.assertTrue([p for i, p in out] == sorted(priorities.values()))
+            self.assertTrue(dict(out) == priorities)
+
+
+    def test_queues_monotone(self):
+        # interleaved pushes and pops as in Dijkstra's algorithm
+        for name in queues:
+            Q = make_queue(name)
+            Q.push('a', 3)
+            Q.push('b', 5)
+            Q.push('b', 4) # decrease-key
+            self.assertTrue(Q.pop() == ('a', 3))
+            Q.push('c', 3)
+            Q.push('d', 7)
+            self.assertTrue(Q.pop() == ('c', 3))
+            self.assertTrue(Q.pop() == ('b', 4))
+            self.assertTrue('d' in Q)
+            self.assertTrue(Q.pop() == ('d', 7))
+            self.assertTrue(len(Q) == 0)
+
+
+    def test_radix_queue_errors(self):
+        # radix queue only accepts non-decreasing integer priorities
+        Q = RadixQueue()
+        self.assertRaises(ValueError, Q.push, 'a', 1.5)
+        Q.push('a', 4)
+        Q.pop()
+        self.assertRaises(ValueError, Q.push, 'b', 3)
+        self.assertRaises(ValueError, make_queue, 'fibonacci')
+
+
+    def test_dijkstra_queues(self):
+        # all queues give shortest paths of the same costs
+        # the weights of SiouxFalls are integers, hence the radix queue works
+        g = Graph.Read_Pickle('networks/SiouxFalls_net.pkl')
+        for v in range(g.vcount()):
+            output1 = g.get_shortest_paths(v, weights='weight', output='epath')
+            for name in queues:
+                output2 = dijkstra(g, v, weights='weight', output='epath', queue=name)
+                for path1,path2 in zip(output1, output2):
+                    cost1 = sum([g.es[eid]['weight'] for eid in path1])
+                    cost2 = sum([g.es[eid]['weight'] for eid in path2])
+                    self.assertTrue(cost1==cost2)
+
+
+    def test_dijkstra_extended_queues(self):
+        # see test_pathfinding_extended_4 in test_pathfinding_extended.py
+        g = Graph.Read_Pickle('networks/SmallGrid.pkl')
+
+        def modifier(edge=None, a=None):
+            if edge is None and a is None: return 1
+            w = edge['weight']
+            u = edge.tuple[1]
+            if edge['type'] == -1: return w, (u, a)
+            if edge['type'] == 0 and a[0] == 0: return w, (u, (1,))
+            if edge['type'] == 0 and a[0] == 1: return np.inf, -1
+
+        for name in queues:
+            out = dijkstra_extended(g, 0, [(90,(0,)), (90,(1,))], modifier, queue=name)
+            self.assertTrue(out[0] == [0, 6, 12, 18, 21, 22, 23, 95, 94, 93, 90])
+            self.assertTrue(out[1] == [0, 6, 9, 10, 11, 77, 74, 92, 91, 90])
+
+
+    def test_dijkstra_extended_table_queues(self):
+        # same with a TransitionTable, the optimal paths are not unique and the
+        # linear queue breaks the ties differently, hence compare the costs
+        from pathfinding.transitions import TransitionTable
+        g = Graph.Read_Pickle('networks/SmallGrid.pkl')
+        table = TransitionTable.from_graph(g)
+        cost = lambda p: sum([g.es[g.get_eid(s,t)]['weight'] for s,t in zip(p[:-1],p[1:])])
+        for name in queues:
+            out = dijkstra_extended(g, 0, [(90,(0,)), (90,(1,))], table, queue=name)
+            self.assertTrue(cost(out[0]) == 610.0)
+            self.assertTrue(cost(out[1]) == 451.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import shutil
+import tempfile
+import numpy as np
+from activity_engine.skims import *
+from activity_engine.activity_engine import activity_engine
+from activity_engine.activity_batch import load_network
+from graph_utils.txt_to_supernetwork import link_arrays
+from graph_utils.supernetwork_cache import SupernetworkCache
+
+__author__ = 'jeromethai'
+
+
+def td_dijkstra(sources, targets, weights, num_nodes, k, departure, slice_length):
+    # earliest arrival times from k with waiting, one link entry time at a time
+    num_steps = weights.shape[1]
+    arrival = [np.inf] * num_nodes
+    arrival[k] = departure
+    done = set()
+    while len(done) < num_nodes:
+        u = min((arrival[n], n) for n in range(num_nodes) if n not in done)[1]
+        done.add(u)
+        if arrival[u] == np.inf: break
+        for l in np.flatnonzero(sources == u):
+            # try all the entry times: now and the beginning of later slices
+            i = min(int(arrival[u] // slice_length), num_steps-1)
+            best = arrival[u] + weights[l, i]
+            for j in range(i+1, num_steps):
+                best = min(best, j * slice_length + weights[l, j])
+            arrival[targets[l]] = min(arrival[targets[l]], best)
+    return np.array(arrival) - departure
+
+
+class TestSkims(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filepath_net = 'networks/SmallGrid_net_times.txt'
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def test_fifo(self):
+        # same as a time-dependent dijkstra with short slices such that the
+        # trips span several slices
+        metadata, sources, targets, weights = link_arrays(self.filepath_net)
+        num_steps, num_nodes = metadata['num_steps'], metadata['num_nodes']
+        D, succ = skims(self.filepath_net, "fifo", slice_length=5.0)
+        self.assertTrue(succ is None)
+        self.assertTrue(D.shape == (num_steps, num_nodes, num_nodes))
+        for i in range(num_steps):
+            for k in range(num_nodes):
+                truth = td_dijkstra(sources, targets, weights, num_nodes, k, 5.0*i, 5.0)
+                self.assertTrue(np.allclose(D[i, k], truth))
+        # FIFO: leaving later never arrives earlier
+        arrival = D + 5.0 * np.arange(num_steps)[:, None, None]
+        self.assertTrue(np.all(np.diff(arrival, axis=0) >= 0.0))
+        # with slices of one hour, the trips of SmallGrid stay in their slice
+        static, succ = skims(self.filepath_net)
+        self.assertTrue(np.array_equal(skims(self.filepath_net, "fifo")[0], static))
+        self.assertTrue(static[3, 2, 5] == 15.0)
+
+
+    def test_cache(self):
+        # the skims are computed once and loaded with memory mapping
+        cache = SkimCache(self.directory)
+        for i in range(2):
+            D, succ = cache.get(self.filepath_net)
+            self.assertTrue(len(cache.entries()) == 1)
+        static = skims(self.filepath_net)
+        self.assertTrue(isinstance(D, np.memmap))
+        self.assertTrue(np.array_equal(D, static[0]) and np.array_equal(succ, static[1]))
+        D, succ = cache.get(self.filepath_net, "fifo", slice_length=5.0)
+        self.assertTrue(succ is None and len(cache.entries()) == 2)
+        self.assertRaises(ValueError, cache.get, self.filepath_net, "dynamic")
+        # consumers
+        network = load_network(self.filepath_net, cache)
+        self.assertTrue(np.array_equal(network[1], static[0]))
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        truth = activity_engine(self.filepath_net, filepath_act, solver="dp")
+        result = activity_engine(self.filepath_net, filepath_act, solver="dp",
+            skim_cache=cache)
+        self.assertTrue(result == truth)
+        # a SupernetworkCache is not a SkimCache, they only share NpyCache
+        self.assertTrue(not isinstance(cache, SupernetworkCache))
+        self.assertRaises(ValueError, activity_engine, self.filepath_net, filepath_act,
+            solver="dp", cache=SupernetworkCache(self.directory))
+        self.assertRaises(ValueError, activity_engine, self.filepath_net, filepath_act,
+            skim_cache=cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import os
+import shutil
+import tempfile
+from graph_utils.supernetwork_cache import *
+from graph_utils.txt_to_supernetwork import txt_to_supernetwork
+from activity_engine.activity_engine import activity_engine
+
+__author__ = 'jeromethai'
+
+
+class TestSupernetworkCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def test_get(self):
+        # the cached supernetwork has the same edges as txt_to_supernetwork
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        cache = SupernetworkCache(self.directory)
+        g = txt_to_supernetwork(filepath_net, filepath_act, alpha=2.0)
+        for i in range(2): # built, then loaded from the cache
+            csr = cache.get(filepath_net, filepath_act, alpha=2.0)
+            self.assertTrue(len(cache.entries()) == 1)
+            self.assertTrue(csr.vcount() == g.vcount())
+            self.assertTrue(zip(csr.edge_sources, csr.edge_targets) == g.get_edgelist())
+            for attr in ('weight', 'raw_weight', 'type'):
+                self.assertTrue(csr.es[attr] == g.es[attr])
+        # other parameters give other entries
+        cache.get(filepath_net, filepath_act, alpha=1.0)
+        cache.get(filepath_net, filepath_act, alpha=1.0, shifting=False)
+        self.assertTrue(len(cache.entries()) == 3)
+
+
+    def test_activity_engine(self):
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        cache = SupernetworkCache(self.directory)
+        truth = activity_engine(filepath_net, filepath_act)
+        for solver in ('dijkstra', 'layered'):
+            out = activity_engine(filepath_net, filepath_act, cache=cache, solver=solver)
+            self.assertTrue(out == truth)
+
+
+    def test_evict(self):
+        # least recently used entries are evicted above max_bytes
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        cache = SupernetworkCache(self.directory)
+        cache.get(filepath_net, filepath_act, alpha=1.0)
+        size = cache.entries()[0][1]
+        cache.max_bytes = 2 * size
+        cache.get(filepath_net, filepath_act, alpha=2.0)
+        key1 = cache.key(filepath_net, filepath_act, 1.0, True)
+        os.utime(os.path.join(self.directory, key1), (0, 0)) # least recently used
+        cache.get(filepath_net, filepath_act, alpha=3.0)
+        keys = [key for t, size, key in cache.entries()]
+        self.assertTrue(len(keys) == 2 and key1 not in keys)
+        cache.max_bytes = 0 # the last entry used is kept
+        cache.get(filepath_net, filepath_act, alpha=4.0)
+        self.assertTrue(len(cache.entries()) == 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from graph_utils.supernetwork_update import *
+from graph_utils.txt_to_supernetwork import txt_to_supernetwork, \
+    txt_to_supernetwork_csr, txt_to_time_expanded_graph, txt_to_link_arrays
+from graph_utils.txt_reader import TxtFile
+from pathfinding.pathfinding_extended import dijkstra_extended
+from pathfinding.transitions import TransitionTable
+from activity_engine.activity_dp import slice_travel_times, update_slice_travel_times
+
+__author__ = 'jeromethai'
+
+
+filepath_net = 'networks/SmallGrid_net_times.txt'
+filepath_act = 'networks/SmallGrid_activities.txt'
+targets = [(90, (0,)), (90, (1,))]
+
+
+def net_times_with(links, slices, times):
+    # copy of SmallGrid_net_times.txt with the travel times modified
+    with TxtFile(filepath_net) as f: table = f.table()
+    table[links, np.asarray(slices) + 2] = times
+    fd, filepath = tempfile.mkstemp(suffix='_net_times.txt')
+    with os.fdopen(fd, 'w') as f:
+        for line in open(filepath_net):
+            f.write(line)
+            if line[0] == '~': break
+        for row in table:
+            f.write(' '.join(['%d' % row[0], '%d' % row[1]] +
+                ['%g' % x for x in row[2:]]) + ';\n')
+    return filepath
+
+
+def solve(g, table):
+    return dijkstra_extended(g, 0, targets, table)
+
+
+class TestSupernetworkUpdate(unittest.TestCase):
+
+    def test_update_travel_times(self):
+        # the updated supernetworks give the same paths as the rebuilt one
+        np.random.seed(0)
+        links = np.random.randint(0, 14, size=40)
+        slices = np.random.randint(0, 16, size=40)
+        times = np.random.randint(1, 30, size=40).astype(float)
+        filepath = net_times_with(links, slices, times)
+        try:
+            truth = txt_to_supernetwork(filepath, filepath_act, alpha=2.0)
+        finally:
+            os.remove(filepath)
+        truth_paths = solve(truth, TransitionTable.from_graph(truth))
+        for build in (txt_to_supernetwork, txt_to_supernetwork_csr):
+            g = build(filepath_net, filepath_act, alpha=2.0)
+            table = TransitionTable.from_graph(g)
+            table.lists() # the cached lists are patched
+            self.assertTrue(solve(g, table) != truth_paths)
+            update_travel_times(g, links, slices, times, 2.0, 14, [table])
+            self.assertTrue(g.es['weight'] == truth.es['weight'])
+            self.assertTrue(g.es['raw_weight'] == truth.es['raw_weight'])
+            self.assertTrue(table.lists()[0] == truth.es['weight'])
+            self.assertTrue(solve(g, table) == truth_paths)
+        g = txt_to_time_expanded_graph(filepath_net, filepath_act, alpha=2.0)
+        table = g.transition_table()
+        for i in range(16): g.slice_weights(i) # the cached slices are patched
+        update_travel_times(g, links, slices, times)
+        self.assertTrue(g.to_csr().es['weight'] == truth.es['weight'])
+        self.assertTrue(solve(g, table) == truth_paths)
+
+
+    def test_activity_edges(self):
+        # removing the mall activities leaves no path with the mall
+        # and adding them back gives the same paths
+        for build in (txt_to_supernetwork, txt_to_supernetwork_csr,
+            txt_to_time_expanded_graph):
+            g = build(filepath_net, filepath_act)
+            truth = solve(g, TransitionTable.from_graph(g) if build !=
+                txt_to_time_expanded_graph else g.transition_table())
+            mall = [(2+(i+2)*6, 2+(i+5)*6) for i in range(11)]
+            eids = [g.get_eid(s, t) for s, t in mall]
+            remove_activity_edges(g, eids)
+            table = lambda: g.transition_table() if build == txt_to_time_expanded_graph \
+                else TransitionTable.from_graph(g)
+            self.assertTrue(solve(g, table())[1] == [])
+            new = add_activity_edges(g, [s for s, t in mall], [t for s, t in mall],
+                [0]*11, [200.]*11, [3]*11, shift=67.)
+            self.assertTrue([g.es[e].tuple for e in new] == mall)
+            self.assertTrue(g.es[new[0]]['weight'] == -200. + 3*67.)
+            self.assertTrue(solve(g, table()) == truth)
+
+
+    def test_update_slice_travel_times(self):
+        # recomputing the modified slices gives the same matrices
+        sources, targets, weights = txt_to_link_arrays(filepath_net)
+        D, succ = slice_travel_times(sources, targets, weights, 6)
+        weights[[0, 3, 7], [2, 2, 9]] = [40., 1., 25.]
+        truth = slice_travel_times(sources, targets, weights, 6)
+        update_slice_travel_times(sources, targets, weights, 6, [2, 9], (D, succ))
+        self.assertTrue(np.array_equal(D, truth[0]))
+        self.assertTrue(np.array_equal(succ, truth[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+from igraph import Graph
+from pathfinding.time_dependent import *
+from pathfinding.csr import CSRGraph
+from graph_utils.txt_to_supernetwork import link_arrays
+from activity_engine.skims import fifo_travel_times
+
+__author__ = 'jeromethai'
+
+
+class TestTimeDependent(unittest.TestCase):
+
+    def test_functions(self):
+        # a link of 10, 50, 5 and 5 with slices of length 20
+        functions = TravelTimeFunctions([[10.0, 50.0, 5.0, 5.0]], 20.0)
+        self.assertTrue(functions.arrival(0, 0.0) == 10.0)
+        self.assertTrue(functions.arrival(0, 25.0) == 45.0) # waits until 40
+        self.assertTrue(functions.arrival(0, 100.0) == 105.0) # after the day
+        tau = np.linspace(-5.0, 100.0, 211)
+        arrivals = functions.arrivals(tau[:, None])[:, 0]
+        self.assertTrue(np.all(np.diff(arrivals) >= 0.0)) # FIFO
+        self.assertTrue(np.array_equal(arrivals, [functions.arrival(0, t) for t in tau]))
+        self.assertTrue(np.isinf(functions.arrivals(np.array([[np.inf]]))[0, 0]))
+
+
+    def test_td_dijkstra(self):
+        # same travel times as the label-correcting search of skims.py with
+        # short slices, and as dijkstra with constant weights
+        metadata, sources, targets, weights = link_arrays('networks/SmallGrid_net_times.txt')
+        num_nodes, num_steps = metadata['num_nodes'], metadata['num_steps']
+        graph = CSRGraph(num_nodes, sources, targets)
+        D = fifo_travel_times(sources, targets, weights, num_nodes, 5.0)
+        solver = TimeDependentSolver(graph, TravelTimeFunctions(weights, 5.0))
+        for i in range(num_steps):
+            for k in range(num_nodes):
+                epaths = solver.solve(k, 5.0 * i, output="epath")
+                self.assertTrue(np.allclose(solver.travel_times(), D[i, k]))
+                for n, epath in enumerate(epaths):
+                    # the path arrives at the earliest arrival time
+                    tau = 5.0 * i
+                    for e in epath: tau = solver.functions.arrival(e, tau)
+                    self.assertTrue(tau == solver.arrival[n])
+        g = Graph(n=num_nodes, edges=zip(sources, targets), directed=True)
+        g.es['weight'] = weights[:, 3]
+        constant = TravelTimeFunctions(np.repeat(weights[:, 3:4], num_steps, axis=1), 5.0)
+        vpaths = td_dijkstra(graph, constant, 2, departure=7.0)
+        self.assertTrue(vpaths[5][0] == 2 and vpaths[5][-1] == 5 and vpaths[2] == [])
+        solver = TimeDependentSolver(graph, constant)
+        solver.solve(2, 7.0, to=[5], output=None)
+        self.assertTrue(solver.travel_times([5]) == g.shortest_paths(2, 5, 'weight')[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
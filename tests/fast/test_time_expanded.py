@@ -0,0 +1,99 @@
+import unittest
+import numpy as np
+from pathfinding.time_expanded import *
+from pathfinding.pathfinding_extended import dijkstra_extended
+from pathfinding.transitions import TransitionTable
+from graph_utils.txt_to_supernetwork import txt_to_supernetwork, \
+    txt_to_time_expanded_graph
+from activity_engine.activity_engine import activity_engine, make_modifier
+
+__author__ = 'jeromethai'
+
+
+class TestTimeExpanded(unittest.TestCase):
+
+    def test_edges(self):
+        # same vertices, edges, edge ids and attributes as the supernetwork
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        g = txt_to_supernetwork(filepath_net, filepath_act, alpha=2.0)
+        implicit = txt_to_time_expanded_graph(filepath_net, filepath_act, alpha=2.0)
+        self.assertTrue(implicit.vcount() == g.vcount())
+        self.assertTrue(implicit.ecount() == g.ecount())
+        for u in range(g.vcount()):
+            out = implicit.out_edges(u)
+            self.assertTrue(sorted(out) == sorted((e.index, e.target)
+                for e in g.es.select(_source=u)))
+        for edge in g.es:
+            other = implicit.es[edge.index]
+            self.assertTrue(other.tuple == edge.tuple)
+            self.assertTrue(implicit.get_eid(*edge.tuple) == edge.index)
+            for attr in ('weight', 'type', 'raw_weight'):
+                self.assertTrue(other[attr] == edge[attr])
+                self.assertTrue(implicit.es[attr][edge.index] == edge[attr])
+        csr = implicit.to_csr()
+        self.assertTrue(zip(csr.edge_sources, csr.edge_targets) == g.get_edgelist())
+        self.assertTrue(csr.es['weight'] == g.es['weight'])
+
+
+    def test_records(self):
+        # the activities with implicit times are records expanded on the fly
+        # into the same edges as the supernetwork
+        filepath_net = 'networks/SmallGrid_net_times_32_steps.txt'
+        filepath_act = 'networks/SmallGrid_activities_reduced.txt'
+        g = txt_to_supernetwork(filepath_net, filepath_act)
+        implicit = txt_to_time_expanded_graph(filepath_net, filepath_act)
+        self.assertTrue(len(implicit.records) == 2)
+        self.assertTrue(implicit.extra.ecount() == 31) # home edges
+        self.assertTrue(implicit.ecount() == g.ecount())
+        truth = dict((e.tuple, e.attributes()) for e in g.es)
+        for eid in range(implicit.ecount()):
+            edge = implicit.es[eid]
+            attributes = dict((attr, edge[attr]) for attr in ('weight', 'type', 'raw_weight'))
+            self.assertTrue(attributes == truth[edge.tuple])
+            self.assertTrue(implicit.get_eid(*edge.tuple) == eid)
+        for u in range(g.vcount()):
+            self.assertTrue(sorted(implicit.neighbors(u)) == sorted(g.neighbors(u, mode="out")))
+        csr = implicit.to_csr()
+        self.assertTrue(csr.es['type'] == [implicit.es['type'][e] for e in range(csr.ecount())])
+
+
+    def test_slice_cache(self):
+        # at most max_slices lists of weights are cached
+        implicit = txt_to_time_expanded_graph('networks/SmallGrid_net_times.txt',
+            'networks/SmallGrid_activities.txt', alpha=2.0)
+        implicit.max_slices = 2
+        for i in [0, 1, 0, 2]: implicit.slice_weights(i)
+        self.assertTrue(implicit._slices.keys() == [0, 2])
+        self.assertTrue(implicit.slice_weights(1) == (2.0 * implicit.weights[1]).tolist())
+
+
+    def test_dijkstra_extended(self):
+        # same paths as on the supernetwork with the table and the modifier
+        filepath_net = 'networks/SmallGrid_net_times_32_steps.txt'
+        filepath_act = 'networks/SmallGrid_activities.txt'
+        g = txt_to_supernetwork(filepath_net, filepath_act)
+        implicit = txt_to_time_expanded_graph(filepath_net, filepath_act)
+        targets = [(31*6, (0,)), (31*6, (1,))]
+        truth = dijkstra_extended(g, 0, targets, make_modifier(1))
+        self.assertTrue(dijkstra_extended(implicit, 0, targets,
+            implicit.transition_table()) == truth)
+        self.assertTrue(dijkstra_extended(implicit, 0, targets, make_modifier(1)) == truth)
+        # a table of all the edges does not describe the extra edges
+        with self.assertRaises(ValueError):
+            dijkstra_extended(implicit, 0, targets, TransitionTable.from_graph(g))
+
+
+    def test_activity_engine(self):
+        filepath_net = 'networks/SmallGrid_net_times.txt'
+        for filepath_act in ['networks/SmallGrid_activities.txt',
+            'networks/SmallGrid_activities_reduced.txt']:
+            truth = activity_engine(filepath_net, filepath_act)
+            out = activity_engine(filepath_net, filepath_act, implicit=True)
+            self.assertTrue(out == truth)
+        with self.assertRaises(ValueError):
+            activity_engine(filepath_net, filepath_act, implicit=True, solver="layered")
+
+
+if __name__ == '__main__':
+    unittest.main()
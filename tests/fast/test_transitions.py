@@ -0,0 +1,80 @@
+import unittest
+from igraph import *
+from pathfinding.transitions import *
+from pathfinding.pathfinding_extended import *
+import numpy as np
+
+__author__ = 'jeromethai'
+
+
+def small_graph():
+    # network of test_pathfinding_extended_2 in test_pathfinding_extended.py
+    # in slice 1, activities of rewards 60 and 40 with type 0 and 1
+    # in slice 2, activities of rewards 50 and 20 with type 0 and 1
+    edges = [(0,1),(1,0),(0,2),(2,0),(1,2),(2,1),
+            (3,4),(4,3),(3,5),(5,3),(4,5),(5,4),
+            (6,7),(7,6),(6,8),(8,6),(7,8),(8,7),
+            (0,3),(1,4),(2,5),(3,6),(4,7),(5,8)]
+    g = Graph(edges=edges, directed=True)
+    g.es['weight'] = [10.]*18 + [100., 60., 40., 100., 50., 20.]
+    g.es['type'] = [-1]*18 + [-1, 0, 1, -1, 0, 1]
+    return g
+
+
+class TestTransitions(unittest.TestCase):
+
+    def test_compile(self):
+        # check the arrays compiled from the rules
+        table = TransitionTable([-1, 0, 1, 2], [1., 2., 3., 4.],
+            rules={1: REPEATABLE, 2: FORBIDDEN})
+        self.assertTrue(table.num_types == 3)
+        self.assertTrue(table.check.tolist() == [0, 1, 0, 0])
+        self.assertTrue(table.sets.tolist() == [0, 1, 2, 0])
+        self.assertTrue(table.allowed.tolist() == [True, True, True, False])
+        self.assertRaises(ValueError, TransitionTable, [0, 3], [1., 1.], 2)
+
+
+    def test_table_same_as_modifier(self):
+        # the default table gives the same paths as the modifier of
+        # test_pathfinding_extended_2 in test_pathfinding_extended.py
+        g = small_graph()
+        to = [(6,(0,0)), (6,(1,0)), (6,(0,1)), (6,(1,1))]
+        table = TransitionTable.from_graph(g)
+        out = dijkstra_extended(g, 0, to, table)
+        self.assertTrue(out[0] == [0, 3, 6])
+        self.assertTrue(out[1] == [0, 3, 4, 7, 6])
+        self.assertTrue(out[2] == [0, 3, 5, 8, 6])
+        self.assertTrue(out[3] == [0, 1, 4, 5, 8, 6])
+        # the table can be used as a callable modifier too
+        self.assertTrue(dijkstra_extended(g, 0, to, table.__call__) == out)
+
+
+    def test_rules(self):
+        # repeatable and forbidden rules
+        g = small_graph()
+        to = [(6,(0,0)), (6,(1,0)), (6,(0,1)), (6,(1,1))]
+        # type 1 is forbidden, hence the counter a[1] is always 0
+        table = TransitionTable.from_graph(g, rules={1: FORBIDDEN})
+        out = dijkstra_extended(g, 0, to, table)
+        self.assertTrue(out[1] == [0, 3, 4, 7, 6])
+        self.assertTrue(out[2] == [] and out[3] == [])
+        # type 0 is repeatable, both edges of type 0 can be taken
+        g.es['weight'] = [10.]*18 + [100., 60., 40., 100., 10., 20.]
+        g.es[g.get_eid(4, 3)]['weight'] = 1000.
+        table = TransitionTable.from_graph(g, rules={0: REPEATABLE})
+        out = dijkstra_extended(g, 0, to, table)
+        self.assertTrue(out[1] == [0, 1, 4, 7, 6])
+
+
+    def test_supernetwork(self):
+        # see test_pathfinding_extended_4 in test_pathfinding_extended.py
+        g = Graph.Read_Pickle('networks/SmallGrid.pkl')
+        table = TransitionTable.from_graph(g, num_types=1)
+        out = dijkstra_extended(g, 0, [(90,(0,)), (90,(1,)), (90,(2,))], table)
+        self.assertTrue(out[0] == [0, 6, 12, 18, 21, 22, 23, 95, 94, 93, 90])
+        self.assertTrue(out[1] == [0, 6, 9, 10, 11, 77, 74, 92, 91, 90])
+        self.assertTrue(out[2] == [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+from graph_utils.txt_reader import *
+
+__author__ = 'jeromethai'
+
+
+class TestTxtReader(unittest.TestCase):
+
+    def test_metadata(self):
+        with TxtFile('networks/SmallGrid_net_times.txt') as f:
+            self.assertTrue(f.metadata == {'num_nodes': 6, 'num_links': 14,
+                'num_steps': 16, 'start_time': 5, 'end_time': 21})
+        with TxtFile('networks/SmallGrid_activities.txt') as f:
+            self.assertTrue(f.metadata == {'num_types': 1, 'home_location': 0,
+                'explicit': 1})
+
+
+    def test_records(self):
+        # typed records, the last type converts the remaining columns
+        with TxtFile('networks/SmallGrid_net_times.txt') as f:
+            records = list(f.records((int, int, float)))
+        self.assertTrue(len(records) == 14)
+        self.assertTrue(records[0] == (0, 1, 5., 10., 15., 15., 15., 10.) + (5.,)*10)
+        with TxtFile('networks/Braess_net.txt') as f:
+            lines = list(f.lines())
+        self.assertTrue(lines[1] == ['1', '4', '1', '100', '50', '0.02', '1', '0', '0', '1'])
+
+
+    def test_table(self):
+        # the chunks give the same table as the records
+        with TxtFile('networks/SiouxFalls_net.txt') as f:
+            truth = np.array(list(f.records((float,))))
+        with TxtFile('networks/SiouxFalls_net.txt') as f:
+            chunks = list(f.chunks(chunk=10))
+        self.assertTrue(len(chunks) == 8 and chunks[-1].shape == (6, 10))
+        self.assertTrue(np.array_equal(np.concatenate(chunks), truth))
+        with TxtFile('networks/SiouxFalls_net.txt') as f:
+            self.assertTrue(np.array_equal(f.table(), truth))
+
+
+if __name__ == '__main__':
+    unittest.main()
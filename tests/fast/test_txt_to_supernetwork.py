@@ -238,6 +238,25 @@ class TestTxtToSupernetwork(unittest.TestCase):
             self.assertTrue(edge['type'] == -1)
 
 
+    def test_supernetwork_arrays(self):
+        # same edges and attributes as the edge_dict, the igraph and the CSRGraph
+        # have the same edge ids
+        for filepath_net in ['networks/SmallGrid_net_times.txt',
+            'networks/SmallGrid_net_times_32_steps.txt']:
+            filepath_act = 'networks/SmallGrid_activities.txt'
+            edge_dict = txt_to_superedge_dict(filepath_net, 2.0)
+            edge_dict.update(txt_to_activities_edge_dict(filepath_act,
+                read_metadata(filepath_net), False))
+            g = txt_to_supernetwork(filepath_net, filepath_act, alpha=2.0, shifting=False)
+            csr = txt_to_supernetwork_csr(filepath_net, filepath_act, alpha=2.0,
+                shifting=False)
+            self.assertTrue(g.ecount() == len(edge_dict) == csr.ecount())
+            for edge in g.es:
+                self.assertTrue(edge.attributes() == edge_dict[edge.tuple])
+                self.assertTrue(csr.es[edge.index].tuple == edge.tuple)
+            self.assertTrue(csr.es['weight'] == g.es['weight'])
+
+
     def test_snap_activities_to_time_grid_get_shift(self):
         # test snapping of activities on time grid of 16 time steps
         # between 5am and 9pm 
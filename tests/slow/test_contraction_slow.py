@@ -0,0 +1,56 @@
+import unittest
+from igraph import *
+import sys
+sys.path.append('../../')
+from pathfinding.contraction import ContractionHierarchy
+import numpy as np
+import time
+
+
+__author__ = 'jeromethai'
+
+
+class TestContraction(unittest.TestCase):
+
+
+    def test_contraction(self):
+        # compare get_shortest_paths() from igraph with the contraction hierarchy
+        # https://pythonhosted.org/python-igraph/igraph.GraphBase-class.html#get_shortest_paths
+        g = Graph.Read_Pickle('../../networks/ChicagoSketch_net.pkl')
+        start = time.time()
+        ch = ContractionHierarchy.build(g, 'weight')
+        print "time_preprocessing", time.time() - start
+        time_ch = 0.0
+        for i in range(10):
+            v = np.random.randint(933)
+            to = range(g.vcount())
+            output1 = g.get_shortest_paths(v, weights='weight')
+            start = time.time()
+            output2 = [ch.query(v, t) for t in to]
+            time_ch += time.time() - start
+            for path1,path2 in zip(output1, output2):
+                cost1 = 0.0
+                cost2 = 0.0
+                for s,t in zip(path1[:-1], path1[1:]):
+                    cost1 += g.es[g.get_eid(s,t)]['weight']
+                for s,t in zip(path2[:-1], path2[1:]):
+                    cost2 += g.es[g.get_eid(s,t)]['weight']
+                # check if shortest paths have some costs
+                # remember that shortest paths are not unique and the costs
+                # of two paths of the same length can differ by rounding
+                self.assertTrue(np.isclose(cost1, cost2))
+
+            output1 = g.get_shortest_paths(v, weights='weight', output='epath', to=[4,5,6])
+            start = time.time()
+            output2 = [ch.query(v, t, output='epath') for t in [4,5,6]]
+            time_ch += time.time() - start
+            for path1,path2 in zip(output1, output2):
+                cost1 = sum([g.es[eid]['weight'] for eid in path1])
+                cost2 = sum([g.es[eid]['weight'] for eid in path2])
+                self.assertTrue(np.isclose(cost1, cost2))
+
+        print "time_ch", time_ch
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ from igraph import *
 import sys
 sys.path.append('../../')
 from pathfinding.pathfinding import *
+from pathfinding.csr import CSRGraph
 import numpy as np
 import time
 
@@ -141,5 +142,28 @@ class TestPathfinding(unittest.TestCase):
         print "time_with_heap", time_with_heap
 
 
+    def test_pathfinding_csr(self):
+        # compare get_shortest_paths() from igraph with own implementation
+        # when the graph is compiled once into a CSRGraph
+        g = Graph.Read_Pickle('../../networks/ChicagoSketch_net.pkl')
+        csr = CSRGraph.from_igraph(g, ['weight'])
+        time_igraph, time_csr = 0.0, 0.0
+        for i in range(10):
+            v = np.random.randint(933)
+            for to in [None, [4,5,6]]:
+                start = time.time()
+                output1 = g.get_shortest_paths(v, to=to, weights='weight', output='epath')
+                time_igraph += time.time() - start
+                start = time.time()
+                output2 = dijkstra_with_heap(csr, v, to=to, weights='weight', output='epath')
+                time_csr += time.time() - start
+                for path1,path2 in zip(output1, output2):
+                    cost1 = sum([g.es[eid]['weight'] for eid in path1])
+                    cost2 = sum([g.es[eid]['weight'] for eid in path2])
+                    self.assertTrue(cost1==cost2)
+
+        print "time_igraph", time_igraph, "time_csr", time_csr
+
+
 if __name__ == '__main__':
     unittest.main()